@@ -0,0 +1,31 @@
+# apps/db/management/commands/backfill_regions.py
+
+"""
+지역 기준 테이블(region_sido / region_sigungu) 채우기 + FK 연결
+
+- ErInfo.er_sido / er_sigungu, Hospital.sido / sggu 문자열로 기준 테이블 생성
+- 각 행의 region_sido / region_sigungu FK 를 채움 (여러 번 실행해도 결과 동일)
+- import_erinfo / import_hospital_data 가 끝날 때 자동으로 실행됨
+
+실행 예)
+    python manage.py backfill_regions
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.services.regions import backfill_regions
+
+
+class Command(BaseCommand):
+    help = "ErInfo / Hospital 지역 문자열로 지역 기준 테이블을 채우고 FK 를 연결합니다."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            result = backfill_regions()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[REGION] 응급실 {result['er']}건 / 병원 {result['hospital']}건 지역 연결 완료"
+            )
+        )
@@ -0,0 +1,86 @@
+# apps/db/management/commands/benchmark_er_scoring.py
+
+"""
+응급실 점수 계산 성능 비교
+- 기존: 병원별 calculate_score 호출 (scalar)
+- 신규: apps.emergency.scoring 엔진 일괄 계산 (numpy)
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.db.models.emergency import ErInfo
+from apps.emergency import scoring
+from apps.emergency.views import calculate_score
+
+FILTER_TYPES = ["", "stroke", "traffic", "cardio", "obstetrics"]
+
+
+class Command(BaseCommand):
+    help = "응급실 점수 계산 scalar / numpy 경로 속도 및 결과 차이 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="위치별 반복 횟수")
+        parser.add_argument("--locations", type=int, default=20, help="무작위 사용자 위치 수")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not scoring.is_available():
+            self.stdout.write(self.style.ERROR("numpy 가 설치되어 있지 않습니다."))
+            return
+
+        hospitals = list(ErInfo.objects.select_related("latest_status"))
+        if not hospitals:
+            self.stdout.write(self.style.WARNING("er_info 데이터가 없습니다."))
+            return
+
+        rnd = random.Random(options["seed"])
+        locations = [
+            (rnd.uniform(34.5, 38.0), rnd.uniform(126.0, 129.5))
+            for _ in range(options["locations"])
+        ]
+        iterations = options["iterations"]
+
+        started = time.perf_counter()
+        engine = scoring.ErScoringEngine.from_db()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        self.stdout.write(f"병원 수: {len(hospitals)} / 엔진 빌드: {build_ms:.1f}ms")
+        self.stdout.write("=" * 60)
+
+        for filter_type in FILTER_TYPES:
+            # 1) scalar 경로
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for lat, lng in locations:
+                    scalar = {
+                        hos.er_id: calculate_score(
+                            hos, lat, lng, filter_type, getattr(hos, "latest_status", None)
+                        )[0]
+                        for hos in hospitals
+                    }
+            scalar_ms = (time.perf_counter() - started) * 1000
+
+            # 2) numpy 경로
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for lat, lng in locations:
+                    ids, totals, _ = engine.score(lat, lng, filter_type)
+            vector_ms = (time.perf_counter() - started) * 1000
+
+            # 3) 마지막 위치 기준 결과 차이
+            max_diff = max(
+                (abs(scalar[er_id] - total) for er_id, total in zip(ids.tolist(), totals.tolist())),
+                default=0.0,
+            )
+
+            calls = iterations * len(locations)
+            self.stdout.write(
+                f"[{filter_type or 'default':>10}] "
+                f"scalar {scalar_ms / calls:8.3f}ms/회 | "
+                f"numpy {vector_ms / calls:8.3f}ms/회 | "
+                f"x{scalar_ms / max(vector_ms, 1e-9):6.1f} | "
+                f"최대 점수 차이 {max_diff:.2e}"
+            )
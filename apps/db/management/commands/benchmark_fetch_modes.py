@@ -0,0 +1,108 @@
+# apps/db/management/commands/benchmark_fetch_modes.py
+
+"""
+실시간 병상 API 수집 방식 비교 (DB 반영 없음)
+- region: ErInfo 의 (시도, 시군구)별 호출 (전체 지역, 응답 지문 무시)
+- nationwide: 지역 조건 없이 큰 페이지로 전국 페이지 조회
+
+요청 수 / 실패 수 / 소요 시간 / 수집 행 수 / ErInfo 에 등록된 병원 수 / 양쪽 병원 차이를 출력한다.
+
+실행 예)
+    python manage.py benchmark_fetch_modes
+    python manage.py benchmark_fetch_modes --page-size 500
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.db.management.commands.fetch_emergency import (
+    NATIONWIDE_PAGE_SIZE,
+    all_regions,
+    parse_api_A,
+    parse_api_A_nationwide,
+)
+from apps.db.models.emergency import ErInfo
+from apps.services.openapi_fetcher import (
+    PooledOpenApiFetcher,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+)
+from apps.services.region_polling import plan_region_polls
+
+
+class Command(BaseCommand):
+    help = "실시간 병상 API region / nationwide 수집 방식의 요청 수, 소요 시간, 수집 행 수 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=DEFAULT_RATE_PER_SEC, help="초당 최대 요청 수"
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=NATIONWIDE_PAGE_SIZE,
+            help="nationwide 모드 1페이지 행 수(numOfRows)",
+        )
+
+    def handle(self, *args, **options):
+        fetcher_options = {
+            "concurrency": options["concurrency"],
+            "rate_per_sec": options["rate"],
+            "timeout": DEFAULT_TIMEOUT,
+            "retries": DEFAULT_RETRIES,
+        }
+        known_hpids = set(ErInfo.objects.values_list("hpid", flat=True))
+
+        results = {}
+        for mode in ["region", "nationwide"]:
+            with PooledOpenApiFetcher(**fetcher_options) as fetcher:
+                started = time.perf_counter()
+                if mode == "region":
+                    # 전체 지역 + 응답 지문 무시 (폴링 상태는 기록하지 않음)
+                    plan = plan_region_polls(all_regions(), force_full=True)
+                    rows = parse_api_A(fetcher, plan)
+                else:
+                    rows = parse_api_A_nationwide(fetcher, options["page_size"])
+                elapsed = time.perf_counter() - started
+
+                hpids = {row["hpid"] for row in rows}
+                results[mode] = {
+                    "requests": sum(s.attempts for s in fetcher.stats),
+                    "calls": len(fetcher.stats),
+                    "failed": sum(1 for s in fetcher.stats if not s.ok),
+                    "empty": sum(1 for s in fetcher.stats if s.ok and s.items == 0),
+                    "elapsed": elapsed,
+                    "rows": len(rows),
+                    "hpids": hpids,
+                    "known": len(hpids & known_hpids),
+                }
+
+        self.stdout.write("=" * 72)
+        self.stdout.write(
+            f"{'mode':<12}{'요청(재시도 포함)':>16}{'호출':>8}{'실패':>6}{'빈 응답':>8}"
+            f"{'시간(s)':>9}{'행':>7}{'등록 병원':>10}"
+        )
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<12}{r['requests']:>16}{r['calls']:>8}{r['failed']:>6}{r['empty']:>8}"
+                f"{r['elapsed']:>9.2f}{r['rows']:>7}{r['known']:>10}"
+            )
+
+        region, nationwide = results["region"], results["nationwide"]
+        only_region = (region["hpids"] - nationwide["hpids"]) & known_hpids
+        only_nationwide = (nationwide["hpids"] - region["hpids"]) & known_hpids
+        self.stdout.write("-" * 72)
+        self.stdout.write(
+            f"등록 병원 중 region 에만 있음: {len(only_region)}개 / "
+            f"nationwide 에만 있음: {len(only_nationwide)}개"
+        )
+        if only_region:
+            self.stdout.write(f"  region 만: {', '.join(sorted(only_region)[:10])}")
+        if only_nationwide:
+            self.stdout.write(f"  nationwide 만: {', '.join(sorted(only_nationwide)[:10])}")
@@ -1,16 +1,44 @@
 # apps/db/management/commands/fetch_emergency.py
 
-import requests
-import xmltodict
+import hashlib
+import io
+import json
+import math
+import tempfile
+import time
+
+from dataclasses import dataclass
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
 from django.utils import timezone
 
+from apps.emergency.capabilities import capability_mask
+from apps.emergency.detail_bundle import refresh_detail_bundles
+from apps.emergency.fragments import warm_status_fragments
+from apps.emergency.realtime import publish_status_changes
+from apps.emergency.snapshot import bump_snapshot_version
+from apps.services.raw_archive import ArchiveReplayFetcher, RawArchive
+from apps.services.region_polling import (
+    cached_payloads,
+    forget_payloads,
+    payload_digest,
+    plan_region_polls,
+    record_region_polls,
+)
+from apps.services.status_history import append_status_history
+from apps.services.openapi_fetcher import (
+    PooledOpenApiFetcher,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+)
+from apps.services.xml_stream import convert_items
 from apps.db.models.emergency import (
     ErInfo,
+    ErLatestStatus,
     ErStatus,
     ErStatusStaging,
 )
@@ -23,11 +51,15 @@ BASE_URL_A = (
     "getEmrrmRltmUsefulSckbdInfoInqire"
 )
 
-# 기본정보 API (분만실 여부 확인용 - 시설 유무)
-BASE_URL_BASIC = (
-    "https://apis.data.go.kr/B552657/ErmctInfoInqireService/"
-    "getEgytBassInfoInqire"
-)
+# 실시간 병상 수집 방식
+# - region: ErInfo 의 (시도, 시군구)별 호출 (적응형 폴링 / 응답 지문 적용)
+# - nationwide: 지역 조건 없이 큰 페이지로 전국을 페이지 단위 호출 (totalCount 확인)
+FETCH_MODES = ["region", "nationwide"]
+FETCH_MODE = getattr(settings, "ER_FETCH_MODE", "region")
+NATIONWIDE_PAGE_SIZE = getattr(settings, "ER_NATIONWIDE_PAGE_SIZE", 1000)
+
+# True 면 API rows 를 STAGING 에도 적재하고 STAGING 에서 병합 (감사 / 비교용)
+MERGE_AUDIT_STAGING = getattr(settings, "ER_MERGE_AUDIT_STAGING", False)
 
 
 ###########################################################
@@ -74,127 +106,49 @@ def parse_hvdate(item):
     return timezone.make_aware(dt)
 
 
-def fetch_api(url, params):
-    """공통 API 호출 + XML 파싱"""
-    params["serviceKey"] = API_KEY
-
-    try:
-        response = requests.get(url, params=params, timeout=10)
-    except Exception as e:
-        print(f"[ERROR] 요청 실패: {url} / {e}")
-        return []
-
-    # 디버그 출력 (필요시 주석 처리)
-    print("\n=== REQUEST URL ===")
-    print(response.url)
-    print("=== STATUS ===")
-    print(response.status_code)
-    print("=== RAW XML (앞부분) ===")
-    print(response.text[:2000])
-    print("==========================\n")
-
-    if response.status_code != 200:
-        print(f"[ERROR] HTTP {response.status_code}")
-        return []
-
-    try:
-        data = xmltodict.parse(response.text)
-    except Exception:
-        print("[ERROR] XML 파싱 실패")
-        return []
-
-    response_root = data.get("response")
-    if not response_root:
-        return []
-
-    body = response_root.get("body")
-    if not body:
-        return []
-
-    items_root = body.get("items")
-    if not items_root:
-        return []
-
-    items = items_root.get("item")
-    if not items:
-        return []
-
-    if isinstance(items, dict):
-        return [items]
-
-    return items
-
-
-###########################################################
-# 기본정보 API - 분만실 시설 유무 (보조 용도)
-###########################################################
-
-def get_basic_info(hpid):
-    """단일 병원 기본정보 조회"""
-    params = {
-        "HPID": hpid,
-        "pageNo": 1,
-        "numOfRows": 1,
-    }
-    items = fetch_api(BASE_URL_BASIC, params)
-    if not items:
-        return {}
-    return items[0]
-
-
-def build_basic_info_map(hpids, max_workers=8):
+@dataclass
+class RegionPayload:
     """
-    Staging에 등장한 hpid 들에 대해
-    기본정보 API를 병렬 호출 후 dict[hpid] 형태로 캐싱
+    지역 응답 1건: 원본 바이트 해시 + row 리스트 (item 은 읽는 대로 row 로 변환).
+    이전에 반영한 응답과 해시가 같으면 파싱하지 않음 (rows=None, raw 보관)
     """
-    hpids = list(set(hpids))
-    basic_info_map = {}
-
-    if not hpids:
-        return basic_info_map
-
-    print(f"[BASIC] 기본정보 API 병렬 호출 시작… 대상 병원 수: {len(hpids)}")
+    digest: str
+    raw: bytes = b""
+    rows: list = None
 
-    def task(hpid):
-        return hpid, get_basic_info(hpid)
+    def __len__(self):
+        # PooledOpenApiFetcher 통계(결과 건수)용
+        return len(self.rows) if self.rows is not None else 0
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(task, hpid) for hpid in hpids]
-        for future in as_completed(futures):
-            try:
-                hpid, info = future.result()
-                basic_info_map[hpid] = info or {}
-            except Exception as e:
-                print(f"[BASIC][ERROR] 기본정보 조회 실패: {e}")
 
-    print(f"[BASIC] 기본정보 캐싱 완료: {len(basic_info_map)}개")
-    return basic_info_map
+def region_payload_parser(known_digests):
+    """응답 바이트를 읽어 해시를 구하고, 처음 보는 응답만 파싱하는 파서"""
+    def parse(response):
+        raw = response.raw.read()
+        digest = payload_digest(raw)
+        if digest in known_digests:
+            return RegionPayload(digest, raw)
+        return RegionPayload(digest, rows=convert_items(io.BytesIO(raw), items_to_rows))
+    return parse
 
 
 ###########################################################
 # A. 실시간 병상 API 파싱 (지역 병렬 호출)
 ###########################################################
 
-def _fetch_region_rows(sido, sigungu):
-    """
-    하나의 (시도, 시군구)에 대해 실시간 병상 API 호출 후
-    row(dict) 리스트로 변환하여 반환
-    """
-    params = {
+def region_params(sido, sigungu):
+    return {
         "STAGE1": sido,
         "STAGE2": sigungu,
         "pageNo": 1,
         "numOfRows": 200,
+        "serviceKey": API_KEY,
     }
 
-    print(f"[A] 요청 지역: {sido} {sigungu}")
-    items = fetch_api(BASE_URL_A, params)
 
+def items_to_rows(items):
+    """실시간 병상 API item(리스트 또는 iter_items 제너레이터) → row(dict) 리스트"""
     rows = []
-    if not items:
-        print(f"[A] → 데이터 없음: {sido} {sigungu}")
-        return rows
-
     for it in items:
         hpid = it.get("hpid")
         if not hpid:
@@ -239,44 +193,180 @@ def _fetch_region_rows(sido, sigungu):
     return rows
 
 
-def parse_api_A(max_workers=8):
+def parse_api_A(fetcher, plan=None):
     """
-    실시간 병상 API 전체 호출 (지역 병렬 처리 버전)
+    실시간 병상 API 호출 (지역별 병렬 처리)
+    - plan(RegionPollPlan) 이 있으면 이번 회차에 호출할 지역만, 없으면 전체 지역
+    - 지역별 응답은 plan.observe 로 기록 (적응형 폴링 등급 계산용)
     """
     print("[1] 실시간 병상 API 호출 시작…")
 
     results = []
 
-    regions = (
+    if plan is None:
+        plan = plan_region_polls(all_regions(), force_full=True)
+    regions = plan.regions
+
+    if not regions:
+        print(f"[A] 이번 회차에 호출할 지역이 없습니다. (전체 {plan.total}개)")
+        return results
+
+    print(
+        f"[A] 호출 지역 수: {len(regions)} / 전체 {plan.total} "
+        f"({'전체 수집' if plan.full_sweep else '적응형'}, "
+        f"concurrency={fetcher.concurrency}, rate={fetcher.rate_per_sec}/s)"
+    )
+
+    # 이전 회차에 반영한 응답 지문 (강제 수집이면 무시)
+    cached = {} if plan.forced else cached_payloads(regions)
+    known_digests = set(cached.values())
+
+    region_keys = {f"{sido} {sigungu}": (sido, sigungu) for sido, sigungu in regions}
+    jobs = [
+        (key, BASE_URL_A, region_params(*region))
+        for key, region in region_keys.items()
+    ]
+    region_items = fetcher.fetch_all(jobs, region_payload_parser(known_digests))
+
+    skipped = 0
+    failed = []
+    for key, payload in region_items.items():
+        if payload is None:
+            # 재시도까지 실패 (응답 없음) → 이번 회차는 이 지역을 반영하지 않음
+            failed.append(key)
+            continue
+
+        region = region_keys[key]
+        if cached.get(region) == payload.digest:
+            # 응답 바이트가 이전과 같음 → 파싱 / STAGING / 병합 모두 건너뜀
+            plan.observe(region, payload.digest)
+            skipped += 1
+            continue
+
+        rows = payload.rows
+        if rows is None:
+            # 다른 지역의 이전 응답과 바이트가 같은 경우 (예: 빈 응답) → 여기서 파싱
+            rows = convert_items(io.BytesIO(payload.raw), items_to_rows)
+
+        plan.observe(region, payload.digest, applied=True)
+        if not rows:
+            print(f"[A] → 데이터 없음: {key}")
+            continue
+        results.extend(rows)
+
+    if failed:
+        print(f"[A][WARN] 지역 호출 실패 {len(failed)}건: {', '.join(failed)}")
+    print(f"[A] 응답이 이전과 같아 건너뛴 지역: {skipped}개 / 새로 반영: {len(plan.payloads)}개")
+    fetcher.print_stats("[A]")
+    print(f"[A] 실시간 병상 데이터 수집 완료: {len(results)}건")
+    return results
+
+
+def all_regions():
+    """ErInfo 에 등록된 (시도, 시군구) 전체"""
+    return list(
         ErInfo.objects
         .values_list("er_sido", "er_sigungu")
         .distinct()
         .order_by("er_sido", "er_sigungu")
     )
 
-    regions = list(regions)
-    if not regions:
-        print("[A] 요청할 지역이 없습니다.")
-        return results
 
-    print(f"[A] 총 지역 수: {len(regions)} (max_workers={max_workers})")
+###########################################################
+# A-2. 실시간 병상 API 전국 페이지 조회
+###########################################################
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [
-            executor.submit(_fetch_region_rows, sido, sigungu)
-            for sido, sigungu in regions
-        ]
+def page_params(page_no, page_size):
+    return {
+        "pageNo": page_no,
+        "numOfRows": page_size,
+        "serviceKey": API_KEY,
+    }
 
-        for future in as_completed(futures):
-            try:
-                rows = future.result()
-                if rows:
-                    results.extend(rows)
-            except Exception as e:
-                print(f"[A][ERROR] 지역 처리 실패: {e}")
 
-    print(f"[A] 실시간 병상 데이터 수집 완료: {len(results)}건")
-    return results
+@dataclass
+class ApiPage:
+    """페이지 1건의 row 리스트 + 응답의 totalCount"""
+    rows: list
+    total_count: int = None
+
+    def __len__(self):
+        # PooledOpenApiFetcher 통계(결과 건수)용
+        return len(self.rows)
+
+
+def parse_page(response):
+    meta = {}
+    # totalCount 는 items 뒤에 오므로 변환이 끝난 뒤에 읽음
+    rows = convert_items(response.raw, items_to_rows, meta)
+    return ApiPage(rows, safe_int(meta.get("totalCount")))
+
+
+def fetch_nationwide_items(fetcher, page_size=NATIONWIDE_PAGE_SIZE):
+    """
+    1페이지로 totalCount 를 확인한 뒤 나머지 페이지를 병렬 호출.
+    반환: (row 리스트, totalCount, 실패한 페이지 키 리스트). 1페이지부터 실패하면 None
+    """
+    first = fetcher.fetch_all(
+        [("page:1", BASE_URL_A, page_params(1, page_size))], parse_page
+    )["page:1"]
+    if first is None:
+        return None
+
+    total = first.total_count if first.total_count is not None else len(first.rows)
+    pages = max(1, math.ceil(total / page_size))
+
+    rows = list(first.rows)
+    failed = []
+    if pages > 1:
+        results = fetcher.fetch_all(
+            [
+                (f"page:{page_no}", BASE_URL_A, page_params(page_no, page_size))
+                for page_no in range(2, pages + 1)
+            ],
+            parse_page,
+        )
+        for key, page in results.items():
+            if page is None:
+                failed.append(key)
+                continue
+            rows.extend(page.rows)
+
+    return rows, total, failed
+
+
+def parse_api_A_nationwide(fetcher, page_size=NATIONWIDE_PAGE_SIZE):
+    """
+    실시간 병상 API 전국 페이지 조회 (지역 조건 없음).
+    수집 건수를 totalCount 와 비교하고, 페이지 경계에서 중복된 병원은 hvdate 가 최신인 행만 사용
+    """
+    print(f"[1] 실시간 병상 API 전국 조회 시작… (numOfRows={page_size})")
+
+    fetched = fetch_nationwide_items(fetcher, page_size)
+    if fetched is None:
+        print("[A][ERROR] 1페이지 호출 실패 - 이번 회차는 반영하지 않습니다.")
+        return []
+
+    rows, total, failed = fetched
+    if failed:
+        print(f"[A][WARN] 페이지 호출 실패 {len(failed)}건: {', '.join(failed)}")
+    if len(rows) != total:
+        # 조회 중 데이터가 바뀌면 페이지 경계에서 행이 밀려 누락/중복될 수 있음
+        # → 빠진 병원은 병합에서 건드리지 않으므로 다음 회차에 반영
+        print(f"[A][WARN] 수집 {len(rows)}건 / totalCount {total}건 불일치")
+
+    latest = {}
+    for row in rows:
+        current = latest.get(row["hpid"])
+        if current is None or row["hvdate"] > current["hvdate"]:
+            latest[row["hpid"]] = row
+
+    fetcher.print_stats("[A]")
+    print(
+        f"[A] 실시간 병상 데이터 수집 완료: {len(latest)}건 "
+        f"(행 {len(rows)} / totalCount {total})"
+    )
+    return list(latest.values())
 
 
 ###########################################################
@@ -319,237 +409,677 @@ def parse_birth_beds(hv42_raw, hvs26):
 
 
 ###########################################################
-# STAGING → MAIN 병합 (bulk 기반)
+# API rows → STAGING 적재 (set 기반)
 ###########################################################
 
-def merge_staging_to_main(basic_info_map):
+# row dict 키 == ErStatusStaging 필드명 (hpid / hvdate 제외)
+STAGING_VALUE_FIELDS = [
+    "hvec", "hvs01",
+    "hv28", "hvs02",
+    "hv42", "hvs26",
+    "hv29", "hvs03",
+    "hv30", "hvs04",
+    "hv27", "hvs59",
+    "hvctayn", "hvmriayn", "hvangioayn", "hvventiayn",
+]
+
+# 이 건수 이상일 때만 LOAD DATA LOCAL INFILE 사용 (적은 건수는 multi-row INSERT 가 더 빠름)
+INFILE_MIN_ROWS = 2000
+
+
+def build_staging_rows(rows):
     """
-    ErStatusStaging 전체를 ErStatus로 병합.
-    - 기존 레코드는 bulk_update
-    - 신규 레코드는 bulk_create
-    - 단, 병합 시작 시 MAIN 전체 삭제 → 항상 최신 스냅샷만 유지
+    API rows → (hpid, hvdate) 중복 제거 + ErInfo 에 등록된 hpid 만 남긴 row 리스트.
+    ErInfo 조회는 hpid 집합으로 1번만 한다.
     """
-    print("[MERGE] STAGING → MAIN 병합 시작…")
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault((row["hpid"], row["hvdate"]), row)
 
-    # 1) Staging 전체 로드 (select_related로 hospital join)
-    staging_list = list(
-        ErStatusStaging.objects.select_related("hospital")
+    known_hpids = set(
+        ErInfo.objects
+        .filter(hpid__in={hpid for hpid, _ in unique_rows})
+        .values_list("hpid", flat=True)
     )
-    if not staging_list:
-        print("[MERGE] STAGING 데이터가 없습니다.")
-        return
 
-    # 1.5) STAGING 중복 제거 (er_id, hvdate 기준)
-    unique_map = {}
-    for st in staging_list:
-        key = (st.hospital.er_id, st.hvdate)
-        if key not in unique_map:
-            unique_map[key] = st
+    return [row for (hpid, _), row in unique_rows.items() if hpid in known_hpids]
 
-    staging_list = list(unique_map.values())
-    print(f"[MERGE] 중복 제거 후 STAGING 개수: {len(staging_list)}")
 
-    # 최신 스냅샷만 유지: MAIN 전체 삭제
-    ErStatus.objects.all().delete()
-    print("[MERGE] 기존 MAIN 전체 삭제 완료")
+def _bulk_insert_staging(rows):
+    """단일 multi-row INSERT (batch_size 미지정 → DB 백엔드 최대 크기로 묶음)"""
+    ErStatusStaging.objects.bulk_create([
+        ErStatusStaging(
+            hospital_id=row["hpid"],
+            hvdate=row["hvdate"],
+            **{f: row.get(f) for f in STAGING_VALUE_FIELDS},
+        )
+        for row in rows
+    ])
+
+
+def _load_staging_infile(rows):
+    """MySQL LOAD DATA LOCAL INFILE 경로 (DB_LOCAL_INFILE=1 필요)"""
+    meta = ErStatusStaging._meta
+    columns = [
+        meta.get_field("hospital").column,
+        meta.get_field("hvdate").column,
+        *(meta.get_field(f).column for f in STAGING_VALUE_FIELDS),
+    ]
+
+    def to_cell(value):
+        # LOAD DATA 기본 규칙: NULL → \N, 역슬래시/탭/개행은 역슬래시로 이스케이프
+        if value is None:
+            return r"\N"
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+        )
 
-    er_ids = {st.hospital.er_id for st in staging_list}
-    hvdates = {st.hvdate for st in staging_list}
-    hpids = {st.hospital.hpid for st in staging_list}
+    with tempfile.NamedTemporaryFile("w", suffix=".tsv", encoding="utf-8") as fp:
+        for row in rows:
+            cells = [
+                row["hpid"],
+                connection.ops.adapt_datetimefield_value(row["hvdate"]),
+                *(row.get(f) for f in STAGING_VALUE_FIELDS),
+            ]
+            fp.write("\t".join(to_cell(v) for v in cells) + "\n")
+        fp.flush()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {meta.db_table} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})",
+                [fp.name],
+            )
 
-    print(f"[MERGE] 대상 병원 수: {len(er_ids)}, hvdate 수: {len(hvdates)}")
 
-    existing_qs = ErStatus.objects.filter(
-        er_id__in=er_ids,
-        hvdate__in=hvdates,
-    ).select_related("er")
+def load_staging(rows, use_infile=False):
+    """
+    STAGING 전체 교체.
+    - hpid 존재 확인은 set 기반 1쿼리, INSERT 는 multi-row 1번
+    - use_infile=True + MySQL + 대량이면 LOAD DATA LOCAL INFILE 사용 (실패 시 INSERT 로 대체)
+    반환: 적재 건수
+    """
+    staging_rows = build_staging_rows(rows)
 
-    existing_map = {
-        (obj.er_id, obj.hvdate): obj
-        for obj in existing_qs
+    ErStatusStaging.objects.all().delete()
+    if not staging_rows:
+        return 0
+
+    if use_infile and connection.vendor == "mysql" and len(staging_rows) >= INFILE_MIN_ROWS:
+        try:
+            with transaction.atomic():
+                _load_staging_infile(staging_rows)
+            print(f"[STAGING] LOAD DATA LOCAL INFILE 사용: {len(staging_rows)}건")
+            return len(staging_rows)
+        except Exception as e:
+            print(f"[STAGING][WARN] LOAD DATA 실패 → INSERT 로 대체: {e}")
+
+    _bulk_insert_staging(staging_rows)
+    return len(staging_rows)
+
+
+###########################################################
+# STAGING → MAIN 병합 (bulk 기반)
+###########################################################
+
+# ErStatus / ErLatestStatus 공통 병상·장비 컬럼
+STATUS_FIELDS = [
+    "er_general_available",
+    "er_general_total",
+    "er_child_available",
+    "er_child_total",
+    "birth_available",
+    "birth_total",
+    "negative_pressure_available",
+    "negative_pressure_total",
+    "isolation_general_available",
+    "isolation_general_total",
+    "isolation_cohort_available",
+    "isolation_cohort_total",
+    "has_ct",
+    "has_mri",
+    "has_angio",
+    "has_ventilator",
+]
+
+
+def status_content_hash(values):
+    """병상·장비 값(STATUS_FIELDS 순서) → md5 hex. 값이 같으면 해시도 같다"""
+    raw = json.dumps([values.get(f) for f in STATUS_FIELDS], separators=(",", ":"))
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def row_to_status_values(row):
+    """API row(또는 STAGING 값) dict → ErStatus 병상·장비 컬럼 값 dict"""
+    # 분만실 available/total 계산
+    birth_available, birth_total = parse_birth_beds(row.get("hv42"), row.get("hvs26"))
+
+    return {
+        "er_general_available": row.get("hvec"),
+        "er_general_total": row.get("hvs01"),
+
+        "er_child_available": row.get("hv28"),
+        "er_child_total": row.get("hvs02"),
+
+        "birth_available": birth_available,
+        "birth_total": birth_total,
+
+        "negative_pressure_available": row.get("hv29"),
+        "negative_pressure_total": row.get("hvs03"),
+
+        "isolation_general_available": row.get("hv30"),
+        "isolation_general_total": row.get("hvs04"),
+
+        "isolation_cohort_available": row.get("hv27"),
+        "isolation_cohort_total": row.get("hvs59"),
+
+        "has_ct": yn_to_bool(row.get("hvctayn")),
+        "has_mri": yn_to_bool(row.get("hvmriayn")),
+        "has_angio": yn_to_bool(row.get("hvangioayn")),
+        "has_ventilator": yn_to_bool(row.get("hvventiayn")),
     }
 
-    print(f"[MERGE] 기존 MAIN 레코드 수(삭제 후): {len(existing_map)}")
 
-    to_create = []
-    to_update = []
+def staging_to_status_values(st):
+    """STAGING 1행 → ErStatus 병상·장비 컬럼 값 dict"""
+    return row_to_status_values({f: getattr(st, f) for f in STAGING_VALUE_FIELDS})
 
-    # 3) 병합 로직
-    for st in staging_list:
-        key = (st.hospital.er_id, st.hvdate)
+def sync_latest_status(status_objs):
+    """
+    변경된 ErStatus 객체들로 ErLatestStatus(병원당 1행)를 갱신한다.
+    - 병원별 가장 최근 hvdate 1건만 반영
+    - 이번 수집에 없는 병원의 행은 그대로 유지 (ErStatus 와 동일)
+    - 저장된 hvdate 보다 오래된 값은 덮어쓰지 않음 (오래된 응답이 최신 값을 되돌리지 않도록)
+    - hvdate 가 같으면 값이 실제로 바뀐 경우(같은 시각 정정)만 반영
+    반환: 저장한 ErLatestStatus 객체 리스트
+    """
+    latest_map = {}
+    for obj in status_objs:
+        if obj.hvdate is None:
+            continue
+        current = latest_map.get(obj.er_id)
+        if current is None or obj.hvdate > current.hvdate:
+            latest_map[obj.er_id] = obj
 
-        # 기본정보 API 캐시에서 분만실 시설 유무 (보조 정보)
-        basic = basic_info_map.get(st.hospital.hpid, {}) or {}
-        obst_raw = (
-            basic.get("dutyObstYn")
-            or basic.get("hperyn")
-            or basic.get("dutyHayn")
+    if not latest_map:
+        print("[LATEST] 변경된 병원이 없습니다.")
+        return []
+
+    # 기존 값 (변경된 컬럼 계산용 → 실시간 전송 / SSE 에서 사용)
+    existing_map = {
+        row["er_id"]: row
+        for row in (
+            ErLatestStatus.objects
+            .filter(er_id__in=latest_map.keys())
+            .values("er_id", "hvdate", *STATUS_FIELDS)
         )
-        obst_bool = yn_to_bool(obst_raw)
+    }
 
-        # 분만실 available/total 계산
-        birth_available, birth_total = parse_birth_beds(st.hv42, st.hvs26)
+    now = timezone.now()
+    to_create = []
+    to_update = []
 
-        if key in existing_map:
-            # (이론상 거의 없음, 구조 유지용)
-            obj = existing_map[key]
+    outdated = 0
+    for er_id, obj in latest_map.items():
+        previous = existing_map.get(er_id)
+        if (
+            previous is not None
+            and previous["hvdate"] is not None
+            and obj.hvdate < previous["hvdate"]
+        ):
+            outdated += 1
+            continue
 
-            obj.er_general_available = st.hvec
-            obj.er_general_total = st.hvs01
+        latest = ErLatestStatus(
+            er_id=er_id,
+            hvdate=obj.hvdate,
+            updated_at=now,
+            **{f: getattr(obj, f) for f in STATUS_FIELDS},
+        )
+        latest.capability_mask = capability_mask(latest)
 
-            obj.er_child_available = st.hv28
-            obj.er_child_total = st.hvs02
+        latest.changed_fields = {
+            f: getattr(latest, f)
+            for f in STATUS_FIELDS
+            if previous is None or previous[f] != getattr(latest, f)
+        }
 
-            obj.birth_available = birth_available
-            obj.birth_total = birth_total
+        if previous is not None:
+            if previous["hvdate"] == latest.hvdate and not latest.changed_fields:
+                continue
+            to_update.append(latest)
+        else:
+            to_create.append(latest)
 
-            obj.negative_pressure_available = st.hv29
-            obj.negative_pressure_total = st.hvs03
+    if to_create:
+        ErLatestStatus.objects.bulk_create(to_create, batch_size=400)
+    if to_update:
+        ErLatestStatus.objects.bulk_update(
+            to_update, ["hvdate", "updated_at", "capability_mask", *STATUS_FIELDS], batch_size=400
+        )
 
-            obj.isolation_general_available = st.hv30
-            obj.isolation_general_total = st.hvs04
+    print(
+        f"[LATEST] 최신 상태 갱신 - 신규 {len(to_create)}건 / "
+        f"갱신 {len(to_update)}건 / 오래된 hvdate 건너뜀 {outdated}건"
+    )
+    return to_create + to_update
 
-            obj.isolation_cohort_available = st.hv27
-            obj.isolation_cohort_total = st.hvs59
+def after_merge_commit(latest_rows, publish=True):
+    """
+    병합 커밋 후 바뀐 병원들에 대해
+    - 카드 병상 그래프 HTML 미리 렌더링 (fragments)
+    - 상세 모달 번들 다시 만들기 (detail_bundle)
+    - 브라우저로 변경분 전송 (realtime, Channels) - publish=False(재생 반영)면 생략
+    """
+    cells_map = warm_status_fragments(latest_rows)
+    print(f"[FRAGMENT] 병상 그래프 {len(cells_map)}건 미리 렌더링")
 
-            obj.has_ct = yn_to_bool(st.hvctayn)
-            obj.has_mri = yn_to_bool(st.hvmriayn)
-            obj.has_angio = yn_to_bool(st.hvangioayn)
-            obj.has_ventilator = yn_to_bool(st.hvventiayn)
+    refreshed = refresh_detail_bundles([row.er_id for row in latest_rows])
+    print(f"[DETAIL] 상세 번들 {refreshed}건 갱신")
 
-            to_update.append(obj)
-        else:
-            obj = ErStatus(
-                er=st.hospital,
-                hvdate=st.hvdate,
+    if not publish:
+        return
 
-                er_general_available=st.hvec,
-                er_general_total=st.hvs01,
+    sent = publish_status_changes(latest_rows, cells_map)
+    print(f"[REALTIME] 변경 {len(latest_rows)}건 / 그룹 메시지 {sent}건 전송")
 
-                er_child_available=st.hv28,
-                er_child_total=st.hvs02,
+def merge_status_values(values_map, publish=True):
+    """
+    {(er_id, hvdate): 병상·장비 값 dict} 를 ErStatus 로 증분 병합.
+    - 병원별 현재 행과 병상·장비 값 해시(content_hash)를 비교
+    - 값이 바뀐 행만 bulk_update, 새 (er_id, hvdate) 는 bulk_create
+    - 병원별로 이번 수집의 가장 최근 hvdate 1건만 반영하고,
+      저장된 행보다 오래된 hvdate(늦게 도착한 지역 응답 / 재수집 / 재생)는 건너뜀
+    - 같은 병원의 더 오래된 hvdate 행만 삭제 → 병원당 최신 스냅샷만 유지
+    - 이번 수집에 없는 병원(지역 호출 실패 등)의 행은 건드리지 않음
+    반환: 변경(신규+갱신)된 ErStatus 객체 리스트
+    """
+    er_ids = {er_id for er_id, _ in values_map}
+    print(f"[MERGE] 대상 병원 수: {len(er_ids)}")
 
-                birth_available=birth_available,
-                birth_total=birth_total,
+    # 1) 대상 병원의 현재 MAIN 행 (비교에 필요한 컬럼만)
+    existing_map = {
+        (er_id, hvdate): (pk, content_hash)
+        for pk, er_id, hvdate, content_hash in (
+            ErStatus.objects
+            .filter(er_id__in=er_ids)
+            .values_list("id", "er_id", "hvdate", "content_hash")
+        )
+    }
+    print(f"[MERGE] 비교 대상 MAIN 레코드 수: {len(existing_map)}")
+
+    # 1.5) 병원별 반영할 hvdate: 이번 수집의 최신값, 단 저장된 최신값보다 오래되면 반영 안 함
+    stored_latest = {}
+    for er_id, hvdate in existing_map:
+        if hvdate is not None and (er_id not in stored_latest or hvdate > stored_latest[er_id]):
+            stored_latest[er_id] = hvdate
+
+    incoming_latest = {}
+    for er_id, hvdate in values_map:
+        if hvdate is not None and (er_id not in incoming_latest or hvdate > incoming_latest[er_id]):
+            incoming_latest[er_id] = hvdate
+
+    accepted = {
+        er_id: hvdate
+        for er_id, hvdate in incoming_latest.items()
+        if er_id not in stored_latest or hvdate >= stored_latest[er_id]
+    }
 
-                negative_pressure_available=st.hv29,
-                negative_pressure_total=st.hvs03,
+    to_create = []
+    to_update = []
+    unchanged = 0
+    outdated = 0
 
-                isolation_general_available=st.hv30,
-                isolation_general_total=st.hvs04,
+    # 2) 병합 로직: 해시가 같으면 건너뜀
+    for (er_id, hvdate), values in values_map.items():
+        if hvdate is None or accepted.get(er_id) != hvdate:
+            outdated += 1
+            continue
 
-                isolation_cohort_available=st.hv27,
-                isolation_cohort_total=st.hvs59,
+        content_hash = status_content_hash(values)
 
-                has_ct=yn_to_bool(st.hvctayn),
-                has_mri=yn_to_bool(st.hvmriayn),
-                has_angio = yn_to_bool(st.hvangioayn),
-                has_ventilator=yn_to_bool(st.hvventiayn),
-            )
-            to_create.append(obj)
+        if (er_id, hvdate) in existing_map:
+            pk, current_hash = existing_map[(er_id, hvdate)]
+            if current_hash == content_hash:
+                unchanged += 1
+                continue
 
-    # 4) bulk_create / bulk_update 실행
+            to_update.append(ErStatus(
+                id=pk,
+                er_id=er_id,
+                hvdate=hvdate,
+                content_hash=content_hash,
+                **values,
+            ))
+        else:
+            to_create.append(ErStatus(
+                er_id=er_id,
+                hvdate=hvdate,
+                content_hash=content_hash,
+                **values,
+            ))
+
+    # 3) 같은 병원의 이전 hvdate 행 삭제 (이번에 반영한 hvdate 보다 오래된 행만)
+    stale_ids = [
+        pk for (er_id, hvdate), (pk, _) in existing_map.items()
+        if er_id in accepted and (hvdate is None or hvdate < accepted[er_id])
+    ]
+    if stale_ids:
+        ErStatus.objects.filter(id__in=stale_ids).delete()
+
+    # 4) bulk_create / bulk_update 실행 (바뀐 행만)
     if to_create:
         ErStatus.objects.bulk_create(to_create, batch_size=400)
-        print(f"[MERGE] 신규 생성: {len(to_create)}건")
 
     if to_update:
-        fields = [
-            "er_general_available",
-            "er_general_total",
-            "er_child_available",
-            "er_child_total",
-            "birth_available",
-            "birth_total",
-            "negative_pressure_available",
-            "negative_pressure_total",
-            "isolation_general_available",
-            "isolation_general_total",
-            "isolation_cohort_available",
-            "isolation_cohort_total",
-            "has_ct",
-            "has_mri",
-            "has_angio",
-            "has_ventilator",
-        ]
-        ErStatus.objects.bulk_update(to_update, fields, batch_size=400)
-        print(f"[MERGE] 기존 업데이트: {len(to_update)}건")
+        ErStatus.objects.bulk_update(
+            to_update, [*STATUS_FIELDS, "content_hash"], batch_size=400
+        )
+
+    print(
+        f"[MERGE] 변경 {len(to_create) + len(to_update)}건 "
+        f"(신규 {len(to_create)} / 갱신 {len(to_update)}) / "
+        f"변경 없음 {unchanged}건 / 이전 hvdate 삭제 {len(stale_ids)}건 / "
+        f"오래된 hvdate 건너뜀 {outdated}건"
+    )
 
     total = ErStatus.objects.count()
     print(f"[MAIN] 병합 완료 - 총 {total}개 저장됨")
 
+    changed = to_create + to_update
 
+    # 5) 병원별 최신 상태 테이블 갱신 (목록 화면 조회용, 바뀐 병원만)
+    latest_rows = sync_latest_status(changed)
 
-###########################################################
-# 메인 Command
-###########################################################
+    # 5-1) 병상 값이 실제로 바뀐 병원만 변경 이력에 추가 (같은 트랜잭션)
+    history_count = append_status_history(latest_rows)
+    if history_count:
+        print(f"[HISTORY] 병상 변경 이력 {history_count}건 추가")
 
-class Command(BaseCommand):
-    help = "실시간 병상 데이터 → staging → main 병합 (최적화 버전)"
+    # 6) 커밋 후 스냅샷 버전 갱신 → 웹 프로세스의 점수 계산 배열 등이 새 데이터로 다시 만들어짐
+    if changed or stale_ids:
+        transaction.on_commit(bump_snapshot_version)
 
-    @transaction.atomic
-    def handle(self, *args, **options):
+    # 7) 커밋 후 화면용 캐시 갱신 + 실시간 전송 (바뀐 병원만)
+    if latest_rows:
+        transaction.on_commit(lambda: after_merge_commit(latest_rows, publish=publish))
 
-        # 1) 실시간 병상 데이터 A API 수집 (지역 병렬 호출)
-        rows_A = parse_api_A(max_workers=8)
+    return changed
 
-        # 2) STAGING 초기화 후 INSERT (bulk_create)
-        ErStatusStaging.objects.all().delete()
-        staging_bulk = []
-        seen = set()
 
-        for row in rows_A:
-            key = (row["hpid"], row["hvdate"])
-            if key in seen:
-                continue
-            seen.add(key)
+def merge_rows_direct(rows, publish=True):
+    """
+    API rows 를 STAGING 없이 바로 ErStatus 로 병합 (기본 경로).
+    - (hpid, hvdate) 중복 제거 (먼저 나온 row 유지, build_staging_rows 와 같은 규칙)
+    - hpid → er_id 는 ErInfo 1쿼리 (등록되지 않은 병원은 제외)
+    - 분만실 병상 / Y·N 장비 값은 메모리에서 변환
+    반환: 변경(신규+갱신)된 ErStatus 객체 리스트
+    """
+    print("[MERGE] API rows → MAIN 직접 병합 시작…")
 
-            try:
-                er = ErInfo.objects.get(hpid=row["hpid"])
-            except ErInfo.DoesNotExist:
-                continue
+    unique_rows = {}
+    for row in rows:
+        unique_rows.setdefault((row["hpid"], row["hvdate"]), row)
 
-            staging_bulk.append(
-                ErStatusStaging(
-                    hospital=er,
-                    hvdate=row["hvdate"],
+    er_id_map = dict(
+        ErInfo.objects
+        .filter(hpid__in={hpid for hpid, _ in unique_rows})
+        .values_list("hpid", "er_id")
+    )
 
-                    hvec=row["hvec"],
-                    hvs01=row["hvs01"],
+    values_map = {}
+    for (hpid, hvdate), row in unique_rows.items():
+        er_id = er_id_map.get(hpid)
+        if er_id is None:
+            continue
+        values_map.setdefault((er_id, hvdate), row_to_status_values(row))
 
-                    hv28=row["hv28"],
-                    hvs02=row["hvs02"],
+    print(f"[MERGE] 중복 제거 후 대상 행 수: {len(values_map)}")
+    if not values_map:
+        print("[MERGE] 등록된 병원의 데이터가 없습니다.")
+        return []
 
-                    hv42=row.get("hv42"),
-                    hvs26=row["hvs26"],
+    return merge_status_values(values_map, publish=publish)
+
+
+def replay_preview(rows):
+    """
+    --replay 기본(반영 없음) 결과 요약: 병원별 최신 hvdate 를 ErLatestStatus 와 비교.
+    반환: {"newer", "same", "older", "unknown"} 병원 수
+    """
+    incoming = {}
+    for row in rows:
+        current = incoming.get(row["hpid"])
+        if current is None or row["hvdate"] > current:
+            incoming[row["hpid"]] = row["hvdate"]
+
+    stored = dict(
+        ErLatestStatus.objects
+        .filter(er__hpid__in=incoming.keys())
+        .values_list("er__hpid", "hvdate")
+    )
+    known = set(
+        ErInfo.objects
+        .filter(hpid__in=incoming.keys())
+        .values_list("hpid", flat=True)
+    )
+
+    counts = {"newer": 0, "same": 0, "older": 0, "unknown": 0}
+    for hpid, hvdate in incoming.items():
+        if hpid not in known:
+            counts["unknown"] += 1
+        elif stored.get(hpid) is None or hvdate > stored[hpid]:
+            counts["newer"] += 1
+        elif hvdate == stored[hpid]:
+            counts["same"] += 1
+        else:
+            counts["older"] += 1
+    return counts
+
+
+def merge_staging_to_main(publish=True):
+    """
+    ErStatusStaging 전체를 ErStatus로 증분 병합 (--audit-staging 경로).
+    반환: 변경(신규+갱신)된 ErStatus 객체 리스트
+    """
+    print("[MERGE] STAGING → MAIN 증분 병합 시작…")
+
+    # 1) Staging 전체 로드 (select_related로 hospital join)
+    staging_list = list(
+        ErStatusStaging.objects.select_related("hospital")
+    )
+    if not staging_list:
+        print("[MERGE] STAGING 데이터가 없습니다.")
+        return []
+
+    # 1.5) STAGING 중복 제거 (er_id, hvdate 기준)
+    values_map = {}
+    for st in staging_list:
+        key = (st.hospital.er_id, st.hvdate)
+        if key not in values_map:
+            values_map[key] = staging_to_status_values(st)
+
+    print(f"[MERGE] 중복 제거 후 STAGING 개수: {len(values_map)}")
+
+    return merge_status_values(values_map, publish=publish)
 
-                    hv29=row["hv29"],
-                    hvs03=row["hvs03"],
 
-                    hv30=row["hv30"],
-                    hvs04=row["hvs04"],
 
-                    hv27=row["hv27"],
-                    hvs59=row["hvs59"],
+###########################################################
+# 메인 Command
+###########################################################
 
-                    hvctayn=row["hvctayn"],
-                    hvmriayn=row["hvmriayn"],
-                    hvangioayn=row["hvangioayn"],
-                    hvventiayn=row["hvventiayn"],
-                )
+class Command(BaseCommand):
+    help = "실시간 병상 데이터 → main 병합 (--audit-staging 이면 staging 경유)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=DEFAULT_RATE_PER_SEC, help="초당 최대 요청 수"
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=DEFAULT_TIMEOUT, help="요청 1건 타임아웃(초)"
+        )
+        parser.add_argument(
+            "--retries", type=int, default=DEFAULT_RETRIES, help="5xx/타임아웃 재시도 횟수"
+        )
+        parser.add_argument(
+            "--load-infile",
+            action="store_true",
+            help="대량 STAGING 적재에 LOAD DATA LOCAL INFILE 사용 (MySQL, DB_LOCAL_INFILE=1)",
+        )
+        parser.add_argument(
+            "--audit-staging",
+            action="store_true",
+            default=MERGE_AUDIT_STAGING,
+            help="API rows 를 STAGING 에도 적재하고 STAGING 에서 병합 (기본: 메모리에서 바로 병합)",
+        )
+        parser.add_argument(
+            "--full-sweep",
+            action="store_true",
+            help="적응형 폴링 등급과 무관하게 모든 지역 호출",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=FETCH_MODES,
+            default=FETCH_MODE,
+            help="region: 시군구별 호출(적응형) / nationwide: 전국 페이지 조회",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=NATIONWIDE_PAGE_SIZE,
+            help="nationwide 모드 1페이지 행 수(numOfRows)",
+        )
+        parser.add_argument(
+            "--replay",
+            metavar="RUN_ID",
+            help=(
+                "보관된 원본 응답(raw_archive)을 다시 파싱 (네트워크 호출 없음). "
+                "기본은 DB 에 반영하지 않고 저장된 값과 비교만 출력"
+            ),
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help=(
+                "--replay 결과를 DB 에 반영 (저장된 값보다 최신 hvdate 만, "
+                "실시간 전송 없음)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        fetcher_options = {
+            "concurrency": options["concurrency"],
+            "rate_per_sec": options["rate"],
+            "timeout": options["timeout"],
+            "retries": options["retries"],
+            # -v 2 이상일 때만 요청 URL / 응답 앞부분 디버그 출력
+            "verbose": options["verbosity"] >= 2,
+        }
+        replay = options["replay"]
+        if options["apply"] and not replay:
+            raise CommandError("--apply 는 --replay 와 함께만 사용할 수 있습니다.")
+        nationwide = options["mode"] == "nationwide"
+        page_size = options["page_size"]
+        archive = None
+        plan = None
+        if replay:
+            # 보관된 run 의 지역(또는 페이지)을 그대로 재생 (응답 지문 / 폴링 등급 무시)
+            fetcher = ArchiveReplayFetcher(replay)
+            if nationwide:
+                # 페이지 키가 같도록 보관 당시의 numOfRows 사용
+                page_size = int(fetcher.params(BASE_URL_A, "page:1").get("numOfRows", page_size))
+            else:
+                plan = plan_region_polls(fetcher.regions(BASE_URL_A), force_full=True)
+            print(f"[REPLAY] {replay} 재생 ({options['mode']})")
+        elif nationwide:
+            archive = RawArchive.start("fetch_emergency")
+            fetcher = PooledOpenApiFetcher(**fetcher_options, archive=archive)
+        else:
+            # 0) 이번 회차에 호출할 지역 선택 (지역별 변경률 등급 + 전체 수집 주기)
+            plan = plan_region_polls(all_regions(), force_full=options["full_sweep"])
+            archive = RawArchive.start("fetch_emergency")
+            fetcher = PooledOpenApiFetcher(**fetcher_options, archive=archive)
+
+        # 네트워크 호출은 트랜잭션 밖에서, DB 반영만 트랜잭션 안에서
+        started = time.perf_counter()
+        try:
+            with fetcher:
+                # 1) 실시간 병상 데이터 A API 수집 (지역별 또는 전국 페이지 병렬 호출)
+                if nationwide:
+                    rows_A = parse_api_A_nationwide(fetcher, page_size)
+                else:
+                    rows_A = parse_api_A(fetcher, plan)
+        finally:
+            if archive is not None:
+                archive.close()
+        fetched = time.perf_counter()
+
+        if replay and not options["apply"]:
+            counts = replay_preview(rows_A)
+            print(
+                f"[REPLAY] 반영 안 함 (--apply 로 반영) - 행 {len(rows_A)}건 / 병원별 최신 hvdate: "
+                f"저장된 값보다 최신 {counts['newer']} / 같음 {counts['same']} / "
+                f"오래됨 {counts['older']} / 미등록 {counts['unknown']}"
+            )
+            print(f"[TIME] 재생+파싱 {fetched - started:.2f}s")
+            return
+
+        if rows_A:
+            self.save_and_merge(
+                rows_A,
+                audit_staging=options["audit_staging"],
+                use_infile=options["load_infile"],
+                # 재생 반영은 브라우저로 전송하지 않음 (화면 캐시만 갱신)
+                publish=not replay,
             )
+        else:
+            print("[MERGE] 새로 반영할 응답이 없어 STAGING / 병합을 건너뜁니다.")
+        merged = time.perf_counter()
 
-        if staging_bulk:
-            ErStatusStaging.objects.bulk_create(staging_bulk, batch_size=400)
-        print(f"[STAGING] 저장 완료: {len(staging_bulk)}건")
+        print(
+            f"[TIME] 수집+파싱 {fetched - started:.2f}s / "
+            f"{'STAGING+' if options['audit_staging'] else ''}병합 {merged - fetched:.2f}s / "
+            f"행 {len(rows_A)}건"
+        )
 
-        # 3) 기본정보 API 병렬 호출 + 캐싱
-        hpids = (
-            ErStatusStaging.objects
-            .values_list("hospital__hpid", flat=True)
-            .distinct()
+        # 재생은 운영 폴링 상태 / 응답 지문을 바꾸지 않음
+        if replay:
+            return
+
+        if nationwide:
+            # 전국 조회로 반영된 값과 지역별 응답 지문이 어긋나지 않도록 지문을 비움
+            # (다음 region 모드 회차는 모든 지역 응답을 다시 반영)
+            forget_payloads(all_regions())
+            return
+
+        # 5) 지역별 폴링 상태 갱신 (병합이 끝난 뒤에 기록)
+        tiers = record_region_polls(plan)
+        print(
+            "[POLL] 지역 등급 - "
+            + " / ".join(f"{tier} {count}" for tier, count in sorted(tiers.items()))
         )
-        basic_info_map = build_basic_info_map(hpids, max_workers=8)
+
+    @transaction.atomic
+    def save_and_merge(self, rows_A, audit_staging=False, use_infile=False, publish=True):
+
+        if not audit_staging:
+            # 3) 중복 제거 / 값 변환을 메모리에서 하고 MAIN 에 바로 병합 (STAGING 왕복 없음)
+            merge_rows_direct(rows_A, publish=publish)
+            return
+
+        # 3) STAGING 초기화 후 적재 (hpid 확인 1쿼리 + multi-row INSERT)
+        staged = load_staging(rows_A, use_infile=use_infile)
+        print(f"[STAGING] 저장 완료: {staged}건")
 
         # 4) STAGING → MAIN bulk 병합
-        merge_staging_to_main(basic_info_map)
\ No newline at end of file
+        merge_staging_to_main(publish=publish)
\ No newline at end of file
@@ -1,81 +1,58 @@
-import requests
-import xmltodict
+import time
 from datetime import datetime
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Max
 from django.conf import settings
 from django.utils import timezone
 
 from apps.db.models.emergency import ErInfo, ErMessage
+from apps.emergency.detail_bundle import refresh_detail_bundles
+from apps.services.raw_archive import ArchiveReplayFetcher, RawArchive
+from apps.services.openapi_fetcher import (
+    PooledOpenApiFetcher,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+)
+from apps.services.xml_stream import convert_items
 
 
 API_KEY = settings.OPENAPI_SERVICE_KEY
 
-# ---------------------------------------------------------
-# 공통 요청 함수
-# ---------------------------------------------------------
-def fetch_api(url, params):
-    params["serviceKey"] = API_KEY
+MESSAGE_URL = (
+    "https://apis.data.go.kr/B552657/ErmctInfoInqireService/"
+    "getEmrrmSrsillDissMsgInqire"
+)
 
-    try:
-        response = requests.get(url, params=params, timeout=10)
-    except Exception as e:
-        print(f"[ERROR] 요청 실패: {e}")
-        return None
 
-    if response.status_code != 200:
-        print(f"[ERROR] API 상태 코드: {response.status_code}")
-        return None
+def message_params(hpid):
+    return {
+        "pageNo": 1,
+        "numOfRows": 50,
+        "HPID": hpid,     # 핵심: HPID만 사용
+        "serviceKey": API_KEY,
+    }
 
-    try:
-        data = xmltodict.parse(response.text)
-    except Exception:
-        print("[ERROR] XML 파싱 실패")
-        return None
 
-    return data
+def parse_response(response):
+    """PooledOpenApiFetcher 용 파서 (워커 스레드에서 호출, item 을 읽는 대로 메시지 dict 로 변환)"""
+    return convert_items(response.raw, items_to_messages)
 
 
 # ---------------------------------------------------------
 # 메시지 API 데이터 파싱 (최적화 버전)
 # ---------------------------------------------------------
-def request_message_api(hpid):
+def items_to_messages(items):
     """
-    HPID만 사용해서 메시지 조회 → 실제 데이터가 가장 잘 나오는 방식.
+    메시지 API item(리스트 또는 iter_items 제너레이터) → 메시지 dict 리스트
+    (HPID만 사용해서 조회 → 실제 데이터가 가장 잘 나오는 방식)
     """
-
-    url = (
-        "https://apis.data.go.kr/B552657/ErmctInfoInqireService/"
-        "getEmrrmSrsillDissMsgInqire"
-    )
-
-    params = {
-        "pageNo": 1,
-        "numOfRows": 50,
-        "HPID": hpid,     # 핵심: HPID만 사용
-    }
-
-    raw = fetch_api(url, params)
-    if not raw:
-        return []
-
-    body = raw.get("response", {}).get("body", {})
-    items = body.get("items")
-    if not items:
-        return []
-
-    item = items.get("item")
-    if not item:
-        return []
-
-    # item이 dict이면 list로 변환
-    if isinstance(item, dict):
-        item = [item]
-
     parsed = []
 
-    for it in item:
+    for it in items:
 
         # -------- 핵심 필드 --------
         msg_text = it.get("symBlkMsg")
@@ -115,53 +92,155 @@ def request_message_api(hpid):
 class Command(BaseCommand):
     help = "응급실 메시지 (병원별 최신 1건만 저장)"
 
-    @transaction.atomic
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=DEFAULT_RATE_PER_SEC, help="초당 최대 요청 수"
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=DEFAULT_TIMEOUT, help="요청 1건 타임아웃(초)"
+        )
+        parser.add_argument(
+            "--retries", type=int, default=DEFAULT_RETRIES, help="5xx/타임아웃 재시도 횟수"
+        )
+        parser.add_argument(
+            "--replay",
+            metavar="RUN_ID",
+            help=(
+                "보관된 원본 응답(raw_archive)을 다시 파싱 (네트워크 호출 없음). "
+                "기본은 DB 에 저장하지 않고 저장된 메시지와 비교만 출력"
+            ),
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="--replay 결과를 DB 에 저장 (기존 메시지보다 최신인 것만)",
+        )
+
     def handle(self, *args, **options):
 
         print("[1] 메시지 수집 시작…")
 
-        hospital_qs = ErInfo.objects.all()
-
-        total_insert = 0
-        total_update = 0
-
-        for hos in hospital_qs:
-            hpid = hos.hpid
-
-            rows = request_message_api(hpid)
+        hpid_to_er = dict(ErInfo.objects.values_list("hpid", "er_id"))
+
+        # 1) 병원별 메시지 API 병렬 호출 (트랜잭션 밖)
+        fetcher_options = {
+            "concurrency": options["concurrency"],
+            "rate_per_sec": options["rate"],
+            "timeout": options["timeout"],
+            "retries": options["retries"],
+            "verbose": options["verbosity"] >= 2,
+        }
+        replay = options["replay"]
+        if options["apply"] and not replay:
+            raise CommandError("--apply 는 --replay 와 함께만 사용할 수 있습니다.")
+        archive = None
+        if replay:
+            fetcher = ArchiveReplayFetcher(replay)
+            print(f"[REPLAY] {replay} 재생")
+        else:
+            archive = RawArchive.start("fetch_emergency_message")
+            fetcher = PooledOpenApiFetcher(**fetcher_options, archive=archive)
+
+        started = time.perf_counter()
+        try:
+            with fetcher:
+                results = fetcher.fetch_all(
+                    [(hpid, MESSAGE_URL, message_params(hpid)) for hpid in hpid_to_er],
+                    parse_response,
+                )
+                fetcher.print_stats("[MSG]")
+        finally:
+            if archive is not None:
+                archive.close()
+        fetched = time.perf_counter()
+
+        # 2) 병원별 최신 메시지 1건만 메모리에 모음
+        latest_map = {}
+        for hpid, rows in results.items():
+            # rows: 워커 스레드에서 이미 변환된 메시지 dict 리스트 (실패 시 None)
             if not rows:
                 continue
+            latest_map[hpid_to_er[hpid]] = max(rows, key=lambda x: x["message_time"])
+
+        if replay and not options["apply"]:
+            stored = dict(
+                ErMessage.objects
+                .filter(hospital_id__in=latest_map.keys())
+                .values("hospital_id")
+                .annotate(last=Max("message_time"))
+                .values_list("hospital_id", "last")
+            )
+            newer = sum(
+                1 for er_id, latest in latest_map.items()
+                if stored.get(er_id) is None or latest["message_time"] > stored[er_id]
+            )
+            print(
+                f"[REPLAY] 저장 안 함 (--apply 로 저장) - 병원 {len(latest_map)}곳 / "
+                f"저장된 메시지보다 최신 {newer}곳"
+            )
+            return
+
+        # 3) 변경분만 한 번에 반영 (짧은 트랜잭션)
+        total_insert, total_update = self.save_messages(latest_map)
 
-            # 최신순 정렬 (message_time 내림차순)
-            rows.sort(key=lambda x: x["message_time"], reverse=True)
+        print(f"[2] 신규 메시지 저장: {total_insert}건")
+        print(f"[3] 기존 메시지 갱신: {total_update}건")
+        print(
+            f"[TIME] 수집+파싱 {fetched - started:.2f}s / "
+            f"저장 {time.perf_counter() - fetched:.2f}s"
+        )
+        print("[완료] 메시지 업데이트 종료")
 
-            latest = rows[0]
+    @transaction.atomic
+    def save_messages(self, latest_map):
+        """
+        latest_map: {er_id: 최신 메시지 dict}
+        - 기존 메시지보다 최신일 때만 갱신 (병원별 1행 유지)
+        - bulk_create / bulk_update 각 1번
+        """
+        existing_map = {}
+        for msg in (
+            ErMessage.objects
+            .filter(hospital_id__in=latest_map.keys())
+            .order_by("id")
+        ):
+            existing_map.setdefault(msg.hospital_id, msg)
+
+        to_create = []
+        to_update = []
+
+        for er_id, latest in latest_map.items():
             incoming_time = latest["message_time"]
-            msg_text = latest["message"]
-            msg_type = latest.get("message_type")
-
-            existing = ErMessage.objects.filter(hospital=hos).first()
+            existing = existing_map.get(er_id)
 
             if existing:
                 # 더 최신 메시지가 아니면 skip
                 if existing.message_time and existing.message_time >= incoming_time:
                     continue
 
-                existing.message = msg_text
+                existing.message = latest["message"]
                 existing.message_time = incoming_time
-                # existing.message_type = msg_type
-                existing.save()
-                total_update += 1
-
+                to_update.append(existing)
             else:
-                ErMessage.objects.create(
-                    hospital=hos,
-                    message=msg_text,
-                    message_time=incoming_time,
-                    # message_type=msg_type,
+                to_create.append(
+                    ErMessage(
+                        hospital_id=er_id,
+                        message=latest["message"],
+                        message_time=incoming_time,
+                    )
                 )
-                total_insert += 1
 
-        print(f"[2] 신규 메시지 저장: {total_insert}건")
-        print(f"[3] 기존 메시지 갱신: {total_update}건")
-        print("[완료] 메시지 업데이트 종료")
+        if to_create:
+            ErMessage.objects.bulk_create(to_create, batch_size=400)
+        if to_update:
+            ErMessage.objects.bulk_update(to_update, ["message", "message_time"], batch_size=400)
+
+        # 커밋 후 메시지가 바뀐 응급실의 상세 모달 번들 다시 만들기
+        changed_ids = [msg.hospital_id for msg in to_create + to_update]
+        if changed_ids:
+            transaction.on_commit(lambda: refresh_detail_bundles(changed_ids))
+
+        return len(to_create), len(to_update)
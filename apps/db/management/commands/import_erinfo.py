@@ -2,6 +2,8 @@ import csv
 import os
 from django.core.management.base import BaseCommand
 from apps.db.models.emergency import ErInfo
+from apps.services.spatial_index import invalidate_index
+from apps.services.regions import backfill_regions
 
 class Command(BaseCommand):
     help = "Import ER Info from CSV (auto-detect path for home or academy)"
@@ -58,5 +60,11 @@ class Command(BaseCommand):
                     )
                 )
 
+                # 응급실 좌표가 바뀌었을 수 있으므로 공간 인덱스 재빌드 요청
+                invalidate_index("er")
+
+                # 새 지역 문자열이 들어왔을 수 있으므로 지역 기준 테이블 / FK 갱신
+                backfill_regions()
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Unexpected ERROR: {e}"))
@@ -1,6 +1,8 @@
 import requests
 from django.core.management.base import BaseCommand
 from apps.db.models.hospital import Hospital  # 경로: apps/db/models/hospital.py 기준
+from apps.services.spatial_index import invalidate_index
+from apps.services.regions import backfill_regions
 
 SERVICE_KEY = "8661f2737274c1d3578553e84076849efd87c7076b1cc5c8fe54183dae94c09c"
 
@@ -200,6 +202,12 @@ class Command(BaseCommand):
             self.style.SUCCESS(f"전체 시도 합계: {total_saved}개 병원 저장/업데이트 완료")
         )
 
+        # 병원 좌표가 바뀌었을 수 있으므로 공간 인덱스 재빌드 요청
+        invalidate_index("hospital")
+
+        # 지역 기준 테이블 / FK 갱신
+        backfill_regions()
+
     # ------------------------------------------------------------------
     # item → Hospital 저장 (필드 매핑)
     # ------------------------------------------------------------------
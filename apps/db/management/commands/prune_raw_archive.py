@@ -0,0 +1,40 @@
+# apps/db/management/commands/prune_raw_archive.py
+
+"""
+data.go.kr 원본 응답 보관소(raw_archive) 정리
+
+- --days(기본 RAW_ARCHIVE_RETENTION_DAYS) 일이 지난 수집 기록(manifest) 삭제
+- 남은 manifest 가 참조하지 않는 응답 파일 삭제
+- run_scheduler 가 하루 1번 실행
+
+실행 예)
+    python manage.py prune_raw_archive
+    python manage.py prune_raw_archive --days 3
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.services.raw_archive import prune_archive, retention_days
+
+
+class Command(BaseCommand):
+    help = "보관 기간이 지난 data.go.kr 원본 응답(raw_archive)을 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=None,
+            help="보관 일수 (기본: RAW_ARCHIVE_RETENTION_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else retention_days()
+        runs, objects, size = prune_archive(days)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[ARCHIVE] {days:g}일 지난 수집 기록 {runs}건 / "
+                f"응답 파일 {objects}개 ({size / 1024:.1f}KB) 삭제"
+            )
+        )
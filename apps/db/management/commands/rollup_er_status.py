@@ -0,0 +1,57 @@
+# apps/db/management/commands/rollup_er_status.py
+
+"""
+응급실 병상 변경 이력(er_status_history) → 시간/일 단위 집계(er_status_rollup)
+
+- 최근 --hours 시간 구간의 시간 집계를 다시 계산 (같은 구간을 여러 번 돌려도 결과 동일)
+- 구간에 걸친 날짜(Asia/Seoul)의 일 집계도 시간 집계로부터 다시 계산
+- 요일 × 시간 혼잡도 히트맵에 마지막 반영 이후 이력을 더함 (증분)
+- MySQL 이면 다음 달 이력 파티션을 미리 추가
+- run_scheduler 가 15분마다 실행
+
+실행 예)
+    python manage.py rollup_er_status
+    python manage.py rollup_er_status --hours 72
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.emergency.congestion import update_heatmaps
+from apps.services.status_history import ensure_month_partitions, rollup_status
+
+DEFAULT_HOURS = 3
+
+
+class Command(BaseCommand):
+    help = "응급실 병상 변경 이력을 시간/일 단위로 집계합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=DEFAULT_HOURS,
+            help="다시 집계할 최근 구간(시간)",
+        )
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        start = end - timedelta(hours=max(options["hours"], 1))
+
+        with transaction.atomic():
+            hours, days = rollup_status(start, end)
+
+        with transaction.atomic():
+            heatmaps = update_heatmaps(end)
+
+        added = ensure_month_partitions()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[ROLLUP] 시간 집계 {hours}건 / 일 집계 {days}건 저장 / 히트맵 {heatmaps}건 갱신"
+                + (f" / 이력 파티션 {added}개 추가" if added else "")
+            )
+        )
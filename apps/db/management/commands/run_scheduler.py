@@ -0,0 +1,197 @@
+# apps/db/management/commands/run_scheduler.py
+
+"""
+수집 작업 상주 스케줄러 (.bat + 작업 스케줄러 대체)
+
+- Django 를 1번만 띄워 두고 각 수집 command 를 call_command 로 주기 실행
+- 작업마다 실행 간격 + 지터(jitter) → 여러 작업이 같은 순간에 몰리지 않도록
+- 작업별 락(cache.add, Redis) → 서버가 여러 대이거나 스케줄러가 2개 떠도 같은 작업은 동시에 1개만
+- 이전 실행이 아직 끝나지 않았으면 이번 회차는 건너뜀 (skipped 기록)
+- 실행 결과 / 소요 시간은 ingestion_job_run 테이블에 기록
+
+실행 예)
+    python manage.py run_scheduler
+    python manage.py run_scheduler --only fetch_emergency --only fetch_emergency_message
+"""
+
+import random
+import signal
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.db.models import IngestionJobRun
+
+# 작업별 기본 설정 (settings.INGESTION_SCHEDULE 로 작업 단위 덮어쓰기 가능)
+# - interval: 실행 간격(초)
+# - jitter: 다음 실행 시각에 더하는 무작위 지연 최대값(초)
+# - lock_ttl: 락 유지 최대 시간(초). 프로세스가 죽어도 이 시간이 지나면 락 해제
+DEFAULT_SCHEDULE = {
+    "fetch_emergency": {"interval": 5 * 60, "jitter": 30, "lock_ttl": 30 * 60},
+    "fetch_emergency_message": {"interval": 10 * 60, "jitter": 60, "lock_ttl": 30 * 60},
+    "rollup_er_status": {"interval": 15 * 60, "jitter": 60, "lock_ttl": 30 * 60},
+    "fetch_medical_news": {"interval": 6 * 60 * 60, "jitter": 10 * 60, "lock_ttl": 60 * 60},
+    "import_disease_data": {"interval": 24 * 60 * 60, "jitter": 30 * 60, "lock_ttl": 2 * 60 * 60},
+    "prune_raw_archive": {"interval": 24 * 60 * 60, "jitter": 30 * 60, "lock_ttl": 60 * 60},
+}
+
+LOCK_KEY = "ingestion:lock:{job}"
+
+# 메인 루프 확인 주기(초)
+TICK_SECONDS = 1
+
+
+def load_schedule():
+    schedule = {name: dict(conf) for name, conf in DEFAULT_SCHEDULE.items()}
+    for name, conf in getattr(settings, "INGESTION_SCHEDULE", {}).items():
+        schedule.setdefault(name, {}).update(conf)
+    return schedule
+
+
+def acquire_lock(job, ttl):
+    """락 획득 시 토큰 반환, 이미 다른 실행이 잡고 있으면 None"""
+    token = uuid.uuid4().hex
+    if cache.add(LOCK_KEY.format(job=job), token, ttl):
+        return token
+    return None
+
+
+def release_lock(job, token):
+    key = LOCK_KEY.format(job=job)
+    # 내가 잡은 락일 때만 해제 (lock_ttl 초과 후 다른 실행이 잡은 락은 건드리지 않음)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+class Command(BaseCommand):
+    help = "수집 작업(fetch_emergency 등)을 주기적으로 실행하는 상주 스케줄러"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            action="append",
+            default=[],
+            help="지정한 작업만 실행 (여러 번 지정 가능)",
+        )
+        parser.add_argument(
+            "--run-now",
+            action="store_true",
+            help="시작 직후 모든 작업을 1번씩 실행 (기본: 첫 실행도 간격+지터 후)",
+        )
+
+    def handle(self, *args, **options):
+        schedule = load_schedule()
+        if options["only"]:
+            unknown = set(options["only"]) - set(schedule)
+            if unknown:
+                self.stdout.write(self.style.ERROR(f"알 수 없는 작업: {', '.join(sorted(unknown))}"))
+                return
+            schedule = {name: schedule[name] for name in options["only"]}
+
+        self.stop_event = threading.Event()
+        self.running = set()
+        self.running_lock = threading.Lock()
+
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+
+        now = time.monotonic()
+        next_run = {
+            name: now if options["run_now"] else now + self._next_delay(conf)
+            for name, conf in schedule.items()
+        }
+
+        for name, conf in schedule.items():
+            self.stdout.write(
+                f"[SCHED] {name}: {conf['interval']}초 간격 (+0~{conf.get('jitter', 0)}초), "
+                f"{next_run[name] - now:.0f}초 후 첫 실행"
+            )
+
+        with ThreadPoolExecutor(max_workers=len(schedule) or 1) as executor:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                for name, conf in schedule.items():
+                    if now < next_run[name]:
+                        continue
+                    next_run[name] = now + self._next_delay(conf)
+                    self._dispatch(executor, name, conf)
+
+                self.stop_event.wait(TICK_SECONDS)
+
+            self.stdout.write("[SCHED] 종료 요청 → 실행 중인 작업 완료 대기")
+
+        self.stdout.write("[SCHED] 종료")
+
+    def _request_stop(self, signum, frame):
+        self.stop_event.set()
+
+    @staticmethod
+    def _next_delay(conf):
+        return conf["interval"] + random.uniform(0, conf.get("jitter", 0))
+
+    def _dispatch(self, executor, name, conf):
+        started_at = timezone.now()
+
+        with self.running_lock:
+            busy = name in self.running
+            if not busy:
+                self.running.add(name)
+
+        token = None
+        if not busy:
+            token = acquire_lock(name, conf.get("lock_ttl", conf["interval"] * 3))
+            if token is None:
+                with self.running_lock:
+                    self.running.discard(name)
+
+        if token is None:
+            # 이 프로세스 또는 다른 스케줄러에서 아직 실행 중
+            self.stdout.write(self.style.WARNING(f"[SCHED] {name}: 이전 실행 진행 중 → 건너뜀"))
+            IngestionJobRun.objects.create(
+                job_name=name,
+                status=IngestionJobRun.STATUS_SKIPPED,
+                started_at=started_at,
+            )
+            return
+
+        executor.submit(self._run_job, name, token, started_at)
+
+    def _run_job(self, name, token, started_at):
+        status = IngestionJobRun.STATUS_SUCCESS
+        error = ""
+        started = time.perf_counter()
+
+        close_old_connections()
+        try:
+            self.stdout.write(f"[SCHED] {name} 시작")
+            call_command(name)
+        except Exception:
+            status = IngestionJobRun.STATUS_FAILED
+            error = traceback.format_exc()
+            self.stdout.write(self.style.ERROR(f"[SCHED] {name} 실패\n{error}"))
+        finally:
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            try:
+                IngestionJobRun.objects.create(
+                    job_name=name,
+                    status=status,
+                    started_at=started_at,
+                    duration_ms=duration_ms,
+                    error=error,
+                )
+            finally:
+                release_lock(name, token)
+                with self.running_lock:
+                    self.running.discard(name)
+                close_old_connections()
+
+        self.stdout.write(f"[SCHED] {name} {status} - {duration_ms / 1000:.1f}초")
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+STATUS_FIELDS = [
+    "hvdate",
+    "er_general_available",
+    "er_general_total",
+    "er_child_available",
+    "er_child_total",
+    "birth_available",
+    "birth_total",
+    "negative_pressure_available",
+    "negative_pressure_total",
+    "isolation_general_available",
+    "isolation_general_total",
+    "isolation_cohort_available",
+    "isolation_cohort_total",
+    "has_ct",
+    "has_mri",
+    "has_angio",
+    "has_ventilator",
+]
+
+
+def backfill_latest_status(apps, schema_editor):
+    """기존 er_status 에서 병원별 최신 hvdate 행을 골라 er_latest_status 초기값으로 채운다."""
+    ErStatus = apps.get_model("carebridge_db", "ErStatus")
+    ErLatestStatus = apps.get_model("carebridge_db", "ErLatestStatus")
+
+    latest_map = {}
+    for st in ErStatus.objects.exclude(hvdate__isnull=True).order_by("er_id", "hvdate"):
+        latest_map[st.er_id] = st
+
+    ErLatestStatus.objects.bulk_create(
+        [
+            ErLatestStatus(er_id=er_id, **{f: getattr(st, f) for f in STATUS_FIELDS})
+            for er_id, st in latest_map.items()
+        ],
+        batch_size=400,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0003_alter_hospital_sggu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErLatestStatus',
+            fields=[
+                ('er', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_status', serialize=False, to='carebridge_db.erinfo')),
+                ('hvdate', models.DateTimeField(db_index=True, null=True)),
+                ('er_general_available', models.IntegerField(null=True)),
+                ('er_general_total', models.IntegerField(null=True)),
+                ('er_child_available', models.IntegerField(null=True)),
+                ('er_child_total', models.IntegerField(null=True)),
+                ('birth_available', models.IntegerField(null=True)),
+                ('birth_total', models.IntegerField(null=True)),
+                ('negative_pressure_available', models.IntegerField(null=True)),
+                ('negative_pressure_total', models.IntegerField(null=True)),
+                ('isolation_general_available', models.IntegerField(null=True)),
+                ('isolation_general_total', models.IntegerField(null=True)),
+                ('isolation_cohort_available', models.IntegerField(null=True)),
+                ('isolation_cohort_total', models.IntegerField(null=True)),
+                ('has_ct', models.BooleanField(null=True)),
+                ('has_mri', models.BooleanField(null=True)),
+                ('has_angio', models.BooleanField(blank=True, null=True)),
+                ('has_ventilator', models.BooleanField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'er_latest_status',
+            },
+        ),
+        migrations.RunPython(backfill_latest_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0004_erlateststatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erstatus',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
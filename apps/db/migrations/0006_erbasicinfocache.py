@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0005_erstatus_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErBasicInfoCache',
+            fields=[
+                ('hpid', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('payload', models.JSONField(default=dict)),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'er_basic_info_cache',
+            },
+        ),
+    ]
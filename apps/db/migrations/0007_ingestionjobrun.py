@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0006_erbasicinfocache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_name', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=10)),
+                ('started_at', models.DateTimeField()),
+                ('duration_ms', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'db_table': 'ingestion_job_run',
+                'indexes': [models.Index(fields=['job_name', '-started_at'], name='ingestion_j_job_nam_ef7363_idx')],
+            },
+        ),
+    ]
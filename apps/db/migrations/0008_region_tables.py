@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0007_ingestionjobrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionSido',
+            fields=[
+                ('sido_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('short_name', models.CharField(blank=True, max_length=10)),
+                ('hira_code', models.CharField(blank=True, max_length=6, null=True, unique=True)),
+            ],
+            options={
+                'db_table': 'region_sido',
+            },
+        ),
+        migrations.AddField(
+            model_name='erinfo',
+            name='region_sido',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='er_infos', to='carebridge_db.regionsido'),
+        ),
+        migrations.AddField(
+            model_name='hospital',
+            name='region_sido',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hospitals', to='carebridge_db.regionsido'),
+        ),
+        migrations.CreateModel(
+            name='RegionSigungu',
+            fields=[
+                ('sigungu_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=30)),
+                ('sido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sigungus', to='carebridge_db.regionsido')),
+            ],
+            options={
+                'db_table': 'region_sigungu',
+                'unique_together': {('sido', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='erinfo',
+            name='region_sigungu',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='er_infos', to='carebridge_db.regionsigungu'),
+        ),
+        migrations.AddField(
+            model_name='hospital',
+            name='region_sigungu',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hospitals', to='carebridge_db.regionsigungu'),
+        ),
+    ]
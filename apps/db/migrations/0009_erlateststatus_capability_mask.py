@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+from apps.emergency.capabilities import capability_mask
+
+
+def backfill_capability_mask(apps, schema_editor):
+    """기존 er_latest_status 행의 장비/병상 비트마스크 초기값 계산"""
+    ErLatestStatus = apps.get_model("carebridge_db", "ErLatestStatus")
+
+    rows = list(ErLatestStatus.objects.all())
+    for row in rows:
+        row.capability_mask = capability_mask(row)
+    ErLatestStatus.objects.bulk_update(rows, ["capability_mask"], batch_size=400)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0008_region_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='erlateststatus',
+            name='capability_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_capability_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0009_erlateststatus_capability_mask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfavorite',
+            index=models.Index(fields=['user', 'er'], name='user_fav_user_er_idx'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# 처음 만들 월 파티션 수 (이번 달 포함). 이후 달은 rollup_er_status 가 미리 추가
+INITIAL_PARTITION_MONTHS = 3
+
+
+def partition_history_table(apps, schema_editor):
+    """
+    MySQL 에서만 er_status_history 를 month 기준 RANGE 파티션 테이블로 바꾼다.
+    파티션 키는 모든 유니크 키(PK)에 포함되어야 하므로 PK 를 (id, month) 로 변경.
+    """
+    if schema_editor.connection.vendor != "mysql":
+        return
+
+    local = timezone.localtime()
+    month = local.year * 100 + local.month
+    partitions = []
+    for _ in range(INITIAL_PARTITION_MONTHS):
+        year, mon = divmod(month, 100)
+        next_month = year * 100 + mon + 1 if mon < 12 else (year + 1) * 100 + 1
+        partitions.append(f"PARTITION p{month} VALUES LESS THAN ({next_month})")
+        month = next_month
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+
+    schema_editor.execute(
+        "ALTER TABLE er_status_history DROP PRIMARY KEY, ADD PRIMARY KEY (id, month)"
+    )
+    schema_editor.execute(
+        "ALTER TABLE er_status_history PARTITION BY RANGE (month) (" + ", ".join(partitions) + ")"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0010_userfavorite_user_er_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('hvdate', models.DateTimeField()),
+                ('month', models.PositiveIntegerField()),
+                ('er_general_available', models.IntegerField(null=True)),
+                ('er_general_total', models.IntegerField(null=True)),
+                ('er_child_available', models.IntegerField(null=True)),
+                ('er_child_total', models.IntegerField(null=True)),
+                ('birth_available', models.IntegerField(null=True)),
+                ('birth_total', models.IntegerField(null=True)),
+                ('negative_pressure_available', models.IntegerField(null=True)),
+                ('negative_pressure_total', models.IntegerField(null=True)),
+                ('isolation_general_available', models.IntegerField(null=True)),
+                ('isolation_general_total', models.IntegerField(null=True)),
+                ('isolation_cohort_available', models.IntegerField(null=True)),
+                ('isolation_cohort_total', models.IntegerField(null=True)),
+                ('er', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_history', to='carebridge_db.erinfo')),
+            ],
+            options={
+                'db_table': 'er_status_history',
+                'indexes': [models.Index(fields=['er', 'hvdate'], name='er_status_h_er_id_054e4e_idx'), models.Index(fields=['hvdate'], name='er_status_h_hvdate_5da4bd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ErStatusRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('covered_seconds', models.PositiveIntegerField(default=0)),
+                ('er_general_min', models.IntegerField(null=True)),
+                ('er_general_avg', models.FloatField(null=True)),
+                ('er_general_max', models.IntegerField(null=True)),
+                ('er_child_min', models.IntegerField(null=True)),
+                ('er_child_avg', models.FloatField(null=True)),
+                ('er_child_max', models.IntegerField(null=True)),
+                ('birth_min', models.IntegerField(null=True)),
+                ('birth_avg', models.FloatField(null=True)),
+                ('birth_max', models.IntegerField(null=True)),
+                ('negative_pressure_min', models.IntegerField(null=True)),
+                ('negative_pressure_avg', models.FloatField(null=True)),
+                ('negative_pressure_max', models.IntegerField(null=True)),
+                ('isolation_general_min', models.IntegerField(null=True)),
+                ('isolation_general_avg', models.FloatField(null=True)),
+                ('isolation_general_max', models.IntegerField(null=True)),
+                ('isolation_cohort_min', models.IntegerField(null=True)),
+                ('isolation_cohort_avg', models.FloatField(null=True)),
+                ('isolation_cohort_max', models.IntegerField(null=True)),
+                ('er', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_rollups', to='carebridge_db.erinfo')),
+            ],
+            options={
+                'db_table': 'er_status_rollup',
+                'indexes': [models.Index(fields=['period', 'bucket_start'], name='er_status_r_period_8ed8fc_idx')],
+                'unique_together': {('er', 'period', 'bucket_start')},
+            },
+        ),
+        migrations.RunPython(partition_history_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0011_er_status_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErCongestionHeatmap',
+            fields=[
+                ('er', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='congestion_heatmap', serialize=False, to='carebridge_db.erinfo')),
+                ('score_sums', models.BinaryField()),
+                ('seconds', models.BinaryField()),
+                ('means', models.BinaryField()),
+                ('computed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'er_congestion_heatmap',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0012_er_congestion_heatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErRegionPollState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sido', models.CharField(max_length=30)),
+                ('sigungu', models.CharField(max_length=30)),
+                ('tier', models.CharField(default='fast', max_length=10)),
+                ('change_rate', models.FloatField(default=1.0)),
+                ('payload_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('polls', models.PositiveIntegerField(default=0)),
+                ('changes', models.PositiveIntegerField(default=0)),
+                ('last_polled_at', models.DateTimeField(blank=True, null=True)),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'er_region_poll_state',
+                'unique_together': {('sido', 'sigungu')},
+            },
+        ),
+    ]
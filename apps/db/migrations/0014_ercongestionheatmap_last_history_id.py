@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+def mark_history_reflected(apps, schema_editor):
+    """기존 히트맵은 지금까지 적재된 이력을 모두 반영한 것으로 봄 (다시 더하지 않도록)"""
+    ErCongestionHeatmap = apps.get_model("carebridge_db", "ErCongestionHeatmap")
+    ErStatusHistory = apps.get_model("carebridge_db", "ErStatusHistory")
+
+    last = ErStatusHistory.objects.aggregate(last=models.Max("id"))["last"]
+    if last is not None:
+        ErCongestionHeatmap.objects.update(last_history_id=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0013_er_region_poll_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ercongestionheatmap',
+            name='last_history_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_history_reflected, migrations.RunPython.noop),
+    ]
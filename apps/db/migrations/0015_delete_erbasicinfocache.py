@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carebridge_db', '0014_ercongestionheatmap_last_history_id'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ErBasicInfoCache',
+        ),
+    ]
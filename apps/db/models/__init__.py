@@ -1,10 +1,11 @@
 # apps/db/models/__init__.py
 
 from .users import Users
+from .region import RegionSido, RegionSigungu
 from .hospital import Hospital
 from .department import Department
 from .disease import DimDisease
-from .emergency import ErInfo, ErStatus, ErStatusStaging, ErMessage
+from .emergency import ErInfo, ErStatus, ErStatusStaging, ErMessage, ErLatestStatus, ErRegionPollState
 from .doctor import Doctors
 from .medical_record import MedicalRecord
 from .slot_reservation import TimeSlots, Reservations
@@ -17,3 +18,5 @@ from .favorite import UserFavorite
 from .qna import Qna
 from .daily_visit import DailyVisit
 from .medical_newsletter import MedicalNewsletter
+from .ingestion_job import IngestionJobRun
+from .status_history import ErStatusHistory, ErStatusRollup, ErCongestionHeatmap
@@ -15,6 +15,14 @@ class ErInfo(models.Model):
     er_lng = models.FloatField(null=True, blank=True)
     place_id = models.CharField(max_length=20, null=True, blank=True)
 
+    # 지역 기준 테이블 참조 (backfill_regions 로 채움, 목록 지역 필터는 이 FK 로 조회)
+    region_sido = models.ForeignKey(
+        "RegionSido", null=True, blank=True, on_delete=models.SET_NULL, related_name="er_infos"
+    )
+    region_sigungu = models.ForeignKey(
+        "RegionSigungu", null=True, blank=True, on_delete=models.SET_NULL, related_name="er_infos"
+    )
+
     class Meta:
         db_table = "er_info"
 
@@ -60,6 +68,9 @@ class ErStatus(models.Model):
     has_angio = models.BooleanField(null=True, blank=True)
     has_ventilator = models.BooleanField(null=True)
 
+    # ---- 병합 비교용 ---- (병상·장비 값 해시, fetch_emergency 증분 병합에서 사용)
+    content_hash = models.CharField(max_length=32, blank=True, default="")
+
     class Meta:
         db_table = "er_status"
         unique_together = ("er", "hvdate")
@@ -130,4 +141,93 @@ class ErMessage(models.Model):
         unique_together = ("hospital", "message_time")
 
     def __str__(self):
-        return f"{self.hospital.er_name} @ {self.message_time}"
\ No newline at end of file
+        return f"{self.hospital.er_name} @ {self.message_time}"
+
+# ==========================================
+# 5. 응급실별 최신 상태 (조회용 비정규화 테이블)
+# ==========================================
+class ErLatestStatus(models.Model):
+    """
+    응급실 1곳당 1행만 유지하는 최신 병상 스냅샷.
+    fetch_emergency 병합 시점에 갱신되며, 목록 화면은 이 테이블만 조인해서 읽는다.
+    (ErStatus 에 이력이 쌓여도 목록 조회 비용은 그대로 유지)
+    """
+    er = models.OneToOneField(
+        ErInfo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="latest_status",
+    )
+
+    hvdate = models.DateTimeField(null=True, db_index=True)
+
+    # ---- 일반 응급실 ----
+    er_general_available = models.IntegerField(null=True)
+    er_general_total = models.IntegerField(null=True)
+
+    # ---- 소아 응급실 ----
+    er_child_available = models.IntegerField(null=True)
+    er_child_total = models.IntegerField(null=True)
+
+    # ---- 분만실 ----
+    birth_available = models.IntegerField(null=True)
+    birth_total = models.IntegerField(null=True)
+
+    # ---- 음압 격리 ----
+    negative_pressure_available = models.IntegerField(null=True)
+    negative_pressure_total = models.IntegerField(null=True)
+
+    # ---- 일반 격리 ----
+    isolation_general_available = models.IntegerField(null=True)
+    isolation_general_total = models.IntegerField(null=True)
+
+    # ---- 코호트 격리 ----
+    isolation_cohort_available = models.IntegerField(null=True)
+    isolation_cohort_total = models.IntegerField(null=True)
+
+    # ---- 장비 여부 ----
+    has_ct = models.BooleanField(null=True)
+    has_mri = models.BooleanField(null=True)
+    has_angio = models.BooleanField(null=True, blank=True)
+    has_ventilator = models.BooleanField(null=True)
+
+    # ---- 장비 / 병상 보유 비트마스크 (apps.emergency.capabilities) ----
+    capability_mask = models.PositiveSmallIntegerField(default=0, db_index=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "er_latest_status"
+
+    def __str__(self):
+        return f"{self.er.er_name} (latest @ {self.hvdate})"
+
+
+class ErRegionPollState(models.Model):
+    """
+    fetch_emergency 지역(시도 + 시군구)별 적응형 폴링 상태.
+    응답이 실제로 바뀐 비율(change_rate, 지수 이동 평균)로 등급을 나누고
+    등급별 최소 호출 간격이 지난 지역만 호출한다 (apps/services/region_polling.py).
+    """
+    TIER_FAST = "fast"
+    TIER_NORMAL = "normal"
+    TIER_SLOW = "slow"
+
+    sido = models.CharField(max_length=30)
+    sigungu = models.CharField(max_length=30)
+
+    tier = models.CharField(max_length=10, default=TIER_FAST)
+    change_rate = models.FloatField(default=1.0)             # 호출 1회당 응답 변경 확률 (EWMA)
+    payload_hash = models.CharField(max_length=40, blank=True, default="")
+
+    polls = models.PositiveIntegerField(default=0)
+    changes = models.PositiveIntegerField(default=0)
+    last_polled_at = models.DateTimeField(null=True, blank=True)
+    last_changed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "er_region_poll_state"
+        unique_together = ("sido", "sigungu")
+
+    def __str__(self):
+        return f"{self.sido} {self.sigungu} [{self.tier}]"
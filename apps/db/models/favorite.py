@@ -12,6 +12,10 @@ class UserFavorite(models.Model):
 
     class Meta:
         db_table = 'user_favorite'
+        indexes = [
+            # 상세 모달 / 목록의 즐겨찾기 여부 조회 (user_id + er_id)
+            models.Index(fields=["user", "er"], name="user_fav_user_er_idx"),
+        ]
 
     def __str__(self):
         return f'Fav#{self.fav_id} - user {self.user_id}'
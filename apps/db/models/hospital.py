@@ -23,6 +23,14 @@ class Hospital(models.Model):
     sggu = models.CharField(max_length=20, null=True, blank=True)             # sgguCdNm (구 이름)
     dr_total = models.IntegerField(null=True, blank=True)                     # drTotCnt
 
+    # 지역 기준 테이블 참조 (backfill_regions 로 sido/sggu 에서 채움)
+    region_sido = models.ForeignKey(
+        "RegionSido", null=True, blank=True, on_delete=models.SET_NULL, related_name="hospitals"
+    )
+    region_sigungu = models.ForeignKey(
+        "RegionSigungu", null=True, blank=True, on_delete=models.SET_NULL, related_name="hospitals"
+    )
+
     class Meta:
         db_table = "hospital" 
 
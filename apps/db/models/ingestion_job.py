@@ -0,0 +1,26 @@
+# apps/db/models/ingestion_job.py
+from django.db import models
+
+
+class IngestionJobRun(models.Model):
+    """
+    run_scheduler 가 실행한 수집 작업 1회 기록 (작업별 소요 시간 추적용)
+    """
+    STATUS_SUCCESS = "success"
+    STATUS_FAILED = "failed"
+    STATUS_SKIPPED = "skipped"   # 이전 실행이 끝나지 않아 건너뜀
+
+    job_name = models.CharField(max_length=50)
+    status = models.CharField(max_length=10)
+    started_at = models.DateTimeField()
+    duration_ms = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "ingestion_job_run"
+        indexes = [
+            models.Index(fields=["job_name", "-started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.job_name} {self.status} @ {self.started_at}"
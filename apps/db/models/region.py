@@ -0,0 +1,33 @@
+# apps/db/models/region.py
+from django.db import models
+
+
+class RegionSido(models.Model):
+    """
+    시/도 기준 테이블 (표준 명칭 1행).
+    ErInfo / Hospital 은 문자열 대신 이 테이블의 정수 id 로 지역을 참조한다.
+    """
+    sido_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=30, unique=True)        # 표준 명칭 (예: 경상북도)
+    short_name = models.CharField(max_length=10, blank=True)   # 약칭 (예: 경북)
+    hira_code = models.CharField(max_length=6, null=True, blank=True, unique=True)  # 심평원 sidoCd (Hospital.sido)
+
+    class Meta:
+        db_table = "region_sido"
+
+    def __str__(self):
+        return self.name
+
+
+class RegionSigungu(models.Model):
+    """시/군/구 기준 테이블 (시/도 + 이름 1행)"""
+    sigungu_id = models.AutoField(primary_key=True)
+    sido = models.ForeignKey(RegionSido, on_delete=models.CASCADE, related_name="sigungus")
+    name = models.CharField(max_length=30)
+
+    class Meta:
+        db_table = "region_sigungu"
+        unique_together = ("sido", "name")
+
+    def __str__(self):
+        return f"{self.sido.name} {self.name}"
@@ -0,0 +1,121 @@
+# apps/db/models/status_history.py
+from django.db import models
+
+
+class ErStatusHistory(models.Model):
+    """
+    응급실 병상 값 변경 이력 (append-only).
+    fetch_emergency 병합에서 값이 실제로 바뀐 응급실만 1행씩 추가한다.
+    → 저장량은 수집 주기가 아니라 변경 횟수에 비례
+
+    MySQL 에서는 month(YYYYMM) 기준 RANGE 파티션 테이블로 만든다 (migration 0011).
+    파티션 테이블은 외래키 제약을 지원하지 않으므로 er 는 db_constraint=False.
+    """
+    id = models.BigAutoField(primary_key=True)
+    er = models.ForeignKey(
+        "ErInfo",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="status_history",
+    )
+
+    hvdate = models.DateTimeField()
+    month = models.PositiveIntegerField()   # 파티션 키 (hvdate 의 YYYYMM, Asia/Seoul)
+
+    er_general_available = models.IntegerField(null=True)
+    er_general_total = models.IntegerField(null=True)
+    er_child_available = models.IntegerField(null=True)
+    er_child_total = models.IntegerField(null=True)
+    birth_available = models.IntegerField(null=True)
+    birth_total = models.IntegerField(null=True)
+    negative_pressure_available = models.IntegerField(null=True)
+    negative_pressure_total = models.IntegerField(null=True)
+    isolation_general_available = models.IntegerField(null=True)
+    isolation_general_total = models.IntegerField(null=True)
+    isolation_cohort_available = models.IntegerField(null=True)
+    isolation_cohort_total = models.IntegerField(null=True)
+
+    class Meta:
+        db_table = "er_status_history"
+        indexes = [
+            models.Index(fields=["er", "hvdate"]),
+            models.Index(fields=["hvdate"]),
+        ]
+
+    def __str__(self):
+        return f"history er={self.er_id} @ {self.hvdate}"
+
+
+class ErStatusRollup(models.Model):
+    """
+    응급실별 가용 병상 시간 구간 집계 (시간 / 일 단위).
+    이력은 변경 시점만 저장하므로 값은 다음 변경 전까지 유지된 것으로 보고 시간 가중 평균을 낸다.
+    추이(trend) API 는 이 테이블만 읽는다.
+    """
+    PERIOD_HOUR = "hour"
+    PERIOD_DAY = "day"
+
+    er = models.ForeignKey("ErInfo", on_delete=models.CASCADE, related_name="status_rollups")
+    period = models.CharField(max_length=4)
+    bucket_start = models.DateTimeField()
+    covered_seconds = models.PositiveIntegerField(default=0)   # 구간 중 상태 값이 있던 시간
+
+    er_general_min = models.IntegerField(null=True)
+    er_general_avg = models.FloatField(null=True)
+    er_general_max = models.IntegerField(null=True)
+    er_child_min = models.IntegerField(null=True)
+    er_child_avg = models.FloatField(null=True)
+    er_child_max = models.IntegerField(null=True)
+    birth_min = models.IntegerField(null=True)
+    birth_avg = models.FloatField(null=True)
+    birth_max = models.IntegerField(null=True)
+    negative_pressure_min = models.IntegerField(null=True)
+    negative_pressure_avg = models.FloatField(null=True)
+    negative_pressure_max = models.IntegerField(null=True)
+    isolation_general_min = models.IntegerField(null=True)
+    isolation_general_avg = models.FloatField(null=True)
+    isolation_general_max = models.IntegerField(null=True)
+    isolation_cohort_min = models.IntegerField(null=True)
+    isolation_cohort_avg = models.FloatField(null=True)
+    isolation_cohort_max = models.IntegerField(null=True)
+
+    class Meta:
+        db_table = "er_status_rollup"
+        unique_together = ("er", "period", "bucket_start")
+        indexes = [
+            models.Index(fields=["period", "bucket_start"]),
+        ]
+
+    def __str__(self):
+        return f"rollup er={self.er_id} {self.period} @ {self.bucket_start}"
+
+
+class ErCongestionHeatmap(models.Model):
+    """
+    응급실별 요일 × 시간(7 × 24 = 168칸) 평균 혼잡도 점수 (Asia/Seoul 기준, 월요일 0시가 0번 칸).
+    상세 모달은 means 블롭(float32 168개) 1개만 읽고, 집계 쿼리를 돌리지 않는다.
+
+    - score_sums / seconds: 칸별 (혼잡도 × 유지 시간) 합계 / 유지 시간 합계 (float64 168개)
+      → 새 이력 구간을 더하기만 하면 되므로 증분 갱신 가능
+    - computed_until: 여기까지(정시) 반영됨. 다음 갱신은 이 시각부터 (모든 행이 같은 전역 워터마크)
+    - last_history_id: 반영한 마지막 이력 id (전역). 이보다 큰 id 인데 hvdate 가 computed_until 이전인
+      이력(늦게 적재된 행)은 해당 응급실의 영향 구간만 다시 계산 → apps/emergency/congestion.py
+    """
+    er = models.OneToOneField(
+        "ErInfo",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="congestion_heatmap",
+    )
+    score_sums = models.BinaryField()
+    seconds = models.BinaryField()
+    means = models.BinaryField()
+    computed_until = models.DateTimeField()
+    last_history_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "er_congestion_heatmap"
+
+    def __str__(self):
+        return f"heatmap er={self.er_id} until {self.computed_until}"
@@ -1,3 +1,486 @@
-from django.test import TestCase
+import contextlib
+import io
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.db.management.commands.fetch_emergency import (
+    BASE_URL_A,
+    merge_rows_direct,
+    parse_api_A,
+    region_params,
+    sync_latest_status,
+)
+from apps.db.management.commands import run_scheduler
+from apps.db.models import IngestionJobRun
+from apps.db.models.emergency import ErInfo, ErLatestStatus, ErRegionPollState, ErStatus
+from apps.services.raw_archive import ArchiveReplayFetcher, RawArchive, load_manifest
+from apps.services.region_polling import (
+    cached_payloads,
+    payload_digest,
+    plan_region_polls,
+    record_region_polls,
+)
+
+# 운영 설정의 Redis 캐시를 건드리지 않도록 테스트는 메모리 캐시 사용
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+BASE_TIME = timezone.make_aware(datetime(2025, 1, 1, 12, 0, 0))
+
+
+def make_row(hpid, hvdate, available=3):
+    """실시간 병상 API row (items_to_rows 결과와 같은 키)"""
+    return {
+        "hpid": hpid,
+        "hvdate": hvdate,
+        "hvec": available,
+        "hvs01": 10,
+        "hv28": None,
+        "hvs02": None,
+        "hv42": None,
+        "hvs26": None,
+        "hv29": None,
+        "hvs03": None,
+        "hv30": None,
+        "hvs04": None,
+        "hv27": None,
+        "hvs59": None,
+        "hvctayn": "Y",
+        "hvmriayn": "N",
+        "hvventiayn": None,
+        "hvangioayn": None,
+    }
+
+
+def make_xml(items):
+    """[(hpid, hvdate, hvec), ...] → 실시간 병상 API XML 응답 바이트"""
+    body = "".join(
+        f"<item><hpid>{hpid}</hpid><hvidate>{hvdate:%Y%m%d%H%M%S}</hvidate>"
+        f"<hvec>{hvec}</hvec><hvs01>10</hvs01><hvctayn>Y</hvctayn></item>"
+        for hpid, hvdate, hvec in items
+    )
+    return (
+        "<response><header><resultCode>00</resultCode></header>"
+        f"<body><items>{body}</items><totalCount>{len(items)}</totalCount></body></response>"
+    ).encode("utf-8")
+
+
+def quiet(func, *args, **kwargs):
+    """병합 / 명령의 진행 로그(print)를 숨기고 실행"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def create_er(hpid, sido="서울특별시", sigungu="중구"):
+    return ErInfo.objects.create(
+        hpid=hpid,
+        er_name=f"테스트병원 {hpid}",
+        er_address="주소",
+        er_sido=sido,
+        er_sigungu=sigungu,
+    )
+
+
+class ErStatusMergeTest(TestCase):
+    """API rows → ErStatus / ErLatestStatus 증분 병합 (content_hash 비교, 이전 hvdate 삭제)"""
+
+    def setUp(self):
+        self.er = create_er("M0001")
+        self.other = create_er("M0002")
+
+    def merge(self, rows):
+        return quiet(merge_rows_direct, rows)
+
+    def status_rows(self, er):
+        return list(
+            ErStatus.objects.filter(er=er).values_list("hvdate", "er_general_available")
+        )
+
+    def test_same_payload_is_not_rewritten(self):
+        changed = self.merge([make_row("M0001", BASE_TIME)])
+        self.assertEqual(len(changed), 1)
+
+        changed = self.merge([make_row("M0001", BASE_TIME)])
+        self.assertEqual(changed, [])
+        self.assertEqual(self.status_rows(self.er), [(BASE_TIME, 3)])
+
+    def test_same_hvdate_with_new_values_is_updated(self):
+        self.merge([make_row("M0001", BASE_TIME, available=3)])
+        changed = self.merge([make_row("M0001", BASE_TIME, available=1)])
+
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(self.status_rows(self.er), [(BASE_TIME, 1)])
+        self.assertEqual(ErLatestStatus.objects.get(er=self.er).er_general_available, 1)
+
+    def test_newer_hvdate_replaces_and_deletes_stale_row(self):
+        newer = BASE_TIME + timedelta(minutes=5)
+        self.merge([make_row("M0001", BASE_TIME), make_row("M0002", BASE_TIME)])
+        self.merge([make_row("M0001", newer, available=0)])
+
+        self.assertEqual(self.status_rows(self.er), [(newer, 0)])
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (newer, 0))
+
+        # 이번 수집에 없는 병원의 행은 그대로
+        self.assertEqual(self.status_rows(self.other), [(BASE_TIME, 3)])
+
+    def test_older_hvdate_does_not_delete_or_overwrite_newer_rows(self):
+        newer = BASE_TIME + timedelta(minutes=5)
+        self.merge([make_row("M0001", newer, available=0)])
+
+        # 늦게 도착한 지역 응답 / 재생: 저장된 값보다 오래된 hvdate
+        changed = self.merge([make_row("M0001", BASE_TIME, available=7)])
+
+        self.assertEqual(changed, [])
+        self.assertEqual(self.status_rows(self.er), [(newer, 0)])
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (newer, 0))
+
+    def test_only_latest_hvdate_per_hospital_is_kept(self):
+        rows = [
+            make_row("M0001", BASE_TIME, available=5),
+            make_row("M0001", BASE_TIME + timedelta(minutes=3), available=2),
+        ]
+        self.merge(rows)
+
+        self.assertEqual(
+            self.status_rows(self.er), [(BASE_TIME + timedelta(minutes=3), 2)]
+        )
+
+    def test_unknown_hospital_is_skipped(self):
+        changed = self.merge([make_row("UNKNOWN", BASE_TIME)])
+
+        self.assertEqual(changed, [])
+        self.assertFalse(ErStatus.objects.exists())
+
+
+class SyncLatestStatusTest(TestCase):
+    """ErLatestStatus 는 병원별 가장 최근 hvdate 만 유지"""
+
+    def setUp(self):
+        self.er = create_er("L0001")
+
+    def status(self, hvdate, available):
+        return ErStatus(er=self.er, hvdate=hvdate, er_general_available=available)
+
+    def sync(self, objs):
+        return quiet(sync_latest_status, objs)
+
+    def test_newest_object_in_batch_wins(self):
+        newer = BASE_TIME + timedelta(minutes=5)
+        self.sync([self.status(newer, 1), self.status(BASE_TIME, 9)])
+
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (newer, 1))
+
+    def test_older_hvdate_does_not_overwrite(self):
+        newer = BASE_TIME + timedelta(minutes=5)
+        self.sync([self.status(newer, 1)])
+
+        saved = self.sync([self.status(BASE_TIME, 9)])
+
+        self.assertEqual(saved, [])
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (newer, 1))
+
+    def test_same_hvdate_is_updated_only_when_values_change(self):
+        self.sync([self.status(BASE_TIME, 1)])
+
+        self.assertEqual(self.sync([self.status(BASE_TIME, 1)]), [])
+
+        saved = self.sync([self.status(BASE_TIME, 4)])
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(saved[0].changed_fields, {"er_general_available": 4})
+        self.assertEqual(ErLatestStatus.objects.get(er=self.er).er_general_available, 4)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    ER_POLL_FAST_MINUTES=0,
+    ER_POLL_NORMAL_MINUTES=15,
+    ER_POLL_SLOW_MINUTES=30,
+    ER_POLL_FULL_SWEEP_MINUTES=60,
+)
+class RegionPollPlanTest(TestCase):
+    """지역별 적응형 폴링 계획 + 응답 지문 저장"""
+
+    REGIONS = [("서울특별시", "중구"), ("서울특별시", "종로구")]
+
+    def setUp(self):
+        cache.clear()
+
+    def record(self, plan, applied=True):
+        for region in plan.regions:
+            plan.observe(region, payload_digest(f"{region}".encode("utf-8")), applied=applied)
+        record_region_polls(plan)
+
+    def test_first_run_is_full_sweep(self):
+        plan = plan_region_polls(self.REGIONS, now=BASE_TIME)
+
+        self.assertTrue(plan.full_sweep)
+        self.assertEqual(plan.regions, self.REGIONS)
+
+    def test_slow_region_waits_for_its_interval(self):
+        self.record(plan_region_polls(self.REGIONS, now=BASE_TIME))
+        ErRegionPollState.objects.filter(sigungu="종로구").update(
+            tier=ErRegionPollState.TIER_SLOW, change_rate=0.0
+        )
+
+        plan = plan_region_polls(self.REGIONS, now=BASE_TIME + timedelta(minutes=10))
+        self.assertFalse(plan.full_sweep)
+        self.assertEqual(plan.regions, [("서울특별시", "중구")])
+
+        plan = plan_region_polls(self.REGIONS, now=BASE_TIME + timedelta(minutes=30))
+        self.assertEqual(plan.regions, self.REGIONS)
+
+    def test_full_sweep_after_interval(self):
+        self.record(plan_region_polls(self.REGIONS, now=BASE_TIME))
+        ErRegionPollState.objects.update(tier=ErRegionPollState.TIER_SLOW)
+
+        plan = plan_region_polls(self.REGIONS, now=BASE_TIME + timedelta(minutes=60))
+        self.assertTrue(plan.full_sweep)
+        self.assertEqual(plan.regions, self.REGIONS)
+
+    def test_unchanged_payload_lowers_change_rate(self):
+        self.record(plan_region_polls(self.REGIONS, now=BASE_TIME))
+        self.record(plan_region_polls(self.REGIONS, force_full=True, now=BASE_TIME), applied=False)
+
+        st = ErRegionPollState.objects.get(sigungu="중구")
+        self.assertEqual((st.polls, st.changes), (2, 1))
+        self.assertAlmostEqual(st.change_rate, 0.7)
+
+    def test_only_applied_payload_digests_are_cached(self):
+        plan = plan_region_polls(self.REGIONS, now=BASE_TIME)
+        plan.observe(self.REGIONS[0], "a" * 32, applied=True)
+        plan.observe(self.REGIONS[1], "b" * 32)
+        record_region_polls(plan)
+
+        self.assertEqual(cached_payloads(self.REGIONS), {self.REGIONS[0]: "a" * 32})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RawArchiveReplayTest(TestCase):
+    """보관된 응답 재생 (네트워크 호출 없음, 기본은 반영하지 않음)"""
+
+    REGION = ("서울특별시", "중구")
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.er = create_er("R0001", *self.REGION)
+
+    def archive(self, items):
+        """실시간 병상 응답 1건을 보관한 run 을 만들고 run_id 반환"""
+        archive = RawArchive("fetch_emergency", root=self.tmp.name)
+        archive.store(
+            f"{self.REGION[0]} {self.REGION[1]}",
+            BASE_URL_A,
+            region_params(*self.REGION),
+            make_xml(items),
+        )
+        quiet(archive.close)
+        return archive.run_id
+
+    def replay(self, run_id, **options):
+        with override_settings(RAW_ARCHIVE_DIR=self.tmp.name):
+            quiet(call_command, "fetch_emergency", replay=run_id, **options)
+
+    def test_manifest_does_not_keep_service_key(self):
+        run_id = self.archive([("R0001", BASE_TIME, 3)])
+
+        entry = load_manifest(run_id, self.tmp.name)["entries"][0]
+        self.assertNotIn("serviceKey", entry["params"])
+        self.assertEqual(entry["params"]["STAGE2"], "중구")
+
+    def test_fetcher_returns_archived_payload(self):
+        run_id = self.archive([("R0001", BASE_TIME, 3)])
+        fetcher = ArchiveReplayFetcher(run_id, self.tmp.name)
+
+        self.assertEqual(fetcher.regions(BASE_URL_A), [self.REGION])
+        results = fetcher.fetch_all(
+            [("서울특별시 중구", BASE_URL_A, {}), ("서울특별시 종로구", BASE_URL_A, {})],
+            lambda response: response.raw.read(),
+        )
+        self.assertEqual(results["서울특별시 중구"], make_xml([("R0001", BASE_TIME, 3)]))
+        self.assertIsNone(results["서울특별시 종로구"])
+
+    def test_replay_without_apply_writes_nothing(self):
+        run_id = self.archive([("R0001", BASE_TIME, 3)])
+
+        self.replay(run_id)
+
+        self.assertFalse(ErStatus.objects.exists())
+        self.assertFalse(ErLatestStatus.objects.exists())
+        self.assertFalse(ErRegionPollState.objects.exists())
+
+    def test_replay_apply_merges_archived_rows(self):
+        run_id = self.archive([("R0001", BASE_TIME, 3)])
+
+        self.replay(run_id, apply=True)
+
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (BASE_TIME, 3))
+        # 재생은 운영 폴링 상태를 바꾸지 않음
+        self.assertFalse(ErRegionPollState.objects.exists())
+
+    def test_replay_apply_keeps_newer_rows(self):
+        newer = BASE_TIME + timedelta(minutes=5)
+        quiet(merge_rows_direct, [make_row("R0001", newer, available=0)])
+        run_id = self.archive([("R0001", BASE_TIME, 3)])
+
+        self.replay(run_id, apply=True)
+
+        self.assertEqual(
+            list(ErStatus.objects.values_list("hvdate", "er_general_available")),
+            [(newer, 0)],
+        )
+        latest = ErLatestStatus.objects.get(er=self.er)
+        self.assertEqual((latest.hvdate, latest.er_general_available), (newer, 0))
+
+
+class ParseApiARegionTest(TestCase):
+    """지역별 호출: 빈 응답(데이터 없음)과 호출 실패를 구분해서 출력"""
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        archive = RawArchive("fetch_emergency", root=self.tmp.name)
+        for sigungu, items in (("중구", [("R0001", BASE_TIME, 3)]), ("종로구", [])):
+            archive.store(
+                f"서울특별시 {sigungu}", BASE_URL_A, region_params("서울특별시", sigungu), make_xml(items)
+            )
+        quiet(archive.close)
+        self.fetcher = ArchiveReplayFetcher(archive.run_id, self.tmp.name)
+
+    def test_failed_region_is_reported_as_fetch_failure(self):
+        # 강남구는 보관된 응답이 없음 → 재시도까지 실패한 호출과 같음 (None)
+        regions = [("서울특별시", "중구"), ("서울특별시", "종로구"), ("서울특별시", "강남구")]
+        plan = plan_region_polls(regions, force_full=True)
+
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            rows = parse_api_A(self.fetcher, plan)
+
+        self.assertEqual([row["hpid"] for row in rows], ["R0001"])
+        log = out.getvalue()
+        self.assertIn("[A] → 데이터 없음: 서울특별시 종로구", log)
+        self.assertIn("[A][WARN] 지역 호출 실패 1건: 서울특별시 강남구", log)
+        self.assertNotIn("데이터 없음: 서울특별시 강남구", log)
+        # 실패한 지역은 폴링 상태(응답 지문)에 기록하지 않음
+        self.assertNotIn(("서울특별시", "강남구"), plan.payloads)
+
+
+class InlineExecutor:
+    """submit 된 작업을 바로 실행 (스레드 없이 _run_job 결과 확인)"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args[0])
+        fn(*args)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SchedulerDispatchTest(TestCase):
+    """run_scheduler: 락이 잡혀 있으면 건너뜀 / 락은 잡은 실행만 해제 / 실패 기록"""
+
+    JOB = "fetch_emergency"
+    CONF = run_scheduler.DEFAULT_SCHEDULE[JOB]
+
+    def setUp(self):
+        cache.clear()
+        self.scheduler = run_scheduler.Command(stdout=io.StringIO())
+        self.scheduler.running = set()
+        self.scheduler.running_lock = threading.Lock()
+        self.executor = InlineExecutor()
+        self.commands = []
+
+        # 테스트 DB 연결을 닫지 않도록
+        patcher = mock.patch.object(run_scheduler, "close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def dispatch(self, command=None):
+        def call_command(name):
+            self.commands.append(name)
+            if command is not None:
+                command()
+
+        with mock.patch.object(run_scheduler, "call_command", call_command):
+            self.scheduler._dispatch(self.executor, self.JOB, self.CONF)
+
+    def lock_value(self):
+        return cache.get(run_scheduler.LOCK_KEY.format(job=self.JOB))
+
+    def test_success_is_recorded_and_lock_released(self):
+        self.dispatch()
+
+        self.assertEqual(self.commands, [self.JOB])
+        run = IngestionJobRun.objects.get()
+        self.assertEqual(run.status, IngestionJobRun.STATUS_SUCCESS)
+        self.assertIsNotNone(run.duration_ms)
+        self.assertIsNone(self.lock_value())
+        self.assertEqual(self.scheduler.running, set())
+
+    def test_held_lock_skips_job(self):
+        other = run_scheduler.acquire_lock(self.JOB, 60)
+
+        self.dispatch()
+
+        self.assertEqual(self.commands, [])
+        self.assertEqual(self.executor.submitted, [])
+        self.assertEqual(IngestionJobRun.objects.get().status, IngestionJobRun.STATUS_SKIPPED)
+        # 다른 실행의 락은 그대로, 이 프로세스의 실행 중 표시는 남기지 않음
+        self.assertEqual(self.lock_value(), other)
+        self.assertEqual(self.scheduler.running, set())
+
+    def test_job_running_in_this_process_is_skipped(self):
+        self.scheduler.running.add(self.JOB)
+
+        self.dispatch()
+
+        self.assertEqual(self.commands, [])
+        self.assertEqual(IngestionJobRun.objects.get().status, IngestionJobRun.STATUS_SKIPPED)
+        self.assertEqual(self.scheduler.running, {self.JOB})
+
+    def test_failure_is_recorded(self):
+        def fail():
+            raise RuntimeError("API 응답 없음")
+
+        self.dispatch(fail)
+
+        run = IngestionJobRun.objects.get()
+        self.assertEqual(run.status, IngestionJobRun.STATUS_FAILED)
+        self.assertIn("RuntimeError: API 응답 없음", run.error)
+        self.assertIsNone(self.lock_value())
+        self.assertEqual(self.scheduler.running, set())
+
+    def test_only_owner_releases_lock(self):
+        token = run_scheduler.acquire_lock(self.JOB, 60)
+        self.assertIsNone(run_scheduler.acquire_lock(self.JOB, 60))
+
+        run_scheduler.release_lock(self.JOB, "other-token")
+        self.assertEqual(self.lock_value(), token)
+
+        run_scheduler.release_lock(self.JOB, token)
+        self.assertIsNone(self.lock_value())
+
+    def test_expired_lock_taken_by_another_run_is_not_released(self):
+        key = run_scheduler.LOCK_KEY.format(job=self.JOB)
+
+        def lock_expires_and_another_run_takes_it():
+            cache.set(key, "next-run", 60)
+
+        self.dispatch(lock_expires_and_another_run_takes_it)
+
+        self.assertEqual(IngestionJobRun.objects.get().status, IngestionJobRun.STATUS_SUCCESS)
+        self.assertEqual(self.lock_value(), "next-run")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class EmergencyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.emergency'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (AiReview → 상세 번들 갱신)
@@ -0,0 +1,98 @@
+# apps/emergency/capabilities.py
+
+"""
+응급실 장비 / 병상 보유 비트마스크.
+
+ErLatestStatus.capability_mask 에 병원별로 저장해 두고
+(fetch_emergency 의 sync_latest_status 에서 갱신),
+목록 화면의 장비 필터(ct/mri/angio/ventilator/delivery)를 점수 계산 전에
+비트 AND 1번으로 적용한다.
+"""
+
+from django.db.models import F
+
+CAP_CT = 1 << 0
+CAP_MRI = 1 << 1
+CAP_ANGIO = 1 << 2
+CAP_VENTILATOR = 1 << 3
+CAP_BIRTH = 1 << 4          # 분만실 가용 (birth_available)
+CAP_BED_DATA = 1 << 5       # 병상 정보(원형 그래프 값)가 하나라도 있음
+
+# 화면 장비 필터 이름 → 비트
+EQUIP_BITS = {
+    "ct": CAP_CT,
+    "mri": CAP_MRI,
+    "angio": CAP_ANGIO,
+    "ventilator": CAP_VENTILATOR,
+    "delivery": CAP_BIRTH,
+}
+
+_BED_FIELDS = [
+    ("er_general_available", "er_general_total"),
+    ("er_child_available", "er_child_total"),
+    ("birth_available", "birth_total"),
+    ("negative_pressure_available", "negative_pressure_total"),
+    ("isolation_general_available", "isolation_general_total"),
+    ("isolation_cohort_available", "isolation_cohort_total"),
+]
+
+
+def has_any_status_data(status):
+    """
+    병상 정보(원형 그래프 값)가 하나라도 존재하면 True,
+    모두 '-' 상태(available=None 또는 total=None/0)이면 False.
+    """
+    if not status:
+        return False
+
+    for a, t in _BED_FIELDS:
+        avail = getattr(status, a, None)
+        total = getattr(status, t, None)
+
+        # total이 있는 경우 (양수) → 유효 데이터
+        if total not in (None, 0):
+            return True
+
+        # total 없이 available만 존재해도 유효 데이터
+        if avail not in (None, 0):
+            return True
+
+    return False
+
+
+def capability_mask(status):
+    """ErStatus / ErLatestStatus 1행 → 비트마스크 (상태가 없으면 0)"""
+    if not status:
+        return 0
+
+    mask = 0
+    if status.has_ct:
+        mask |= CAP_CT
+    if status.has_mri:
+        mask |= CAP_MRI
+    if status.has_angio:
+        mask |= CAP_ANGIO
+    if status.has_ventilator:
+        mask |= CAP_VENTILATOR
+    if status.birth_available:
+        mask |= CAP_BIRTH
+    if has_any_status_data(status):
+        mask |= CAP_BED_DATA
+    return mask
+
+
+def equips_mask(required_equips):
+    """장비 필터 목록 → 비트마스크 (하나라도 가지면 통과하는 OR 조건)"""
+    mask = 0
+    for eq in required_equips:
+        mask |= EQUIP_BITS.get(eq, 0)
+    return mask
+
+
+def filter_by_capability(hospitals_qs, mask):
+    """ErInfo queryset 에 장비 OR 조건 적용 (최신 상태가 없는 병원은 제외)"""
+    return (
+        hospitals_qs
+        .alias(matched_caps=F("latest_status__capability_mask").bitand(mask))
+        .filter(matched_caps__gt=0)
+    )
@@ -0,0 +1,268 @@
+# apps/emergency/congestion.py
+
+"""
+응급실 혼잡도 점수 + 요일 × 시간 혼잡도 히트맵.
+
+- calculate_congestion_score(): 목록 점수 계산(views.calculate_score)과 히트맵 공용
+- update_heatmaps(): 병상 변경 이력(er_status_history)을 마지막 반영 시각 이후만 읽어서
+  응급실별 168칸 (혼잡도 × 유지 시간) 합계에 더함 → rollup_er_status 에서 15분마다 호출
+- get_heatmap(): 상세 모달용 7 × 24 행렬 (저장된 평균 블롭만 읽음)
+
+반영 기준은 hvdate(병원 입력 시각) 기반 전역 워터마크(computed_until, 모든 행이 같은 값)와
+반영한 마지막 이력 id(last_history_id)이다.
+- hvdate 가 이미 지나간 워터마크보다 이전인 이력(HEATMAP_SETTLE 보다 늦게 적재된 행:
+  장시간 지역 호출 실패 후 복구, --replay --apply 등)은 id 가 last_history_id 보다 크므로 찾을 수 있다
+  → 해당 응급실만 그 행의 hvdate ~ 워터마크 구간을 "이전에 보던 이력"으로 다시 계산해 빼고,
+    "지금 이력"으로 계산해 더한다 (이미 더한 값과 같은 이력으로 계산하므로 정확히 상쇄됨)
+- 각 회차는 시작 시점의 최대 이력 id 이하만 읽는다 (집계 중에 적재된 행은 다음 회차에 지연 행으로 처리)
+"""
+
+import sys
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from apps.db.models import ErCongestionHeatmap, ErStatusHistory
+from apps.services.status_history import floor_hour, iter_hour_segments
+
+HEATMAP_SLOTS = 7 * 24
+WEEKDAY_LABELS = ["월", "화", "수", "목", "금", "토", "일"]
+
+# 이력은 API 의 hvdate(병원 입력 시각) 기준이라 늦게 들어올 수 있음 → 1시간 지난 구간만 반영
+# (이보다 늦게 적재된 이력은 다음 회차에 영향 구간만 다시 계산, 모듈 설명 참고)
+HEATMAP_SETTLE = timedelta(hours=1)
+
+# 1회 실행에서 반영할 최대 구간 (처음 만들 때 이력이 길어도 메모리/시간을 일정하게)
+HEATMAP_MAX_WINDOW = timedelta(days=7)
+
+
+def calculate_congestion_score(status):
+    """
+    혼잡도 점수 계산
+    혼잡도 = (응급실일반가용률 * 0.45) + (소아가용률 * 0.20) + 
+             (음압가용률 * 0.20) + (일반격리가용률 * 0.10) + (분만실가용여부 * 0.05)
+    - 분만실은 total 개념이 없고 Boolean 플래그(birth_available)만 존재
+      → True 이면 1.0, False/None 이면 0.0 으로 반영
+    """
+    if not status:
+        return 0.0
+    
+    def get_availability_rate(available, total):
+        if total and total > 0:
+            return (available or 0) / total
+        return 0.0
+    
+    general_rate = get_availability_rate(
+        status.er_general_available, status.er_general_total
+    )
+    child_rate = get_availability_rate(
+        status.er_child_available, status.er_child_total
+    )
+    negative_rate = get_availability_rate(
+        status.negative_pressure_available, status.negative_pressure_total
+    )
+    isolation_rate = get_availability_rate(
+        status.isolation_general_available,
+        status.isolation_general_total,
+    )
+
+    # 분만실: Boolean 플래그만 존재 → True면 1.0, 아니면 0.0
+    birth_rate = 1.0 if getattr(status, "birth_available", None) else 0.0
+    
+    congestion = (
+        general_rate * 0.45 +
+        child_rate * 0.20 +
+        negative_rate * 0.20 +
+        isolation_rate * 0.10 +
+        birth_rate * 0.05
+    )
+    
+    return congestion
+
+
+###########################################################
+# 168칸 배열 ↔ BinaryField (little-endian 고정)
+###########################################################
+
+def pack_slots(values, typecode="d"):
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack_slots(blob, typecode="d", fill=0.0):
+    arr = array(typecode)
+    if blob:
+        arr.frombytes(bytes(blob))
+        if sys.byteorder != "little":
+            arr.byteswap()
+    if len(arr) != HEATMAP_SLOTS:
+        return array(typecode, [fill] * HEATMAP_SLOTS)
+    return arr
+
+
+def heatmap_slot(bucket_start):
+    """시간 버킷 시작 → 0~167 (Asia/Seoul 요일 * 24 + 시)"""
+    local = timezone.localtime(bucket_start)
+    return local.weekday() * 24 + local.hour
+
+
+###########################################################
+# 증분 갱신
+###########################################################
+
+def _add_segments(sums, secs, segments, sign=1):
+    """iter_hour_segments 결과를 응급실별 168칸 (혼잡도 × 유지 시간) / 유지 시간에 더함 (sign=-1 이면 뺌)"""
+    scores = {}
+    for er_id, bucket_start, seconds, values in segments:
+        # 같은 이력 행이 여러 시간에 걸치면 점수는 1번만 계산
+        score = scores.get(id(values))
+        if score is None:
+            score = scores[id(values)] = calculate_congestion_score(SimpleNamespace(**values))
+
+        slot = heatmap_slot(bucket_start)
+        sums[er_id][slot] += sign * score * seconds
+        secs[er_id][slot] += sign * seconds
+
+
+def _correct_late_rows(sums, secs, until, seen_id, max_id):
+    """
+    지난 회차 이후 적재됐지만 hvdate 가 워터마크(until) 이전인 이력 → 해당 응급실의
+    [가장 이른 지연 행의 정시, until) 구간을 이전 이력(id <= seen_id)으로 빼고 현재 이력으로 다시 더함.
+    반환: 다시 계산한 응급실 수
+    """
+    late = dict(
+        ErStatusHistory.objects
+        .filter(id__gt=seen_id, id__lte=max_id, hvdate__lt=until)
+        .values("er_id")
+        .annotate(first=Min("hvdate"))
+        .values_list("er_id", "first")
+    )
+    if not late:
+        return 0
+
+    since = floor_hour(min(late.values()))
+    er_ids = list(late)
+    _add_segments(sums, secs, iter_hour_segments(since, until, er_ids, seen_id), sign=-1)
+    _add_segments(sums, secs, iter_hour_segments(since, until, er_ids, max_id))
+    return len(late)
+
+
+def update_heatmaps(now=None):
+    """
+    마지막 반영 시각(computed_until) ~ (현재 - HEATMAP_SETTLE) 정시까지의 이력을 히트맵에 더하고,
+    지난 회차 이후 늦게 적재된 이력(hvdate 가 computed_until 이전)은 영향 구간만 다시 계산한다.
+    반환: 갱신한 응급실 수
+    """
+    end = floor_hour((now or timezone.now()) - HEATMAP_SETTLE)
+
+    max_id = ErStatusHistory.objects.aggregate(last=Max("id"))["last"]
+    if max_id is None:
+        return 0
+
+    watermark = ErCongestionHeatmap.objects.aggregate(
+        until=Max("computed_until"), seen=Max("last_history_id")
+    )
+    start = watermark["until"]
+    seen_id = watermark["seen"] or 0
+
+    sums = defaultdict(lambda: [0.0] * HEATMAP_SLOTS)
+    secs = defaultdict(lambda: [0.0] * HEATMAP_SLOTS)
+
+    if start is None:
+        first = ErStatusHistory.objects.aggregate(first=Min("hvdate"))["first"]
+        start = floor_hour(first)
+    elif max_id > seen_id:
+        _correct_late_rows(sums, secs, start, seen_id, max_id)
+
+    end = max(start, min(end, start + HEATMAP_MAX_WINDOW))
+    if end > start:
+        _add_segments(sums, secs, iter_hour_segments(start, end, max_id=max_id))
+
+    if not sums and end == start:
+        return 0
+
+    existing = {
+        row.er_id: row
+        for row in ErCongestionHeatmap.objects.filter(er_id__in=sums.keys())
+    }
+
+    to_create = []
+    to_update = []
+    for er_id, new_sums in sums.items():
+        row = existing.get(er_id)
+        total_sums = unpack_slots(row.score_sums) if row else array("d", [0.0] * HEATMAP_SLOTS)
+        total_secs = unpack_slots(row.seconds) if row else array("d", [0.0] * HEATMAP_SLOTS)
+        for slot in range(HEATMAP_SLOTS):
+            total_sums[slot] += new_sums[slot]
+            # 빼고 다시 더한 칸의 부동소수 오차로 음수가 되지 않도록
+            total_secs[slot] = max(0.0, total_secs[slot] + secs[er_id][slot])
+
+        fields = {
+            "score_sums": pack_slots(total_sums),
+            "seconds": pack_slots(total_secs),
+            # 데이터가 없는 칸은 NaN
+            "means": pack_slots(
+                (s / t if t > 0 else float("nan") for s, t in zip(total_sums, total_secs)),
+                "f",
+            ),
+            "computed_until": end,
+            "last_history_id": max_id,
+        }
+        if row is None:
+            to_create.append(ErCongestionHeatmap(er_id=er_id, **fields))
+        else:
+            for name, value in fields.items():
+                setattr(row, name, value)
+            to_update.append(row)
+
+    if to_create:
+        ErCongestionHeatmap.objects.bulk_create(to_create, batch_size=200)
+    if to_update:
+        ErCongestionHeatmap.objects.bulk_update(
+            to_update,
+            ["score_sums", "seconds", "means", "computed_until", "last_history_id"],
+            batch_size=200,
+        )
+
+    # computed_until / last_history_id 는 응급실별 값이 아니라 전역 워터마크
+    # → 이번 구간에 합계가 바뀌지 않은 행도 함께 올림
+    # (구간 시작 시점 값(carry-in)이 있는 응급실은 위에서 모두 갱신되므로, 여기 해당하는 행은
+    #  이 구간에 반영할 이력이 없었던 것. 아직 행이 없는 응급실은 첫 이력이 생긴 구간부터 더해짐)
+    ErCongestionHeatmap.objects.filter(
+        Q(computed_until__lt=end) | Q(last_history_id__lt=max_id)
+    ).update(computed_until=end, last_history_id=max_id)
+
+    return len(sums)
+
+
+###########################################################
+# 조회
+###########################################################
+
+def get_heatmap(er_id):
+    """
+    {"weekdays": [...], "matrix": 7 × 24 (평균 혼잡도, 데이터 없으면 None), "computed_until"}
+    히트맵이 아직 없으면 None
+    """
+    row = (
+        ErCongestionHeatmap.objects
+        .filter(er_id=er_id)
+        .values("means", "computed_until")
+        .first()
+    )
+    if row is None:
+        return None
+
+    means = unpack_slots(row["means"], "f", fill=float("nan"))
+    cells = [None if m != m else round(m, 3) for m in means]  # NaN → None
+    return {
+        "weekdays": WEEKDAY_LABELS,
+        "matrix": [cells[day * 24:(day + 1) * 24] for day in range(7)],
+        "computed_until": timezone.localtime(row["computed_until"]).isoformat(),
+    }
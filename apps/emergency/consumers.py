@@ -0,0 +1,108 @@
+# apps/emergency/consumers.py
+
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from urllib.parse import parse_qs
+
+from apps.services import regions
+
+from .realtime import ALL_GROUP, er_group, sido_group
+
+# 연결 1개가 구독할 수 있는 응급실 그룹 수
+# 이보다 많은 카드를 보고 있으면 응급실별 그룹 대신 전체 그룹(ALL_GROUP)을 구독
+# (status_socket.js 의 MAX_ER_SUBSCRIPTIONS 와 같은 값)
+MAX_ER_SUBSCRIPTIONS = 200
+
+
+def _parse_er_ids(values):
+    er_ids = []
+    for value in values:
+        for part in str(value).split(","):
+            part = part.strip()
+            if part.isdigit():
+                er_ids.append(int(part))
+    return er_ids
+
+
+class ErStatusConsumer(AsyncWebsocketConsumer):
+    """
+    응급실 병상 상태 실시간 구독
+    주소 예시: ws://127.0.0.1:8000/ws/emergency/status/?sido=서울특별시
+             ws://127.0.0.1:8000/ws/emergency/status/?er=12,34,56
+             ws://127.0.0.1:8000/ws/emergency/status/?all=1   (전체 응급실)
+    연결 후 {"action": "subscribe", "er_ids": [...]} 로 응급실 구독 추가/교체 가능
+    - 응급실이 MAX_ER_SUBSCRIPTIONS 개보다 많으면 전체 그룹으로 대신 구독
+    - 시/도의 지역 기준 id 가 없으면(backfill_regions 전) 전체 그룹으로 대신 구독
+    (전체 그룹은 화면에 없는 카드의 변경도 오지만 status_socket.js 가 무시함)
+    """
+
+    async def connect(self):
+        self.groups_joined = set()
+        # 응급실 구독과 무관하게 전체 그룹을 유지해야 하는 경우 (?all=1 / 시/도 id 없음)
+        self.follow_all = False
+
+        query = parse_qs(self.scope.get("query_string", b"").decode("utf-8"))
+
+        sido = (query.get("sido") or [""])[0]
+        if sido and sido != "전체":
+            sido_id = await database_sync_to_async(regions.resolve_sido_id)(sido)
+            if sido_id is not None:
+                await self._join(sido_group(sido_id))
+            else:
+                self.follow_all = True
+
+        if (query.get("all") or [""])[0] == "1":
+            self.follow_all = True
+
+        await self._subscribe_ers(_parse_er_ids(query.get("er", [])))
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for group in list(self.groups_joined):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.groups_joined.clear()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "{}")
+        except ValueError:
+            return
+
+        if data.get("action") != "subscribe":
+            return
+
+        # 화면 목록이 바뀌면 응급실 구독을 통째로 교체 (시/도 그룹은 유지)
+        await self._subscribe_ers(_parse_er_ids(data.get("er_ids", [])))
+
+    async def _subscribe_ers(self, er_ids):
+        """응급실 그룹 구독 교체. 한도를 넘으면 응급실별 그룹 대신 전체 그룹"""
+        er_ids = set(er_ids)
+        if len(er_ids) > MAX_ER_SUBSCRIPTIONS:
+            wanted = {ALL_GROUP}
+        else:
+            wanted = {er_group(er_id) for er_id in er_ids}
+        if self.follow_all:
+            wanted.add(ALL_GROUP)
+
+        current = {
+            group for group in self.groups_joined
+            if group == ALL_GROUP or group.startswith("er_status_er_")
+        }
+        for group in current - wanted:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            self.groups_joined.discard(group)
+        for group in wanted - current:
+            await self._join(group)
+
+    async def _join(self, group):
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.groups_joined.add(group)
+
+    # 그룹 메시지 수신 (fetch_emergency 병합 후 realtime.publish_status_changes 에서 전송)
+    async def er_status(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "ER_STATUS",
+            "changes": event["changes"],
+        }, ensure_ascii=False))
@@ -0,0 +1,189 @@
+# apps/emergency/detail_bundle.py
+
+"""
+응급실 상세 모달(hospital_detail_json) 응답 번들 캐시.
+
+모달을 열 때마다 ErInfo / 최신 상태 / 최신 메시지 / AI 요약을 따로 조회하고
+병상 그래프 값(build_status_ui)을 6번 다시 계산하는 대신,
+사용자와 무관한 부분을 응급실별 번들 1개로 캐시에 저장해 둔다.
+(즐겨찾기 여부만 요청마다 따로 조회해서 덮어씀)
+
+- 키: BUNDLE_VERSION (번들 구조가 바뀌면 버전을 올림) + 스냅샷 버전 + er_id
+  병합으로 스냅샷 버전이 바뀌면 이전 번들은 모두 무효 (갱신 누락이 있어도 다음 병합까지만 유지)
+- 상태 병합(fetch_emergency) / 메시지 저장(fetch_emergency_message) / AI 요약 저장 시
+  해당 응급실 번들을 바로 다시 만든다 (refresh_detail_bundles)
+- 캐시가 없을 때 조회한 요청은 cache.add 로만 저장 → 조회 도중 refresh 가 먼저 저장한
+  새 번들을 이전 값으로 덮어쓰지 않음
+"""
+
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+
+from apps.db.models.emergency import ErInfo, ErMessage
+
+from .snapshot import get_snapshot_version
+from .templatetags import status_filters
+
+BUNDLE_VERSION = 1
+BUNDLE_KEY = "er_detail:v{version}:{snapshot}:{er_id}"
+
+# 상태 / 메시지 / AI 요약 변경 시 바로 다시 만들지만, ErInfo 수정 등은 TTL 로 반영
+BUNDLE_TTL_SECONDS = 60 * 60
+
+
+###########################################################
+# 병상 상태 → JSON 변환 (상세 모달 / 목록 API 공용)
+###########################################################
+
+STATUS_UI_TYPES = [
+    "er_general",
+    "er_child",
+    "birth",
+    "negative_pressure",
+    "isolation_general",
+    "isolation_cohort",
+]
+
+
+def build_status_ui(available, total, type_name: str):
+    """
+    메인 템플릿(status_filters)과 동일한 계산을 서버에서 수행한다.
+    그래프 표시 여부, 라벨/색상, stroke 값 등을 한 번 계산해 내려준다.
+    """
+    label = status_filters.congestion_text(available, total, type_name)
+    color_class = status_filters.congestion_color_class(available, total, type_name)
+
+    dash_offset = None
+    bg_stroke = "#e0e0e0"
+    if total is not None and total > 0 and available is not None:
+        dash_offset = status_filters.circle_dashoffset(available, total)
+        # available 0 & red일 때만 배경을 빨강으로 처리 (메인과 동일)
+        if available == 0 and color_class == "red":
+            bg_stroke = "#E53935"
+
+    return {
+        "label": label,
+        "color_class": color_class,
+        "dash_offset": dash_offset,  # None이면 그래프 미표시
+        "bg_stroke": bg_stroke,
+        "available": available,
+        "total": total,
+    }
+
+
+def build_status_payload(status):
+    """
+    ErStatus / ErLatestStatus 1행 → (status_data, status_ui, tags)
+    상태가 없으면 ({}, {}, [])
+    """
+    if not status:
+        return {}, {}, []
+
+    status_data = {}
+    status_ui = {}
+    for type_name in STATUS_UI_TYPES:
+        available = getattr(status, f"{type_name}_available")
+        total = getattr(status, f"{type_name}_total")
+        status_data[f"{type_name}_available"] = available
+        status_data[f"{type_name}_total"] = total
+        status_ui[type_name] = build_status_ui(available, total, type_name)
+
+    # 태그 리스트 생성
+    tags = []
+    if status.has_ct:
+        tags.append("CT")
+    if status.has_mri:
+        tags.append("MRI")
+    if status.has_angio:
+        tags.append("혈관조영")
+    if status.has_ventilator:
+        tags.append("인공호흡기")
+    if status.birth_available:
+        tags.append("분만실")
+
+    return status_data, status_ui, tags
+
+
+###########################################################
+# 상세 번들
+###########################################################
+
+def bundle_key(er_id, snapshot_version):
+    return BUNDLE_KEY.format(version=BUNDLE_VERSION, snapshot=snapshot_version, er_id=er_id)
+
+
+def _bundle_queryset():
+    """
+    최신 상태(ErLatestStatus) / AI 요약(AiReview) 은 1:1 이라 조인으로 함께 조회.
+    최신 메시지는 응급실별 1건만 서브쿼리로 가져옴 (메시지 이력 전체를 읽지 않음)
+    """
+    latest_message = (
+        ErMessage.objects
+        .filter(hospital_id=OuterRef("er_id"))
+        .order_by(F("message_time").desc(nulls_last=True), "-id")
+        .values("message")[:1]
+    )
+    return (
+        ErInfo.objects
+        .select_related("latest_status", "aireview")
+        .annotate(latest_message=Subquery(latest_message))
+    )
+
+
+def build_detail_bundle(er_info):
+    """ErInfo(+latest_status, aireview 조인, latest_message) 1행 → 상세 모달 JSON 중 사용자 무관 부분"""
+    latest_status = getattr(er_info, "latest_status", None)
+    ai_review = getattr(er_info, "aireview", None)
+
+    # 상태 데이터 + 메인 템플릿 계산 결과 + 장비 태그
+    status_data, status_ui, tags = build_status_payload(latest_status)
+
+    return {
+        "er_name": er_info.er_name,
+        "er_address": er_info.er_address,
+        "er_lat": er_info.er_lat,
+        "er_lng": er_info.er_lng,
+        "er_id": er_info.er_id,
+        "tags": tags,
+        "status": status_data,
+        "status_ui": status_ui,  # 메인과 동일한 계산 결과
+        "message": er_info.latest_message or None,
+        "ai_review": {
+            "summary": ai_review.summary or None,
+            "positive_ratio": float(ai_review.positive_ratio) if ai_review.positive_ratio is not None else None,
+            "negative_ratio": float(ai_review.negative_ratio) if ai_review.negative_ratio is not None else None,
+        } if ai_review else None,
+    }
+
+
+def get_detail_bundle(er_id):
+    """캐시된 번들 반환. 없으면 만들어서 저장 (응급실이 없으면 None)"""
+    key = bundle_key(er_id, get_snapshot_version())
+    bundle = cache.get(key)
+    if bundle is not None:
+        return bundle
+
+    er_info = _bundle_queryset().filter(er_id=er_id).first()
+    if er_info is None:
+        return None
+
+    bundle = build_detail_bundle(er_info)
+    # 이미 저장된 번들(refresh_detail_bundles 가 더 새 데이터로 저장한 것)이 있으면 덮어쓰지 않음
+    cache.add(key, bundle, BUNDLE_TTL_SECONDS)
+    return bundle
+
+
+def refresh_detail_bundles(er_ids):
+    """데이터가 바뀐 응급실들의 번들을 한 번에 다시 만들어 저장 (조회 1번 + set_many)"""
+    er_ids = list(set(er_ids))
+    if not er_ids:
+        return 0
+
+    snapshot_version = get_snapshot_version()
+    bundles = {
+        bundle_key(er_info.er_id, snapshot_version): build_detail_bundle(er_info)
+        for er_info in _bundle_queryset().filter(er_id__in=er_ids)
+    }
+    if bundles:
+        cache.set_many(bundles, BUNDLE_TTL_SECONDS)
+    return len(bundles)
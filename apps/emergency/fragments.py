@@ -0,0 +1,74 @@
+# apps/emergency/fragments.py
+
+"""
+응급실 카드 병상 그래프(_status_cells.html) 렌더링 결과 캐시.
+
+카드 1장마다 6칸 × status_filters 여러 번 호출이 반복되므로,
+(er_id, hvdate) 단위로 렌더링된 HTML 을 캐시에 저장해 두고 main.html 은 이어 붙이기만 한다.
+
+- fetch_emergency 병합 직후 변경된 병원만 미리 렌더링 (warm_status_fragments)
+- 같은 (er_id, hvdate) 의 값이 바뀌어도 warm 단계에서 덮어쓰므로 이전 HTML 이 남지 않음
+- 템플릿을 고치면 FRAGMENT_VERSION 을 올려서 이전 캐시를 무효화
+"""
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+FRAGMENT_TEMPLATE = "emergency/_status_cells.html"
+FRAGMENT_VERSION = 1
+FRAGMENT_KEY = "er_status_fragment:v{version}:{er_id}:{hvdate}"
+FRAGMENT_TTL_SECONDS = 60 * 60
+
+# 최신 상태가 없는 병원은 모두 같은 HTML ("-" 6칸)
+EMPTY_FRAGMENT_KEY = "er_status_fragment:v{version}:empty"
+
+
+def fragment_key(status):
+    if status is None:
+        return EMPTY_FRAGMENT_KEY.format(version=FRAGMENT_VERSION)
+
+    # 타임존이 달라도 같은 시각이면 같은 키가 되도록 epoch 초 사용
+    hvdate = int(status.hvdate.timestamp()) if status.hvdate else "none"
+    return FRAGMENT_KEY.format(version=FRAGMENT_VERSION, er_id=status.er_id, hvdate=hvdate)
+
+
+def render_status_fragment(status):
+    return render_to_string(FRAGMENT_TEMPLATE, {"st": status})
+
+
+def attach_status_fragments(hospitals):
+    """
+    각 병원 객체에 status_cells_html 을 붙인다.
+    캐시에 없는 것만 렌더링해서 한 번에 저장 (get_many / set_many)
+    """
+    statuses = {hos.er_id: getattr(hos, "latest_status", None) for hos in hospitals}
+    keys = {er_id: fragment_key(status) for er_id, status in statuses.items()}
+
+    cached = cache.get_many(set(keys.values()))
+
+    missing = {}
+    for er_id, key in keys.items():
+        if key not in cached and key not in missing:
+            missing[key] = render_status_fragment(statuses[er_id])
+
+    if missing:
+        cache.set_many(missing, FRAGMENT_TTL_SECONDS)
+        cached.update(missing)
+
+    for hos in hospitals:
+        hos.status_cells_html = mark_safe(cached[keys[hos.er_id]])
+
+
+def warm_status_fragments(statuses):
+    """
+    병합으로 바뀐 ErLatestStatus 들의 HTML 을 미리 렌더링해서 캐시에 저장.
+    반환: {er_id: HTML} (실시간 전송(realtime)에서 그대로 사용)
+    """
+    rendered = {status.er_id: render_status_fragment(status) for status in statuses}
+    if rendered:
+        cache.set_many(
+            {fragment_key(status): rendered[status.er_id] for status in statuses},
+            FRAGMENT_TTL_SECONDS,
+        )
+    return rendered
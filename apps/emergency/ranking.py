@@ -0,0 +1,84 @@
+# apps/emergency/ranking.py
+
+"""
+응급실 목록 순위 캐시.
+
+같은 동네(위치 격자 셀)에서 같은 응급유형/장비칩/정렬을 고른 사용자는 같은 순위를 보게 되므로,
+순위 계산 결과(er_id 순서 + 점수 + 거리)를 캐시에 저장해 두고 재사용한다.
+
+- 키: 위치 셀 + selected_etype + 장비 필터 집합 + 정렬 + (시/군/구) + 스냅샷 버전
+- 스냅샷 버전이 키에 들어가므로 fetch_emergency 병합이 끝나면 이전 순위는 한꺼번에 무효화
+- 순위는 셀 중심 좌표 기준으로 계산하고, 화면에 표시하는 거리만 사용자 실제 위치로 다시 계산
+"""
+
+import hashlib
+import json
+import math
+
+from django.core.cache import cache
+
+from .snapshot import get_snapshot_version
+
+# 위치 양자화 셀 크기: 0.01도 (위도 방향 약 1.1km, 경도 방향 약 0.9km)
+RANKING_CELL_DEG = 0.01
+
+# 셀 중심 기준으로 후보를 고를 때 반경에 더하는 여유
+# (셀 안 임의 위치 ↔ 셀 중심 최대 거리 약 0.79km 보다 크게 → 실제 위치 기준 반경 안의 응급실을 놓치지 않음)
+RANKING_CELL_MARGIN_KM = 1.0
+
+# 스냅샷 버전이 바뀌지 않아도 순위를 보관하는 최대 시간
+RANKING_TTL_SECONDS = 60 * 10
+
+
+def location_cell(lat, lng):
+    """사용자 위치 → (row, col) 셀. 위치 정보가 없으면 None"""
+    if not (lat and lng):
+        return None
+    return (math.floor(lat / RANKING_CELL_DEG), math.floor(lng / RANKING_CELL_DEG))
+
+
+def cell_center(cell):
+    row, col = cell
+    return ((row + 0.5) * RANKING_CELL_DEG, (col + 0.5) * RANKING_CELL_DEG)
+
+
+def ranking_key(cell, etype, equips, sort, sigungu):
+    parts = {
+        "cell": list(cell) if cell else None,
+        "etype": etype or "",
+        "equips": sorted(equips),
+        "sort": sort or "",
+        "sigungu": sigungu or "",
+    }
+    digest = hashlib.md5(
+        json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return f"er_ranking:{get_snapshot_version()}:{digest}"
+
+
+def get_ranking(key):
+    """[(er_id, score, distance_km), ...] 또는 None"""
+    return cache.get(key)
+
+
+def set_ranking(key, hospitals):
+    entries = [(hos.er_id, hos.score, hos.distance_km) for hos in hospitals]
+    cache.set(key, entries, RANKING_TTL_SECONDS)
+
+
+def load_ranked_hospitals(hospitals_qs, entries):
+    """
+    캐시된 순위대로 병원 객체를 한 번의 쿼리로 불러와 score / distance_km 를 붙여 반환.
+    (그 사이 삭제된 병원은 건너뜀)
+    """
+    hospital_map = hospitals_qs.in_bulk([er_id for er_id, _, _ in entries])
+
+    hospitals = []
+    for er_id, score, distance_km in entries:
+        hos = hospital_map.get(er_id)
+        if hos is None:
+            continue
+        hos.score = score
+        hos.distance_km = distance_km
+        hospitals.append(hos)
+    return hospitals
@@ -0,0 +1,174 @@
+# apps/emergency/realtime.py
+
+"""
+응급실 병상 상태 실시간 전송 (Channels).
+
+fetch_emergency 병합이 커밋되면 바뀐 응급실만 모아서
+- 시/도 그룹 (er_status_sido_{sido_id}) : 시/도를 선택해서 보고 있는 화면
+- 응급실 그룹 (er_status_er_{er_id})   : 화면에 보이는 카드만 구독한 경우 (전국 / 위치 기반 목록)
+- 전체 그룹 (er_status_all)            : 카드가 구독 한도(MAX_ER_SUBSCRIPTIONS)보다 많은 목록,
+                                         지역 기준 id 가 아직 없는 시/도 화면 (consumers.py)
+으로 보낸다. 브라우저는 화면에 있는 카드만 제자리에서 교체한다 (status_socket.js).
+
+그룹 이름에는 한글을 쓸 수 없으므로 지역 기준 테이블(region_sido)의 정수 id 를 사용.
+region_sido_id 가 비어 있는 응급실(backfill_regions 이후 추가된 행 등)은 시/도 이름으로 id 를 찾고,
+그래도 없으면 시/도 그룹에는 보내지 못하므로 건수를 출력한다 (응급실 / 전체 그룹으로는 전송됨).
+
+WebSocket 을 쓸 수 없는 클라이언트(프록시 뒤 키오스크 등)용 SSE 피드도 같은 변경분을 사용한다.
+- 병합 1번 = 이벤트 1개 (순번 id), 최근 FEED_BACKLOG 개는 캐시에 보관 → Last-Event-ID 재개
+- 실시간 이벤트는 FEED_GROUP 으로 전송 (views.er_status_stream 이 구독)
+"""
+
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.db.models.emergency import ErInfo
+from apps.services import regions
+
+SIDO_GROUP = "er_status_sido_{sido_id}"
+ER_GROUP = "er_status_er_{er_id}"
+ALL_GROUP = "er_status_all"
+
+# consumer 메서드 이름 (ErStatusConsumer.er_status)
+EVENT_TYPE = "er.status"
+
+# SSE 피드
+FEED_GROUP = "er_status_feed"
+FEED_EVENT_TYPE = "er.feed"
+FEED_SEQ_KEY = "er_status_feed:seq"
+FEED_EVENT_KEY = "er_status_feed:event:{seq}"
+FEED_BACKLOG = 100                 # Last-Event-ID 로 재개 가능한 최근 이벤트 수
+FEED_TTL_SECONDS = 60 * 60
+
+
+def sido_group(sido_id):
+    return SIDO_GROUP.format(sido_id=sido_id)
+
+
+def er_group(er_id):
+    return ER_GROUP.format(er_id=er_id)
+
+
+def _local_hvdate(status):
+    # main.html 의 data-hvdate 와 같은 형식 (Asia/Seoul)
+    if not status.hvdate:
+        return None
+    return timezone.localtime(status.hvdate).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_change(status, cells_html):
+    """카드 1장 교체에 필요한 최소 정보"""
+    return {
+        "er_id": status.er_id,
+        "hvdate": _local_hvdate(status),
+        "cells": cells_html,
+    }
+
+
+def build_feed_change(status, sido_id):
+    """SSE 피드용: 바뀐 컬럼 값만 (sync_latest_status 가 changed_fields 를 채워 둠)"""
+    return {
+        "er_id": status.er_id,
+        "sido_id": sido_id,
+        "hvdate": _local_hvdate(status),
+        "fields": getattr(status, "changed_fields", {}),
+    }
+
+
+###########################################################
+# SSE 피드 이벤트 로그 (캐시)
+###########################################################
+
+def append_feed_event(changes):
+    """이벤트 1개 기록 후 순번 id 반환"""
+    cache.add(FEED_SEQ_KEY, 0, None)
+    seq = cache.incr(FEED_SEQ_KEY)
+    cache.set(FEED_EVENT_KEY.format(seq=seq), changes, FEED_TTL_SECONDS)
+    return seq
+
+
+def feed_events_since(last_id):
+    """
+    last_id 이후 이벤트 [(id, changes), ...] 와 누락 없이 이어지는지 여부 반환.
+    보관 범위(FEED_BACKLOG / TTL)를 벗어났으면 complete=False → 클라이언트는 전체 다시 조회
+    """
+    current = cache.get(FEED_SEQ_KEY) or 0
+    if last_id >= current:
+        # 캐시가 초기화되어 순번이 되돌아간 경우도 여기로 옴
+        return [], last_id == current
+
+    start = max(last_id + 1, current - FEED_BACKLOG + 1)
+    keys = {FEED_EVENT_KEY.format(seq=seq): seq for seq in range(start, current + 1)}
+    found = cache.get_many(keys.keys())
+
+    events = [(keys[key], found[key]) for key in keys if key in found]
+    complete = start == last_id + 1 and len(events) == len(keys)
+    return events, complete
+
+
+def publish_status_changes(statuses, cells_map):
+    """
+    statuses: 병합으로 바뀐 ErLatestStatus 리스트
+    cells_map: {er_id: 병상 그래프 HTML} (fragments.warm_status_fragments 결과)
+    반환: 전송한 그룹 메시지 수
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not statuses:
+        return 0
+
+    sido_map = {}
+    unresolved = 0
+    for er_id, sido_id, sido in (
+        ErInfo.objects
+        .filter(er_id__in=[status.er_id for status in statuses])
+        .values_list("er_id", "region_sido_id", "er_sido")
+    ):
+        if sido_id is None:
+            sido_id = regions.resolve_sido_id(sido)
+            if sido_id is None:
+                unresolved += 1
+        sido_map[er_id] = sido_id
+
+    by_sido = defaultdict(list)
+    changes = []
+    messages = []
+    for status in statuses:
+        change = build_change(status, cells_map.get(status.er_id))
+        changes.append(change)
+        messages.append((er_group(status.er_id), {"type": EVENT_TYPE, "changes": [change]}))
+
+        sido_id = sido_map.get(status.er_id)
+        if sido_id is not None:
+            by_sido[sido_id].append(change)
+
+    messages += [
+        (sido_group(sido_id), {"type": EVENT_TYPE, "changes": sido_changes})
+        for sido_id, sido_changes in by_sido.items()
+    ]
+    messages.append((ALL_GROUP, {"type": EVENT_TYPE, "changes": changes}))
+
+    if unresolved:
+        print(
+            f"[REALTIME] 지역 기준 id 가 없는 응급실 {unresolved}건 → 시/도 그룹 전송 제외 "
+            f"(python manage.py backfill_regions 필요)"
+        )
+
+    send = async_to_sync(channel_layer.group_send)
+    sent = 0
+    try:
+        # SSE 피드: 이벤트 로그에 먼저 기록해서 id 를 정한 뒤 전송
+        feed_changes = [build_feed_change(status, sido_map.get(status.er_id)) for status in statuses]
+        feed_id = append_feed_event(feed_changes)
+        messages.append((FEED_GROUP, {"type": FEED_EVENT_TYPE, "id": feed_id, "changes": feed_changes}))
+
+        for group, message in messages:
+            send(group, message)
+            sent += 1
+    except Exception as e:
+        # Redis 장애 등으로 전송 실패해도 수집 자체는 성공 처리 (다음 병합 때 다시 전송됨)
+        print(f"[REALTIME][ERROR] 전송 실패: {e}")
+    return sent
@@ -0,0 +1,7 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    # 주소 예시: ws://127.0.0.1:8000/ws/emergency/status/?sido=서울특별시
+    re_path(r'ws/emergency/status/$', consumers.ErStatusConsumer.as_asgi()),
+]
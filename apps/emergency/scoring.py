@@ -0,0 +1,255 @@
+# apps/emergency/scoring.py
+
+"""
+응급실 점수 일괄 계산 엔진 (NumPy 벡터 연산).
+
+views.calculate_score / congestion.calculate_congestion_score 와 같은 식을
+병원 1곳씩이 아니라 전체 후보에 대해 한 번에 계산한다.
+
+- 좌표, 병상 가용/전체 수, 장비 여부, 장비/병상 비트마스크를 열(column) 단위 배열로 보관
+- 배열은 프로세스마다 1번 만들고, fetch_emergency 병합으로 스냅샷 버전이 바뀌면 다시 만든다
+- numpy 가 설치되지 않은 환경에서는 is_available() 이 False → 호출 측에서 기존 경로 사용
+"""
+
+import time
+
+try:
+    import numpy as np
+except ImportError:  # numpy 없는 환경에서는 기존 병원별 계산 경로를 사용
+    np = None
+
+from apps.db.models.emergency import ErInfo
+
+from .snapshot import get_snapshot_version
+
+EARTH_RADIUS_KM = 6371.0
+
+# 거리 점수 정규화 기준 (30km = 0점, 0km = 1점)
+DISTANCE_NORM_KM = 30.0
+
+# 스냅샷 버전을 못 읽는 경우(캐시 재시작 등) 배열을 강제로 다시 만드는 주기
+ENGINE_MAX_AGE_SECONDS = 10 * 60
+
+# (가용 컬럼, 전체 컬럼) - 혼잡도 계산에 쓰이는 병상 종류
+_RATE_COLUMNS = [
+    ("er_general_available", "er_general_total"),
+    ("er_child_available", "er_child_total"),
+    ("negative_pressure_available", "negative_pressure_total"),
+    ("isolation_general_available", "isolation_general_total"),
+]
+
+_STATUS_PREFIX = "latest_status__"
+
+
+def is_available():
+    return np is not None
+
+
+class ErScoringEngine:
+    """
+    응급실 전체의 점수 계산용 배열 묶음.
+    rows: ErInfo.values() 결과 (er_id, 좌표, latest_status__ 병상/장비 컬럼)
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: r["er_id"])
+        n = len(rows)
+
+        self.er_ids = np.fromiter((r["er_id"] for r in rows), dtype=np.int64, count=n)
+
+        # 좌표: None 또는 0 이면 거리 계산 불가 (calculate_score 의 truthy 검사와 동일)
+        lat = np.array([r["er_lat"] or np.nan for r in rows], dtype=np.float64)
+        lng = np.array([r["er_lng"] or np.nan for r in rows], dtype=np.float64)
+        self.has_coord = ~(np.isnan(lat) | np.isnan(lng))
+        self.lat = np.where(self.has_coord, lat, 0.0)
+        self.lng = np.where(self.has_coord, lng, 0.0)
+
+        # 병상 가용률: total > 0 일 때만 (available or 0) / total, 나머지는 0
+        rates = []
+        for avail_col, total_col in _RATE_COLUMNS:
+            avail = np.array(
+                [r[_STATUS_PREFIX + avail_col] or 0 for r in rows], dtype=np.float64
+            )
+            total = np.array(
+                [r[_STATUS_PREFIX + total_col] or 0 for r in rows], dtype=np.float64
+            )
+            rate = np.zeros(n, dtype=np.float64)
+            np.divide(avail, total, out=rate, where=total > 0)
+            rates.append(rate)
+        self.general_rate, self.child_rate, self.negative_rate, self.isolation_rate = rates
+
+        # 분만실 / 장비 플래그 (최신 상태가 없는 병원은 모두 False)
+        self.birth_flag = np.array(
+            [bool(r[_STATUS_PREFIX + "birth_available"]) for r in rows], dtype=bool
+        )
+        self.ct_or_mri = np.array(
+            [
+                bool(r[_STATUS_PREFIX + "has_ct"]) or bool(r[_STATUS_PREFIX + "has_mri"])
+                for r in rows
+            ],
+            dtype=bool,
+        )
+
+        # 장비/병상 비트마스크 (capabilities.CAP_*, 최신 상태가 없으면 0)
+        self.capabilities = np.array(
+            [r[_STATUS_PREFIX + "capability_mask"] or 0 for r in rows], dtype=np.uint16
+        )
+
+        birth_rate = self.birth_flag.astype(np.float64)
+        self.congestion = (
+            self.general_rate * 0.45 +
+            self.child_rate * 0.20 +
+            self.negative_rate * 0.20 +
+            self.isolation_rate * 0.10 +
+            birth_rate * 0.05
+        )
+
+    def __len__(self):
+        return len(self.er_ids)
+
+    @classmethod
+    def from_db(cls):
+        fields = ["er_id", "er_lat", "er_lng"]
+        fields += [_STATUS_PREFIX + a for a, _ in _RATE_COLUMNS]
+        fields += [_STATUS_PREFIX + t for _, t in _RATE_COLUMNS]
+        fields += [
+            _STATUS_PREFIX + "birth_available",
+            _STATUS_PREFIX + "has_ct",
+            _STATUS_PREFIX + "has_mri",
+            _STATUS_PREFIX + "capability_mask",
+        ]
+        return cls(list(ErInfo.objects.values(*fields)))
+
+    def positions(self, er_ids):
+        """er_id 목록 → 배열 인덱스 (엔진에 없는 er_id 는 제외하고 함께 반환)"""
+        er_ids = np.asarray(list(er_ids), dtype=np.int64)
+        if len(self.er_ids) == 0:
+            return er_ids[:0], np.zeros(0, dtype=np.int64)
+
+        pos = np.searchsorted(self.er_ids, er_ids)
+        pos = np.minimum(pos, len(self.er_ids) - 1)
+        found = self.er_ids[pos] == er_ids
+        return er_ids[found], pos[found]
+
+    def filter_capabilities(self, er_ids, mask):
+        """
+        er_id 목록 중 mask 비트를 하나라도 가진 응급실만 반환 (장비 필터 OR 조건).
+        엔진에 없는 er_id 는 제외된다.
+        """
+        ids, pos = self.positions(er_ids)
+        return ids[(self.capabilities[pos] & mask) != 0].tolist()
+
+    def distances(self, user_lat, user_lng, pos):
+        """
+        하버사인 거리(km). 사용자/병원 좌표가 없으면 NaN.
+        """
+        dist = np.full(len(pos), np.nan, dtype=np.float64)
+        if not (user_lat and user_lng):
+            return dist
+
+        valid = self.has_coord[pos]
+        p = pos[valid]
+
+        rlat1 = np.radians(user_lat)
+        rlon1 = np.radians(user_lng)
+        rlat2 = np.radians(self.lat[p])
+        rlon2 = np.radians(self.lng[p])
+
+        dlat = rlat2 - rlat1
+        dlon = rlon2 - rlon1
+
+        a = np.sin(dlat / 2) ** 2 + np.cos(rlat1) * np.cos(rlat2) * np.sin(dlon / 2) ** 2
+        dist[valid] = EARTH_RADIUS_KM * (2 * np.arcsin(np.sqrt(a)))
+        return dist
+
+    def score(self, user_lat, user_lng, filter_type=None, er_ids=None):
+        """
+        후보 전체의 (er_ids, total_scores, distances_km) 를 한 번에 계산.
+        - er_ids 를 생략하면 엔진에 있는 모든 응급실이 대상
+        - distances_km 의 NaN 은 calculate_score 의 distance_km=None 과 같은 의미
+        """
+        if er_ids is None:
+            ids = self.er_ids
+            pos = np.arange(len(self.er_ids))
+        else:
+            ids, pos = self.positions(er_ids)
+
+        dist = self.distances(user_lat, user_lng, pos)
+        distance_score = np.where(
+            np.isnan(dist), 0.0, np.maximum(0, 1 - (dist / DISTANCE_NORM_KM))
+        )
+        congestion = self.congestion[pos]
+
+        if filter_type == "stroke" or filter_type == "traffic":
+            # 거리 60% + 혼잡도 30% + 장비(CT 또는 MRI) 10%
+            equipment_score = self.ct_or_mri[pos].astype(np.float64)
+            total = (
+                distance_score * 0.60 +
+                congestion * 0.30 +
+                equipment_score * 0.10
+            )
+        elif filter_type == "cardio":
+            # 거리 80% + 혼잡도 20%
+            total = (
+                distance_score * 0.80 +
+                congestion * 0.20
+            )
+        elif filter_type == "obstetrics":
+            # 거리 40% + 혼잡도 30% + 분만실 가용 여부 30%
+            birth_rate = self.birth_flag[pos].astype(np.float64)
+            total = (
+                distance_score * 0.40 +
+                congestion * 0.30 +
+                birth_rate * 0.30
+            )
+        else:
+            # 기본: 거리 60% + 혼잡도 40%
+            total = (
+                distance_score * 0.60 +
+                congestion * 0.40
+            )
+
+        return ids, total, dist
+
+
+###########################################################
+# 프로세스 단위 엔진 캐시
+###########################################################
+
+# (snapshot_version, built_at, engine)
+_ENGINE = None
+
+
+def get_engine():
+    """
+    현재 스냅샷 버전에 맞는 엔진 반환 (numpy 없으면 None).
+    병합으로 버전이 바뀌었거나 ENGINE_MAX_AGE_SECONDS 가 지났으면 다시 만든다.
+    """
+    global _ENGINE
+
+    if np is None:
+        return None
+
+    version = get_snapshot_version()
+    if _ENGINE is not None:
+        built_version, built_at, engine = _ENGINE
+        fresh = time.monotonic() - built_at < ENGINE_MAX_AGE_SECONDS
+        if built_version == version and fresh:
+            return engine
+
+    engine = ErScoringEngine.from_db()
+    _ENGINE = (version, time.monotonic(), engine)
+    return engine
+
+
+def score_map(user_lat, user_lng, filter_type, er_ids):
+    """
+    {er_id: (score, distance_km or None)} 형태로 반환.
+    views 의 병원별 루프에서 calculate_score 대신 조회용으로 사용한다.
+    """
+    engine = get_engine()
+    ids, total, dist = engine.score(user_lat, user_lng, filter_type, er_ids)
+    return {
+        er_id: (score, None if d != d else d)  # NaN → None
+        for er_id, score, d in zip(ids.tolist(), total.tolist(), dist.tolist())
+    }
@@ -0,0 +1,21 @@
+# apps/emergency/signals.py
+
+"""
+AI 요약(AiReview) 저장 / 삭제 시 해당 응급실의 상세 모달 번들을 다시 만든다.
+(AI 요약은 관리자 화면이나 별도 스크립트에서 저장되므로 모델 시그널로 처리)
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.db.models.review import AiReview
+
+from .detail_bundle import refresh_detail_bundles
+
+
+@receiver(post_save, sender=AiReview)
+@receiver(post_delete, sender=AiReview)
+def refresh_bundle_on_ai_review_change(sender, instance, **kwargs):
+    if instance.er_id:
+        transaction.on_commit(lambda: refresh_detail_bundles([instance.er_id]))
@@ -0,0 +1,52 @@
+# apps/emergency/snapshot.py
+
+"""
+응급실 병상 스냅샷 버전 관리.
+
+fetch_emergency 가 STAGING → MAIN 병합을 끝낼 때마다 버전을 올리고,
+웹 프로세스의 메모리 캐시(점수 계산용 배열 등)는 이 버전이 바뀌면 다시 만든다.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from apps.db.models.emergency import ErLatestStatus
+
+SNAPSHOT_VERSION_KEY = "er_snapshot:version"
+LATEST_HVDATE_KEY = "er_snapshot:latest_hvdate"
+
+# 버전별 최신 hvdate 보관 시간 (버전을 모르는 경우는 짧게)
+LATEST_HVDATE_TTL_SECONDS = 60 * 60 * 24
+UNVERSIONED_HVDATE_TTL_SECONDS = 60
+
+
+def get_snapshot_version():
+    """현재 스냅샷 버전 (한 번도 병합되지 않았거나 캐시가 비었으면 None)"""
+    return cache.get(SNAPSHOT_VERSION_KEY)
+
+
+def bump_snapshot_version():
+    """병합 완료 후 호출 → 새 버전 값(밀리초 타임스탬프)을 저장하고 반환"""
+    version = int(time.time() * 1000)
+    cache.set(SNAPSHOT_VERSION_KEY, version, None)
+    return version
+
+
+def get_latest_hvdate():
+    """
+    마지막으로 병합된 데이터의 최신 hvdate (ISO 문자열, 데이터가 없으면 "").
+    스냅샷 버전별로 1번만 DB 에서 읽고 캐시에 보관한다.
+    """
+    version = get_snapshot_version()
+    key = f"{LATEST_HVDATE_KEY}:{version}"
+
+    value = cache.get(key)
+    if value is None:
+        hvdate = ErLatestStatus.objects.aggregate(latest=Max("hvdate"))["latest"]
+        value = hvdate.isoformat() if hvdate else ""
+        # 버전이 없으면 병합 여부를 알 수 없으므로 짧게만 보관
+        timeout = LATEST_HVDATE_TTL_SECONDS if version is not None else UNVERSIONED_HVDATE_TTL_SECONDS
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,84 @@
+// ===============================
+// 응급실 병상 상태 실시간 반영 (WebSocket)
+// - 시/도 선택 시: 해당 시/도 그룹 구독
+// - 전국 / 위치 기반 목록: 화면에 보이는 카드(er_id)만 구독
+//   (카드가 MAX_ER_SUBSCRIPTIONS 개보다 많으면 전체 응급실 구독, 화면에 없는 카드 변경은 무시)
+// - 서버에서 바뀐 응급실만 보내주면 해당 카드의 병상 그래프 6칸만 교체
+// ===============================
+(function () {
+  const MAX_RETRY_DELAY_MS = 60 * 1000;
+  // consumers.MAX_ER_SUBSCRIPTIONS 와 같은 값
+  const MAX_ER_SUBSCRIPTIONS = 200;
+  let retryDelay = 1000;
+
+  function visibleErIds() {
+    return Array.from(document.querySelectorAll('.row[data-er-id]'))
+      .map(row => row.getAttribute('data-er-id'));
+  }
+
+  function socketUrl() {
+    const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+    const params = new URLSearchParams();
+    const sido = window.selectedSido || '';
+
+    if (sido && sido !== '전체') {
+      params.set('sido', sido);
+    } else {
+      const erIds = visibleErIds();
+      if (erIds.length > MAX_ER_SUBSCRIPTIONS) {
+        params.set('all', '1');
+      } else {
+        params.set('er', erIds.join(','));
+      }
+    }
+    return scheme + window.location.host + '/ws/emergency/status/?' + params.toString();
+  }
+
+  function applyChange(change) {
+    const row = document.querySelector(`.row[data-er-id="${change.er_id}"]`);
+    if (!row || !change.cells) return;
+
+    // 병상 그래프 6칸 = 기관명 칸 다음의 6개 div
+    const template = document.createElement('template');
+    template.innerHTML = change.cells.trim();
+    const newCells = Array.from(template.content.children);
+    const oldCells = Array.from(row.children).slice(1, 1 + newCells.length);
+    if (oldCells.length !== newCells.length) return;
+
+    oldCells.forEach((cell, i) => cell.replaceWith(newCells[i]));
+
+    // 업데이트 시각 갱신
+    const timeEl = row.querySelector('.update-time');
+    if (timeEl && change.hvdate) {
+      timeEl.setAttribute('data-hvdate', change.hvdate);
+    }
+  }
+
+  function connect() {
+    if (!document.querySelector('.row[data-er-id]')) return;
+
+    const socket = new WebSocket(socketUrl());
+
+    socket.onopen = function () {
+      retryDelay = 1000;
+    };
+
+    socket.onmessage = function (e) {
+      const data = JSON.parse(e.data);
+      if (data.type !== 'ER_STATUS') return;
+
+      (data.changes || []).forEach(applyChange);
+      if (typeof updateTimeDisplay === 'function') {
+        updateTimeDisplay();
+      }
+    };
+
+    // 연결 끊김 → 지수 백오프로 재연결
+    socket.onclose = function () {
+      setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY_MS);
+    };
+  }
+
+  document.addEventListener('DOMContentLoaded', connect);
+})();
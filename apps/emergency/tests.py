@@ -1,3 +1,786 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import math
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.db.models import ErCongestionHeatmap, ErStatusHistory, RegionSido
+from apps.db.models.emergency import ErInfo, ErLatestStatus, ErMessage
+from apps.db.models.review import AiReview
+from apps.services import regions
+from apps.services.spatial_index import haversine_km, invalidate_index
+from apps.services.status_history import month_key
+
+from . import detail_bundle, ranking, realtime, scoring, views
+from .capabilities import capability_mask, equips_mask, filter_by_capability
+from .consumers import MAX_ER_SUBSCRIPTIONS, ErStatusConsumer
+from .congestion import (
+    HEATMAP_SLOTS,
+    get_heatmap,
+    heatmap_slot,
+    pack_slots,
+    unpack_slots,
+    update_heatmaps,
+)
+from .snapshot import bump_snapshot_version
+from .views import calculate_congestion_score, calculate_score
+
+FILTER_TYPES = [None, "", "stroke", "traffic", "cardio", "obstetrics"]
+
+USER_LOCATIONS = [
+    (37.5665, 126.9780),   # 서울 시청
+    (35.1796, 129.0756),   # 부산
+    (36.3504, 127.3845),   # 대전
+    (None, None),          # 위치 정보 없음
+    (0.0, 127.0),          # 위도 0 → 기존 로직상 거리 계산 안 함
+]
+
+
+class ErScoringEngineParityTest(TestCase):
+    """NumPy 일괄 계산 결과가 병원별 calculate_score 결과와 같은지 확인"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(2024)
+
+        def maybe(max_value):
+            return rnd.choice([None, 0, -1, rnd.randint(0, max_value)])
+
+        for i in range(150):
+            er = ErInfo.objects.create(
+                hpid=f"T{i:05d}",
+                er_name=f"테스트병원{i}",
+                er_address="주소",
+                er_sido="서울특별시",
+                er_sigungu="중구",
+                er_lat=rnd.choice([None, 0.0, rnd.uniform(34.5, 38.0)]) if i % 10 == 0
+                else rnd.uniform(34.5, 38.0),
+                er_lng=rnd.uniform(126.0, 129.5),
+            )
+            if i % 7 == 0:
+                continue  # 최신 상태가 없는 병원
+
+            ErLatestStatus.objects.create(
+                er=er,
+                er_general_available=maybe(30),
+                er_general_total=maybe(30),
+                er_child_available=maybe(10),
+                er_child_total=maybe(10),
+                birth_available=maybe(3),
+                birth_total=maybe(3),
+                negative_pressure_available=maybe(5),
+                negative_pressure_total=maybe(5),
+                isolation_general_available=maybe(5),
+                isolation_general_total=maybe(5),
+                isolation_cohort_available=maybe(3),
+                isolation_cohort_total=maybe(3),
+                has_ct=rnd.choice([True, False, None]),
+                has_mri=rnd.choice([True, False, None]),
+                has_angio=rnd.choice([True, False, None]),
+                has_ventilator=rnd.choice([True, False, None]),
+            )
+
+    def setUp(self):
+        if not scoring.is_available():
+            self.skipTest("numpy not installed")
+
+        self.engine = scoring.ErScoringEngine.from_db()
+        self.hospitals = {
+            hos.er_id: hos for hos in ErInfo.objects.select_related("latest_status")
+        }
+
+    def test_congestion_matches_scalar(self):
+        for er_id, congestion in zip(self.engine.er_ids.tolist(), self.engine.congestion.tolist()):
+            status = getattr(self.hospitals[er_id], "latest_status", None)
+            self.assertEqual(congestion, calculate_congestion_score(status))
+
+    def test_scores_and_ranking_match_scalar(self):
+        for user_lat, user_lng in USER_LOCATIONS:
+            for filter_type in FILTER_TYPES:
+                ids, totals, dists = self.engine.score(user_lat, user_lng, filter_type)
+
+                expected = {}
+                for er_id, hos in self.hospitals.items():
+                    status = getattr(hos, "latest_status", None)
+                    expected[er_id] = calculate_score(hos, user_lat, user_lng, filter_type, status)
+
+                for er_id, total, dist in zip(ids.tolist(), totals.tolist(), dists.tolist()):
+                    exp_score, exp_dist = expected[er_id]
+                    # np.arcsin 은 CPU(SIMD)에 따라 libm 과 1ulp 차이가 날 수 있어 거리 항만 허용오차 비교
+                    self.assertAlmostEqual(total, exp_score, delta=1e-12)
+                    if exp_dist is None:
+                        self.assertTrue(math.isnan(dist))
+                    else:
+                        self.assertAlmostEqual(dist, exp_dist, delta=1e-9)
+
+                vector_rank = [
+                    er_id for _, er_id in sorted(
+                        zip(totals.tolist(), ids.tolist()), key=lambda x: (-x[0], x[1])
+                    )
+                ]
+                scalar_rank = sorted(expected, key=lambda er_id: (-expected[er_id][0], er_id))
+                self.assertEqual(vector_rank, scalar_rank)
+
+    def test_subset_scoring_skips_unknown_ids(self):
+        some_ids = list(self.hospitals)[:10] + [999999]
+        ids, totals, _ = self.engine.score(37.5, 127.0, "cardio", some_ids)
+
+        self.assertEqual(ids.tolist(), some_ids[:10])
+        self.assertEqual(len(totals), 10)
+
+    def test_capability_filter_matches_equipment_loop(self):
+        for status in ErLatestStatus.objects.all():
+            status.capability_mask = capability_mask(status)
+            status.save(update_fields=["capability_mask"])
+        engine = scoring.ErScoringEngine.from_db()
+
+        attrs = {
+            "ct": "has_ct",
+            "mri": "has_mri",
+            "angio": "has_angio",
+            "ventilator": "has_ventilator",
+            "delivery": "birth_available",
+        }
+        for equips in [{"ct"}, {"mri", "angio"}, {"ventilator", "delivery"}, {"ct", "mri"}]:
+            expected = sorted(
+                er_id for er_id, hos in self.hospitals.items()
+                if getattr(hos, "latest_status", None)
+                and any(getattr(hos.latest_status, attrs[eq]) for eq in equips)
+            )
+            mask = equips_mask(equips)
+
+            self.assertEqual(engine.filter_capabilities(sorted(self.hospitals), mask), expected)
+            self.assertEqual(
+                sorted(filter_by_capability(ErInfo.objects.all(), mask).values_list("er_id", flat=True)),
+                expected,
+            )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ErListJsonPagingTest(TestCase):
+    """er_list_json 커서 페이지 / ETag 재검증"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hvdate = timezone.make_aware(datetime(2025, 1, 1, 12, 0, 0))
+        for i in range(5):
+            er = ErInfo.objects.create(
+                hpid=f"P{i:05d}",
+                er_name=f"페이지병원{i}",
+                er_address="주소",
+                er_sido="서울특별시",
+                er_sigungu="중구",
+                er_lat=37.56 + i * 0.001,
+                er_lng=126.97,
+            )
+            ErLatestStatus.objects.create(
+                er=er,
+                hvdate=cls.hvdate,
+                er_general_available=i,
+                er_general_total=10,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("er_list_json")
+
+    def get_all_pages(self, limit):
+        er_ids = []
+        response = self.client.get(self.url, {"limit": limit})
+        while True:
+            data = response.json()
+            self.assertFalse(data["cursor_reset"])
+            er_ids.extend(row["er_id"] for row in data["results"])
+            if data["next_cursor"] is None:
+                return er_ids
+            response = self.client.get(self.url, {"limit": limit, "cursor": data["next_cursor"]})
+
+    def test_pages_cover_list_without_overlap(self):
+        full = [row["er_id"] for row in self.client.get(self.url, {"limit": 50}).json()["results"]]
+        self.assertEqual(len(full), 5)
+
+        self.assertEqual(self.get_all_pages(limit=2), full)
+
+    def test_cursor_resets_when_hvdate_changes(self):
+        data = self.client.get(self.url, {"limit": 2}).json()
+
+        ErLatestStatus.objects.update(hvdate=self.hvdate + timedelta(minutes=5))
+        bump_snapshot_version()
+
+        data = self.client.get(self.url, {"limit": 2, "cursor": data["next_cursor"]}).json()
+        self.assertTrue(data["cursor_reset"])
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(
+            datetime.fromisoformat(data["hvdate"]), self.hvdate + timedelta(minutes=5)
+        )
+
+    def test_etag_not_modified_until_new_merge(self):
+        response = self.client.get(self.url, {"limit": 2})
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, {"limit": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # 다른 페이지는 다른 ETag
+        response = self.client.get(self.url, {"limit": 3}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        ErLatestStatus.objects.update(hvdate=self.hvdate + timedelta(minutes=5))
+        bump_snapshot_version()
+
+        response = self.client.get(self.url, {"limit": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CongestionHeatmapTest(TestCase):
+    """요일 × 시간 히트맵: 칸 계산, 블롭 변환, 증분 갱신 / 늦게 적재된 이력 재계산"""
+
+    # 2025-01-01 은 수요일
+    T0 = timezone.make_aware(datetime(2025, 1, 1, 10, 0, 0))
+
+    def setUp(self):
+        self.er = ErInfo.objects.create(
+            hpid="C00001", er_name="히트맵병원", er_address="주소",
+            er_sido="서울특별시", er_sigungu="중구",
+        )
+
+    def history(self, hours, available):
+        hvdate = self.T0 + timedelta(hours=hours)
+        ErStatusHistory.objects.create(
+            er=self.er,
+            hvdate=hvdate,
+            month=month_key(hvdate),
+            er_general_available=available,
+            er_general_total=10,
+        )
+
+    def blobs(self):
+        row = ErCongestionHeatmap.objects.get(er=self.er)
+        return (
+            list(unpack_slots(row.score_sums)),
+            list(unpack_slots(row.seconds)),
+            row.computed_until,
+        )
+
+    def assertSameHeatmap(self, actual, expected):
+        self.assertEqual(actual[2], expected[2])
+        self.assertEqual(actual[1], expected[1])
+        for a, b in zip(actual[0], expected[0]):
+            self.assertAlmostEqual(a, b, places=9)
+
+    def rebuild(self, now):
+        """히트맵을 비우고 처음부터 다시 계산한 결과"""
+        ErCongestionHeatmap.objects.all().delete()
+        update_heatmaps(now)
+        return self.blobs()
+
+    def slot(self, hours):
+        return heatmap_slot(self.T0 + timedelta(hours=hours))
+
+    def test_heatmap_slot_uses_seoul_weekday_and_hour(self):
+        self.assertEqual(heatmap_slot(self.T0), 2 * 24 + 10)
+        # UTC 화요일 15시 = 서울 수요일 0시
+        utc = datetime(2024, 12, 31, 15, 0, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(heatmap_slot(utc), 2 * 24)
+        self.assertEqual(heatmap_slot(timezone.make_aware(datetime(2025, 1, 5, 23, 30))), 167)
+
+    def test_slot_blob_round_trip(self):
+        values = [i / 7 for i in range(HEATMAP_SLOTS)]
+        blob = pack_slots(values)
+
+        self.assertEqual(len(blob), HEATMAP_SLOTS * 8)
+        self.assertEqual(blob[8:16], struct.pack("<d", values[1]))
+        self.assertEqual(list(unpack_slots(blob)), values)
+
+        means = unpack_slots(pack_slots(values, "f"), "f")
+        self.assertAlmostEqual(means[100], values[100], places=6)
+
+        # 비었거나 길이가 맞지 않는 블롭은 fill 값 배열
+        self.assertEqual(list(unpack_slots(b"")), [0.0] * HEATMAP_SLOTS)
+        self.assertTrue(all(m != m for m in unpack_slots(blob[:16], fill=float("nan"))))
+
+    def test_incremental_update_matches_full_rebuild(self):
+        self.history(0, 2)
+        self.history(3, 8)
+        self.history(7, 5)
+
+        update_heatmaps(self.T0 + timedelta(hours=4))
+        self.assertEqual(self.blobs()[2], self.T0 + timedelta(hours=3))
+        update_heatmaps(self.T0 + timedelta(hours=10))
+        incremental = self.blobs()
+
+        self.assertSameHeatmap(incremental, self.rebuild(self.T0 + timedelta(hours=10)))
+        self.assertEqual(incremental[1][self.slot(0)], 3600)
+
+    def test_late_rows_before_watermark_are_recomputed(self):
+        self.history(0, 2)
+        self.history(3, 8)
+        update_heatmaps(self.T0 + timedelta(hours=6))
+
+        # 워터마크(15시) 이전 hvdate 로 늦게 적재된 이력 (--replay --apply 등) + 새 이력
+        self.history(1, 0)
+        self.history(7, 5)
+        update_heatmaps(self.T0 + timedelta(hours=10))
+        corrected = self.blobs()
+
+        self.assertSameHeatmap(corrected, self.rebuild(self.T0 + timedelta(hours=10)))
+        # 11시 칸은 늦게 들어온 값(가용 0 → 혼잡도 점수 0)으로 다시 계산됨
+        self.assertEqual(corrected[0][self.slot(1)], 0.0)
+        self.assertEqual(corrected[1][self.slot(1)], 3600)
+
+    def test_late_rows_without_new_window_are_recomputed(self):
+        self.history(0, 2)
+        update_heatmaps(self.T0 + timedelta(hours=6))
+        before = self.blobs()
+
+        self.history(2, 0)
+        update_heatmaps(self.T0 + timedelta(hours=6))
+
+        after = self.blobs()
+        self.assertEqual(after[2], before[2])
+        self.assertSameHeatmap(after, self.rebuild(self.T0 + timedelta(hours=6)))
+
+    def test_get_heatmap_matrix(self):
+        self.history(0, 5)
+        update_heatmaps(self.T0 + timedelta(hours=3))
+
+        heatmap = get_heatmap(self.er.er_id)
+        self.assertEqual(len(heatmap["matrix"]), 7)
+        self.assertEqual(heatmap["matrix"][2][10], round(0.5 * 0.45, 3))
+        self.assertIsNone(heatmap["matrix"][0][0])
+        self.assertIsNone(get_heatmap(999999))
+
+
+INMEMORY_CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CHANNEL_LAYERS=INMEMORY_CHANNEL_LAYERS, CACHES=LOCMEM_CACHES)
+class ErStatusStreamTest(SimpleTestCase):
+    """SSE 피드: 첫 이벤트 / 재개 / heartbeat / 수신 실패 시 종료"""
+
+    CHANGES = [{"er_id": 1, "sido_id": None, "hvdate": "2025-01-01 12:00:00", "fields": {"er_general_available": 3}}]
+
+    def setUp(self):
+        cache.clear()
+
+    async def open_stream(self, headers=None):
+        request = AsyncRequestFactory().get("/emergency/api/status/stream/", headers=headers)
+        response = await views.er_status_stream(request)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await self.next_chunk(stream), b"retry: %d\n\n" % views.SSE_RETRY_MS)
+        return stream
+
+    async def next_chunk(self, stream):
+        return await asyncio.wait_for(anext(stream), timeout=2)
+
+    def parse_event(self, chunk):
+        lines = dict(line.split(": ", 1) for line in chunk.decode("utf-8").strip().split("\n"))
+        return lines.get("id"), lines["event"], json.loads(lines["data"])
+
+    async def test_live_event_is_streamed(self):
+        stream = await self.open_stream()
+
+        await get_channel_layer().group_send(
+            realtime.FEED_GROUP,
+            {"type": realtime.FEED_EVENT_TYPE, "id": 7, "changes": self.CHANGES},
+        )
+
+        self.assertEqual(self.parse_event(await self.next_chunk(stream)), ("7", "status", self.CHANGES))
+        await stream.aclose()
+
+    async def test_resume_from_last_event_id_skips_duplicates(self):
+        first = realtime.append_feed_event(self.CHANGES)
+        stream = await self.open_stream({"Last-Event-ID": str(first - 1)})
+
+        self.assertEqual(self.parse_event(await self.next_chunk(stream))[:2], (str(first), "status"))
+
+        # 보관 이벤트와 같은 id 의 실시간 메시지는 다시 보내지 않음
+        layer = get_channel_layer()
+        for event_id in (first, first + 1):
+            await layer.group_send(
+                realtime.FEED_GROUP,
+                {"type": realtime.FEED_EVENT_TYPE, "id": event_id, "changes": self.CHANGES},
+            )
+        self.assertEqual(self.parse_event(await self.next_chunk(stream))[0], str(first + 1))
+        await stream.aclose()
+
+    async def test_unknown_last_event_id_sends_reset(self):
+        stream = await self.open_stream({"Last-Event-ID": "5"})
+
+        self.assertEqual(self.parse_event(await self.next_chunk(stream)), (None, "reset", {}))
+        await stream.aclose()
+
+    async def test_heartbeat_when_idle(self):
+        with mock.patch.object(views, "SSE_HEARTBEAT_SECONDS", 0.01):
+            stream = await self.open_stream()
+            self.assertEqual(await self.next_chunk(stream), b": heartbeat\n\n")
+            await stream.aclose()
+
+    async def test_stream_closes_when_pump_fails(self):
+        async def broken_pump(*args):
+            raise RuntimeError("channel layer down")
+
+        with (
+            mock.patch.object(views, "_pump_feed", broken_pump),
+            self.assertLogs("apps.emergency.views", "ERROR") as logs,
+        ):
+            stream = await self.open_stream()
+            with self.assertRaises(StopAsyncIteration):
+                await self.next_chunk(stream)
+
+        self.assertIsInstance(logs.records[0].exc_info[1], RuntimeError)
+
+    async def test_stream_closes_when_pump_is_cancelled(self):
+        async def cancelled_pump(*args):
+            raise asyncio.CancelledError
+
+        with (
+            mock.patch.object(views, "_pump_feed", cancelled_pump),
+            self.assertLogs("apps.emergency.views", "ERROR") as logs,
+        ):
+            stream = await self.open_stream()
+            with self.assertRaises(StopAsyncIteration):
+                await self.next_chunk(stream)
+
+        self.assertIsNone(logs.records[0].exc_info)
+
+
+# 시/도 → sido_id 조회가 DB 대신 캐시된 지역 문서를 읽도록 (consumer 는 다른 스레드에서 조회)
+REGION_DOCUMENT = {"sido_list": ["서울특별시"], "region_dict": {}, "sido_ids": {"서울특별시": 1}, "sigungu_ids": {}}
+
+
+@override_settings(CHANNEL_LAYERS=INMEMORY_CHANNEL_LAYERS, CACHES=LOCMEM_CACHES)
+class ErStatusConsumerTest(SimpleTestCase):
+    """WebSocket 구독 그룹 / 그룹 메시지 수신"""
+
+    def setUp(self):
+        cache.set(regions.REGION_DOC_KEY, REGION_DOCUMENT)
+
+    async def connect(self, query):
+        communicator = WebsocketCommunicator(ErStatusConsumer.as_asgi(), f"/ws/emergency/status/?{query}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def send_to(self, group, er_id):
+        await get_channel_layer().group_send(
+            group, {"type": realtime.EVENT_TYPE, "changes": [{"er_id": er_id}]}
+        )
+
+    async def assertReceives(self, communicator, er_id):
+        message = await communicator.receive_json_from(timeout=1)
+        self.assertEqual(message, {"type": "ER_STATUS", "changes": [{"er_id": er_id}]})
+
+    async def test_er_subscription_receives_only_its_cards(self):
+        communicator = await self.connect("er=1,2")
+
+        await self.send_to(realtime.er_group(3), 3)
+        await self.send_to(realtime.er_group(2), 2)
+
+        await self.assertReceives(communicator, 2)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_sido_subscription(self):
+        communicator = await self.connect("sido=서울특별시")
+
+        await self.send_to(realtime.sido_group(1), 5)
+        await self.send_to(realtime.ALL_GROUP, 6)
+
+        await self.assertReceives(communicator, 5)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_sido_without_region_id_falls_back_to_all_group(self):
+        communicator = await self.connect("sido=부산광역시")
+
+        await self.send_to(realtime.ALL_GROUP, 7)
+
+        await self.assertReceives(communicator, 7)
+        await communicator.disconnect()
+
+    async def test_too_many_cards_subscribe_all_group(self):
+        er_ids = ",".join(str(i) for i in range(1, MAX_ER_SUBSCRIPTIONS + 2))
+        communicator = await self.connect(f"er={er_ids}")
+
+        await self.send_to(realtime.er_group(1), 1)
+        await self.send_to(realtime.ALL_GROUP, MAX_ER_SUBSCRIPTIONS + 1)
+
+        # 응급실별 그룹은 구독하지 않고 전체 그룹으로만 받음
+        await self.assertReceives(communicator, MAX_ER_SUBSCRIPTIONS + 1)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_subscribe_action_replaces_er_groups(self):
+        communicator = await self.connect("er=1")
+
+        await communicator.send_json_to({"action": "subscribe", "er_ids": [2]})
+        await communicator.receive_nothing()
+        await self.send_to(realtime.er_group(1), 1)
+        await self.send_to(realtime.er_group(2), 2)
+
+        await self.assertReceives(communicator, 2)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS=INMEMORY_CHANNEL_LAYERS, CACHES=LOCMEM_CACHES)
+class PublishStatusChangesTest(TestCase):
+    """병합 후 그룹 전송: 응급실 / 시/도 / 전체 / SSE 피드"""
+
+    def setUp(self):
+        cache.clear()
+        self.sido = RegionSido.objects.create(name="서울특별시", short_name="서울")
+        self.linked = ErInfo.objects.create(
+            hpid="W00001", er_name="연결", er_address="주소",
+            er_sido="서울특별시", er_sigungu="중구", region_sido=self.sido,
+        )
+        # backfill_regions 이후 추가되어 region_sido 가 비어 있는 응급실
+        self.unlinked = ErInfo.objects.create(
+            hpid="W00002", er_name="미연결", er_address="주소",
+            er_sido="서울특별시", er_sigungu="중구",
+        )
+        self.layer = get_channel_layer()
+        self.channels = {}
+
+    def listen(self, group):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group, channel)
+        self.channels[group] = channel
+
+    def received(self, group):
+        return async_to_sync(self.layer.receive)(self.channels[group])
+
+    def publish(self, *ers):
+        statuses = [ErLatestStatus(er=er, hvdate=timezone.now()) for er in ers]
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            sent = realtime.publish_status_changes(statuses, {er.er_id: "<div></div>" for er in ers})
+        return sent, out.getvalue()
+
+    def test_changes_reach_every_group(self):
+        for group in (
+            realtime.er_group(self.linked.er_id),
+            realtime.sido_group(self.sido.sido_id),
+            realtime.ALL_GROUP,
+            realtime.FEED_GROUP,
+        ):
+            self.listen(group)
+
+        sent, _ = self.publish(self.linked, self.unlinked)
+
+        # 응급실 2 + 시/도 1 + 전체 1 + 피드 1
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(self.received(realtime.ALL_GROUP)["changes"]), 2)
+        self.assertEqual(self.received(realtime.er_group(self.linked.er_id))["changes"][0]["cells"], "<div></div>")
+        # region_sido 가 비어 있어도 시/도 이름으로 id 를 찾아 시/도 그룹에 포함
+        self.assertEqual(
+            sorted(c["er_id"] for c in self.received(realtime.sido_group(self.sido.sido_id))["changes"]),
+            sorted([self.linked.er_id, self.unlinked.er_id]),
+        )
+        feed = self.received(realtime.FEED_GROUP)
+        self.assertEqual({c["sido_id"] for c in feed["changes"]}, {self.sido.sido_id})
+
+    def test_unresolved_sido_is_reported(self):
+        RegionSido.objects.all().delete()
+        ErInfo.objects.filter(pk=self.linked.pk).update(region_sido=None)
+        self.listen(realtime.ALL_GROUP)
+
+        sent, out = self.publish(self.linked)
+
+        self.assertEqual(sent, 3)
+        self.assertIn("backfill_regions", out)
+        self.assertEqual(len(self.received(realtime.ALL_GROUP)["changes"]), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DetailBundleCacheTest(TestCase):
+    """상세 모달 번들: 캐시 적중 / 미스 / 스냅샷 버전·데이터 변경 시 무효화"""
+
+    def setUp(self):
+        cache.clear()
+        bump_snapshot_version()
+        self.er = ErInfo.objects.create(hpid="W00001", er_name="응급실", er_address="주소")
+        ErLatestStatus.objects.create(
+            er=self.er, hvdate=timezone.now(), er_general_available=3, er_general_total=10
+        )
+        now = timezone.now()
+        ErMessage.objects.create(hospital=self.er, message="이전 메시지", message_time=now - timedelta(hours=1))
+        ErMessage.objects.create(hospital=self.er, message="최신 메시지", message_time=now)
+        ErMessage.objects.create(hospital=self.er, message="시각 없음", message_time=None)
+
+    def test_miss_builds_bundle_in_one_query_and_hit_skips_db(self):
+        with self.assertNumQueries(1):
+            bundle = detail_bundle.get_detail_bundle(self.er.er_id)
+
+        self.assertEqual(bundle["message"], "최신 메시지")
+        self.assertEqual(bundle["status"]["er_general_available"], 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id), bundle)
+
+    def test_latest_message_per_er(self):
+        other = ErInfo.objects.create(hpid="W00002", er_name="다른 응급실", er_address="주소")
+        ErMessage.objects.create(hospital=other, message="다른 메시지", message_time=timezone.now())
+        silent = ErInfo.objects.create(hpid="W00003", er_name="메시지 없음", er_address="주소")
+
+        detail_bundle.refresh_detail_bundles([self.er.er_id, other.er_id, silent.er_id])
+
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["message"], "최신 메시지")
+        self.assertEqual(detail_bundle.get_detail_bundle(other.er_id)["message"], "다른 메시지")
+        self.assertIsNone(detail_bundle.get_detail_bundle(silent.er_id)["message"])
+
+    def test_snapshot_version_bump_invalidates_bundle(self):
+        detail_bundle.get_detail_bundle(self.er.er_id)
+        # 갱신(refresh) 없이 데이터만 바뀐 경우
+        ErLatestStatus.objects.filter(er=self.er).update(er_general_available=0)
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["status"]["er_general_available"], 3)
+
+        # 밀리초 타임스탬프가 setUp 의 버전과 겹치지 않도록 1초 뒤로
+        with mock.patch("apps.emergency.snapshot.time.time", return_value=time.time() + 1):
+            bump_snapshot_version()
+
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["status"]["er_general_available"], 0)
+
+    def test_refresh_overwrites_and_miss_does_not(self):
+        detail_bundle.get_detail_bundle(self.er.er_id)
+        ErMessage.objects.create(hospital=self.er, message="새 메시지", message_time=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(detail_bundle.refresh_detail_bundles([self.er.er_id, self.er.er_id]), 1)
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["message"], "새 메시지")
+
+        # 캐시 미스 경로가 오래된 값으로 조회했더라도 refresh 가 저장한 번들을 덮어쓰지 않음
+        stale = dict(detail_bundle.get_detail_bundle(self.er.er_id), message="오래된 메시지")
+        with mock.patch.object(detail_bundle, "build_detail_bundle", return_value=stale), \
+                mock.patch.object(detail_bundle.cache, "get", return_value=None):
+            detail_bundle.get_detail_bundle(self.er.er_id)
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["message"], "새 메시지")
+
+    def test_ai_review_save_refreshes_bundle(self):
+        self.assertIsNone(detail_bundle.get_detail_bundle(self.er.er_id)["ai_review"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AiReview.objects.create(er=self.er, summary="친절함", positive_ratio=0.8, negative_ratio=0.2)
+
+        self.assertEqual(detail_bundle.get_detail_bundle(self.er.er_id)["ai_review"]["summary"], "친절함")
+
+    def test_unknown_er(self):
+        self.assertIsNone(detail_bundle.get_detail_bundle(999999))
+
+
+
+def list_prefs(lat, lng, sort="distance"):
+    """_read_list_preferences 결과 (시/도 미선택, 장비 필터 없음)"""
+    return {
+        "selected_sido": None,
+        "selected_sigungu": None,
+        "selected_sort": sort,
+        "selected_etype": "",
+        "selected_filters": {},
+        "required_equips": set(),
+        "user_lat": lat,
+        "user_lng": lng,
+        "has_sido_filter": False,
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RankingCacheTest(TestCase):
+    """순위 캐시: 스냅샷 버전 무효화 / 셀 중심으로 계산한 순위의 실제 위치 기준 보정"""
+
+    # 0.01도 셀 (3750, 12700) 의 위쪽 경계 바로 아래
+    USER = (37.50999, 127.00001)
+
+    def setUp(self):
+        cache.clear()
+        bump_snapshot_version()
+        invalidate_index("er")
+        self.n = 0
+
+    def create_er(self, lat, lng, available=5):
+        self.n += 1
+        er = ErInfo.objects.create(
+            hpid=f"K{self.n:04d}", er_name=f"응급실{self.n}", er_address="주소", er_lat=lat, er_lng=lng
+        )
+        ErLatestStatus.objects.create(
+            er=er, hvdate=timezone.now(), er_general_available=available, er_general_total=10
+        )
+        invalidate_index("er")
+        return er
+
+    def build(self, lat, lng, sort="distance"):
+        return views._build_hospital_list(list_prefs(lat, lng, sort))
+
+    def exact_order(self, lat, lng, ers):
+        """사용자 실제 위치 기준 30km 이내 응급실의 거리순 er_id"""
+        distances = sorted(
+            (haversine_km(lat, lng, er.er_lat, er.er_lng), er.er_id) for er in ers
+        )
+        return [er_id for dist, er_id in distances if dist <= views.ER_SEARCH_RADIUS_KM]
+
+    def test_snapshot_version_bump_invalidates_ranking(self):
+        busy = self.create_er(37.52, 127.01, available=0)
+        free = self.create_er(37.52, 127.011, available=10)
+
+        self.assertEqual([h.er_id for h in self.build(*self.USER, sort="score")], [free.er_id, busy.er_id])
+
+        ErLatestStatus.objects.filter(er=busy).update(er_general_available=10)
+        ErLatestStatus.objects.filter(er=free).update(er_general_available=0)
+        # 버전이 그대로면 캐시된 순위 사용
+        self.assertEqual([h.er_id for h in self.build(*self.USER, sort="score")], [free.er_id, busy.er_id])
+
+        with mock.patch("apps.emergency.snapshot.time.time", return_value=time.time() + 1):
+            bump_snapshot_version()
+
+        self.assertEqual([h.er_id for h in self.build(*self.USER, sort="score")], [busy.er_id, free.er_id])
+
+    def test_order_matches_exact_distance_near_cell_edge(self):
+        user_lat, user_lng = self.USER
+        cell = ranking.location_cell(user_lat, user_lng)
+        center_lat, center_lng = ranking.cell_center(cell)
+        ers = [
+            # 사용자 바로 옆 (셀 중심에서는 더 멂)
+            self.create_er(37.5101, 127.0),
+            # 셀 중심 위
+            self.create_er(center_lat, center_lng),
+            # 사용자 기준 30km 안 / 셀 중심 기준 30km 밖
+            self.create_er(user_lat + 0.2696, user_lng),
+            # 사용자 기준 30km 밖 / 셀 중심 기준 30km 안
+            self.create_er(user_lat - 0.2700, user_lng),
+        ]
+        self.assertGreater(haversine_km(center_lat, center_lng, ers[2].er_lat, ers[2].er_lng), 30)
+        self.assertLess(haversine_km(center_lat, center_lng, ers[3].er_lat, ers[3].er_lng), 30)
+
+        result = self.build(user_lat, user_lng)
+
+        self.assertEqual([h.er_id for h in result], self.exact_order(user_lat, user_lng, ers))
+        self.assertEqual(len(result), 3)
+        for hos in result:
+            self.assertAlmostEqual(hos.distance_km, haversine_km(user_lat, user_lng, hos.er_lat, hos.er_lng))
+
+        # 같은 셀의 반대쪽 모서리 사용자는 캐시된 순위를 쓰되 자기 위치 기준으로 다시 정렬
+        other_lat, other_lng = 37.50001, 127.00999
+        self.assertEqual(ranking.location_cell(other_lat, other_lng), cell)
+        with mock.patch.object(views, "_rank_hospitals") as rank:
+            result = self.build(other_lat, other_lng)
+
+        rank.assert_not_called()
+        self.assertEqual([h.er_id for h in result], self.exact_order(other_lat, other_lng, ers))
@@ -3,7 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.emergency_main, name='emergency_main'),
+    path('api/list/', views.er_list_json, name='er_list_json'),
+    path('api/status/stream/', views.er_status_stream, name='er_status_stream'),
     path('detail/<int:er_id>/', views.hospital_detail_json, name='hospital_detail'),
+    path('api/trend/<int:er_id>/', views.er_status_trend, name='er_status_trend'),
+    path('api/heatmap/<int:er_id>/', views.er_congestion_heatmap, name='er_congestion_heatmap'),
     path('get_sigungu/', views.get_sigungu, name='get_sigungu'),
     path('update_preferences/', views.update_preferences, name='update_preferences'),
     path('toggle_favorite/', views.toggle_er_favorite, name='toggle_er_favorite'),
@@ -1,24 +1,42 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.db.models import Q
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from collections import defaultdict
-from apps.db.models.emergency import ErInfo, ErStatus, ErMessage
-from apps.db.models.review import AiReview
+from django.views.decorators.http import require_GET, require_POST, condition
+from django.utils.cache import patch_cache_control
+from apps.db.models.emergency import ErInfo
 from apps.db.models.favorite import UserFavorite
 from apps.db.models.users import Users
 from django.conf import settings
-from .templatetags import status_filters
 from django.core.cache import cache
-
-
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from apps.services.spatial_index import get_er_index
+from . import congestion, detail_bundle, fragments, ranking, realtime, scoring
+from .detail_bundle import build_status_payload
+from .capabilities import equips_mask, filter_by_capability, has_any_status_data
+from .congestion import calculate_congestion_score
+from .snapshot import get_latest_hvdate
+from apps.services import regions, status_history
+from apps.services.regions import normalize_sido_name
+
+
+import asyncio
 import math
 import json
+import time
+import base64
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 
+# 위치 기반 조회 시 표시할 응급실 반경 (km)
+ER_SEARCH_RADIUS_KM = 30
+
 
 def _haversine_km(lat1, lon1, lat2, lon2):
     """
@@ -40,50 +58,6 @@ def _haversine_km(lat1, lon1, lat2, lon2):
     return R * c
 
 
-def calculate_congestion_score(status):
-    """
-    혼잡도 점수 계산
-    혼잡도 = (응급실일반가용률 * 0.45) + (소아가용률 * 0.20) + 
-             (음압가용률 * 0.20) + (일반격리가용률 * 0.10) + (분만실가용여부 * 0.05)
-    - 분만실은 total 개념이 없고 Boolean 플래그(birth_available)만 존재
-      → True 이면 1.0, False/None 이면 0.0 으로 반영
-    """
-    if not status:
-        return 0.0
-    
-    def get_availability_rate(available, total):
-        if total and total > 0:
-            return (available or 0) / total
-        return 0.0
-    
-    general_rate = get_availability_rate(
-        status.er_general_available, status.er_general_total
-    )
-    child_rate = get_availability_rate(
-        status.er_child_available, status.er_child_total
-    )
-    negative_rate = get_availability_rate(
-        status.negative_pressure_available, status.negative_pressure_total
-    )
-    isolation_rate = get_availability_rate(
-        status.isolation_general_available,
-        status.isolation_general_total,
-    )
-
-    # 분만실: Boolean 플래그만 존재 → True면 1.0, 아니면 0.0
-    birth_rate = 1.0 if getattr(status, "birth_available", None) else 0.0
-    
-    congestion = (
-        general_rate * 0.45 +
-        child_rate * 0.20 +
-        negative_rate * 0.20 +
-        isolation_rate * 0.10 +
-        birth_rate * 0.05
-    )
-    
-    return congestion
-
-
 def calculate_score(hospital, user_lat, user_lng, filter_type=None, status=None):
     """
     종합 점수 계산
@@ -149,67 +123,96 @@ def calculate_score(hospital, user_lat, user_lng, filter_type=None, status=None)
     
     return total_score, distance_km
 
-def has_any_status_data(status):
+def _rank_hospitals(
+    hospitals_qs,
+    user_lat,
+    user_lng,
+    selected_etype,
+    selected_sort,
+    has_sido_filter,
+    radius_km=ER_SEARCH_RADIUS_KM,
+):
     """
-    병상 정보(원형 그래프 값)가 하나라도 존재하면 True,
-    모두 '-' 상태(available=None 또는 total=None/0)이면 False.
+    후보 병원(장비 필터 적용 완료)에 점수·거리를 붙여 정렬된 리스트로 반환.
+    - 시/도 미선택: 종합점수(또는 거리) 순, 위치가 있으면 반경 radius_km(기본 30km) 이내만
+    - 시/도 선택: 병원명 순 (점수/거리 계산 안 함)
     """
-    if not status:
-        return False
-
-    fields = [
-        ("er_general_available", "er_general_total"),
-        ("er_child_available", "er_child_total"),
-        ("birth_available", "birth_total"),
-        ("negative_pressure_available", "negative_pressure_total"),
-        ("isolation_general_available", "isolation_general_total"),
-        ("isolation_cohort_available", "isolation_cohort_total"),
-    ]
-
-    for a, t in fields:
-        avail = getattr(status, a, None)
-        total = getattr(status, t, None)
-
-        # total이 있는 경우 (양수) → 유효 데이터
-        if total not in (None, 0):
-            return True
+    hospitals = list(hospitals_qs)
+    hospital_data = []
 
-        # total 없이 available만 존재해도 유효 데이터
-        if avail not in (None, 0):
-            return True
+    # 지역 선택이 없을 때: 후보 전체 점수/거리를 한 번에 계산 (numpy 벡터 연산)
+    score_map = None
+    if not has_sido_filter and scoring.is_available():
+        score_map = scoring.score_map(
+            user_lat, user_lng, selected_etype, [hos.er_id for hos in hospitals]
+        )
+    
+    for hos in hospitals:
+        # 최신 상태 (없으면 RelatedObjectDoesNotExist → None)
+        latest_status = getattr(hos, "latest_status", None)
 
-    return False
+        # 원형 그래프 데이터가 1개도 없으면 제외
+        if not has_any_status_data(latest_status):
+            continue
+        
+        # 지역 선택이 없을 때만 거리 및 점수 계산
+        if not has_sido_filter:
+            # 시/도가 선택되지 않았을 때: 거리 기반 필터링 적용
+            if score_map is not None and hos.er_id in score_map:
+                score, distance_km = score_map[hos.er_id]
+            else:
+                score, distance_km = calculate_score(
+                    hos, user_lat, user_lng, selected_etype, latest_status
+                )
+            hos.score = score
+            hos.distance_km = distance_km
+            
+            # 반경 30km 필터링 (위치 정보가 있을 때만)
+            if user_lat and user_lng:
+                if distance_km is None or distance_km > radius_km:
+                    continue
+            
+            # 필터별 장비 필터링
+            if selected_etype == "stroke" or selected_etype == "traffic":
+                # CT 또는 MRI 필요
+                if not latest_status or (not latest_status.has_ct and not latest_status.has_mri):
+                    continue
+            elif selected_etype == "cardio":
+                # 심장/흉부는 장비 필터 없음
+                pass
+            elif selected_etype == "obstetrics":
+                # 분만실 필요: birth_available 이 True 여야 함
+                if not latest_status or not getattr(latest_status, "birth_available", None):
+                    continue
+        else:
+            # 시/도가 선택되었을 때: 거리/점수 계산하지 않음 (위치 정보 없어도 표시)
+            hos.score = 0
+            hos.distance_km = None
+        
+        hospital_data.append(hos)
+    
+    # 정렬 로직
+    if not has_sido_filter:
+        # 시/도가 선택되지 않았을 때: 거리/점수 기반 정렬
+        if selected_sort == "distance":
+            # "가장 가까운 응급실" 버튼 클릭 시: 거리 순으로 정렬
+            hospital_data.sort(
+                key=lambda h: h.distance_km if h.distance_km is not None else float("inf")
+            )
+        else:
+            # 기본값: 종합점수 높은 순으로 정렬
+            hospital_data.sort(key=lambda h: h.score, reverse=True)
+    else:
+        # 시/도가 선택되었을 때는 병원명 순으로 정렬 (시/군/구가 "전체"여도)
+        hospital_data.sort(key=lambda h: (h.er_name or ""))
 
-def normalize_sido_name(sido):
-    """
-    시/도 이름을 표준화해서 같은 지역으로 합친다.
-    예: '전남' → '전라남도'
-    """
-    if sido in ("전남", "전라남도"):
-        return "전라남도"
-    if sido in ("전북", "전라북도"):
-        return "전라북도"
-    if sido in ("경남", "경상남도"):
-        return "경상남도"
-    if sido in ("경북", "경상북도"):
-        return "경상북도"
-    if sido in ("충남", "충청남도"):
-        return "충청남도"
-    if sido in ("충북", "충청북도"):
-        return "충청북도"
-
-    return sido
+    return hospital_data
 
 
-def emergency_main(request):
+def _read_list_preferences(request):
     """
-    ER 실시간 조회 메인 페이지
-    - 지역 필터(sido, sigungu) -> ErInfo.er_sido, ErInfo.er_sigungu 기준으로 필터
-    - 정렬(sort)        -> distance(거리순) or name(병원명순), 기본은 distance
-    - 사용자 위치(lat, lng) -> home.js에서 쿼리 스트링으로 넘어오는 값
-    - 템플릿에서 기대하는 컨텍스트 키:
-        hospitals, selected_region, selected_sido, selected_sigungu,
-        selected_sort, selected_etype, region_dict_json
+    ER 목록 조회 조건을 SESSION / GET / HEADER 에서 읽어 dict 로 반환.
+    (emergency_main 과 er_list_json 이 같은 조건으로 목록을 만든다)
     """
 
     # 1) SESSION 값 읽기 (GET 완전 제거)
@@ -268,183 +271,180 @@ def emergency_main(request):
         except (TypeError, ValueError):
             return None
 
-    user_lat_f = to_float(user_lat)
-    user_lng_f = to_float(user_lng)
+    return {
+        "selected_sido": selected_sido,
+        "selected_sigungu": selected_sigungu,
+        "selected_sort": selected_sort,
+        "selected_etype": selected_etype,
+        "selected_filters": selected_filters,
+        "required_equips": required_equips,
+        "user_lat": to_float(user_lat),
+        "user_lng": to_float(user_lng),
+        # 시/도가 선택되었는지 확인 (시/군/구는 "전체"일 수 있음)
+        "has_sido_filter": selected_sido not in (None, "", "전체"),
+    }
+
 
-    # 지역 선택 여부 확인
-    # 시/도가 선택되었는지 확인 (시/군/구는 "전체"일 수 있음)
-    has_sido_filter = selected_sido not in (None, "", "전체")
-    # 시/도와 시/군/구가 모두 선택되었는지 확인 (완전한 지역 필터)
-    has_region_filter = (
-        has_sido_filter and
-        selected_sigungu not in (None, "", "전체")
-    )
+def _build_hospital_list(prefs):
+    """
+    조회 조건(prefs)에 맞는 응급실 목록을 정렬된 리스트로 반환.
+    각 병원 객체에는 latest_status(조인), score, distance_km 가 채워진다.
+    """
+    selected_sido = prefs["selected_sido"]
+    selected_sigungu = prefs["selected_sigungu"]
+    selected_etype = prefs["selected_etype"]
+    selected_sort = prefs["selected_sort"]
+    required_equips = prefs["required_equips"]
+    user_lat_f = prefs["user_lat"]
+    user_lng_f = prefs["user_lng"]
+    has_sido_filter = prefs["has_sido_filter"]
+
+    # 순위 계산 기준 위치: 사용자 위치를 격자 셀 중심으로 양자화
+    # → 같은 셀의 사용자끼리 순위 캐시를 공유 (표시 거리만 실제 위치로 다시 계산)
+    ranking_cell = ranking.location_cell(user_lat_f, user_lng_f)
+    if ranking_cell is not None:
+        rank_lat, rank_lng = ranking.cell_center(ranking_cell)
+        # 셀 중심과 실제 위치의 차이만큼 후보 반경을 넓혀 두고, 마지막에 실제 위치 기준으로 자름
+        rank_radius_km = ER_SEARCH_RADIUS_KM + ranking.RANKING_CELL_MARGIN_KM
+    else:
+        rank_lat, rank_lng = user_lat_f, user_lng_f
+        rank_radius_km = ER_SEARCH_RADIUS_KM
 
 
     # 2) 기본 병원 queryset (ErInfo에서 시작)
     hospitals_qs = ErInfo.objects.all()
 
     # 시/도 필터링 (시/도가 선택되었고 "전체"가 아닐 때만)
+    # 지역 기준 테이블(backfill_regions)이 채워져 있으면 정수 FK 로, 아니면 문자열 변형으로 필터
+    sido_id = None
     if selected_sido and selected_sido != "전체":
-        std_sido = normalize_sido_name(selected_sido)
-        hospitals_qs = hospitals_qs.filter(er_sido__in=[
-            selected_sido,
-            std_sido,
-            selected_sido.replace("도",""),
-            std_sido.replace("도",""),
-        ])
+        sido_id = regions.resolve_sido_id(selected_sido)
+        if sido_id is not None:
+            hospitals_qs = hospitals_qs.filter(region_sido_id=sido_id)
+        else:
+            std_sido = normalize_sido_name(selected_sido)
+            hospitals_qs = hospitals_qs.filter(er_sido__in=[
+                selected_sido,
+                std_sido,
+                selected_sido.replace("도",""),
+                std_sido.replace("도",""),
+            ])
 
     # 시/군/구 필터링 (시/군/구가 선택되었고 "전체"가 아닐 때만)
     if selected_sigungu and selected_sigungu != "전체":
-        hospitals_qs = hospitals_qs.filter(er_sigungu=selected_sigungu)
+        sigungu_id = regions.resolve_sigungu_id(sido_id, selected_sigungu)
+        if sigungu_id is not None:
+            hospitals_qs = hospitals_qs.filter(region_sigungu_id=sigungu_id)
+        else:
+            hospitals_qs = hospitals_qs.filter(er_sigungu=selected_sigungu)
 
-    # status(실시간) 정보 미리 가져오기 (N+1 방지)
-    hospitals_qs = hospitals_qs.prefetch_related("statuses")
+    # 장비 필터(OR 조건)는 점수 계산 전에 비트마스크로 적용
+    # (ErLatestStatus.capability_mask, 최신 상태가 없는 병원은 제외)
+    required_mask = equips_mask(required_equips) if required_equips else None
+    engine = scoring.get_engine() if required_equips else None
 
-    # 3) 시/도별 시/군/구 목록 (표준화 적용) — 캐시 적용
-    cache_key = "region_dict_json:v1"
-    region_dict_json = cache.get(cache_key)
+    # 시/도 미선택 + 위치 정보가 있으면: 공간 인덱스로 반경 30km 안의 응급실만 후보로 조회
+    if not has_sido_filter and rank_lat and rank_lng:
+        nearby = get_er_index().radius(rank_lat, rank_lng, rank_radius_km)
+        nearby_ids = [er_id for er_id, _ in nearby]
 
-    if region_dict_json is None:
-        raw_regions = (
-            ErInfo.objects
-            .values_list("er_sido", "er_sigungu")
-            .distinct()
-        )
+        # 메모리 비트셋으로 후보를 먼저 줄임 (DB 에는 통과한 er_id 만 조회)
+        if engine is not None:
+            nearby_ids = engine.filter_capabilities(nearby_ids, required_mask)
+            required_mask = None
 
-        region_dict = defaultdict(set)
+        hospitals_qs = hospitals_qs.filter(er_id__in=nearby_ids)
 
-        for sido, sigungu in raw_regions:
-            if sido and sigungu:
-                std_sido = normalize_sido_name(sido)
-                region_dict[std_sido].add(sigungu)
+    if required_mask is not None:
+        hospitals_qs = filter_by_capability(hospitals_qs, required_mask)
 
-        region_dict_json = json.dumps(
-            {sido: sorted(list(sigungus)) for sido, sigungus in region_dict.items()},
-            ensure_ascii=False,
+    # 병원별 최신 상태 1행을 조인해서 함께 가져오기 (N+1 방지)
+    # - ErLatestStatus 는 fetch_emergency 병합 시점에 갱신되는 비정규화 테이블
+    hospitals_qs = hospitals_qs.select_related("latest_status")
+
+    # 5) 각 병원에 최신 상태와 점수 계산
+    # 지역 선택이 없을 때는 순위 캐시부터 확인 (스냅샷 버전이 바뀌면 자동 무효화)
+    ranking_key = None
+    cached_entries = None
+    if not has_sido_filter:
+        ranking_key = ranking.ranking_key(
+            ranking_cell, selected_etype, required_equips, selected_sort, selected_sigungu
         )
+        cached_entries = ranking.get_ranking(ranking_key)
 
-        # 6시간 캐시 (지역 정보는 자주 안 바뀜)
-        cache.set(cache_key, region_dict_json, 60 * 60 * 6)
+    if cached_entries is not None:
+        hospital_data = ranking.load_ranked_hospitals(hospitals_qs, cached_entries)
+    else:
+        hospital_data = _rank_hospitals(
+            hospitals_qs,
+            rank_lat,
+            rank_lng,
+            selected_etype,
+            selected_sort,
+            has_sido_filter,
+            radius_km=rank_radius_km,
+        )
+        if ranking_key is not None:
+            ranking.set_ranking(ranking_key, hospital_data)
+
+    # 표시용 거리는 셀 중심이 아니라 사용자 실제 위치 기준으로 다시 계산
+    # → 실제 거리로 반경을 다시 자르고, 거리순이면 다시 정렬
+    if ranking_cell is not None and not has_sido_filter:
+        for hos in hospital_data:
+            if hos.distance_km is not None:
+                hos.distance_km = _haversine_km(
+                    user_lat_f, user_lng_f, hos.er_lat, hos.er_lng
+                )
+
+        hospital_data = [
+            hos for hos in hospital_data
+            if hos.distance_km is not None and hos.distance_km <= ER_SEARCH_RADIUS_KM
+        ]
+        if selected_sort == "distance":
+            hospital_data.sort(key=lambda h: h.distance_km)
 
+    return hospital_data
 
 
+def _favorite_er_ids(user_id):
+    """로그인 사용자의 응급실 즐겨찾기 er_id 집합 (비로그인 → 빈 집합)"""
+    if not user_id:
+        return set()
+    return set(
+        UserFavorite.objects.filter(
+            user_id=user_id,
+            er__isnull=False,
+            hos__isnull=True
+        ).values_list('er_id', flat=True)
+    )
 
-    # 4) 현재 선택된 시/군/구 목록
-    if selected_sido:
-        # 표준화 로직 적용 (get_sigungu와 동일)
-        # DB에 "경북", "경남" 등으로 저장되어 있을 수 있으므로 여러 변형 허용
-        std_sido = normalize_sido_name(selected_sido)
-        sigungu_list = (
-            ErInfo.objects
-            .filter(er_sido__in=[
-                selected_sido,
-                std_sido,
-                selected_sido.replace("도", ""),
-                std_sido.replace("도", ""),
-            ])
-            .values_list("er_sigungu", flat=True)
-            .distinct()
-            .order_by("er_sigungu")
-        )
-    else:
-        sigungu_list = []
 
-    # 5) 각 병원에 최신 상태와 점수 계산
-    hospitals = list(hospitals_qs)
-    hospital_data = []
-    
-    for hos in hospitals:
-        # 최신 상태 가져오기 (가장 최근 hvdate)
-        if hasattr(hos, 'statuses') and hos.statuses.exists():
-            statuses_list = list(hos.statuses.all())
-            if statuses_list:
-                valid_statuses = [s for s in statuses_list if s.hvdate is not None]
-                if valid_statuses:
-                    latest_status = max(valid_statuses, key=lambda s: s.hvdate)
-                else:
-                    latest_status = None
-            else:
-                latest_status = None
-        else:
-            latest_status = None
-        
-        hos.latest_status = latest_status
-
-        # ---------------------------------------------------
-        # 장비 필터 OR 조건 검사 (하나도 만족하지 않으면 제외)
-        # ---------------------------------------------------
-        if required_equips:
-            match = False
-
-            for eq in required_equips:
-                if eq == "ct" and latest_status and latest_status.has_ct:
-                    match = True
-                if eq == "mri" and latest_status and latest_status.has_mri:
-                    match = True
-                if eq == "angio" and latest_status and latest_status.has_angio:
-                    match = True
-                if eq == "ventilator" and latest_status and latest_status.has_ventilator:
-                    match = True
-                if eq == "delivery" and latest_status and latest_status.birth_available:
-                    match = True
-
-            # 하나도 만족 못했으면 리스트 제외
-            if not match:
-                continue
+def emergency_main(request):
+    """
+    ER 실시간 조회 메인 페이지
+    - 지역 필터(sido, sigungu) -> ErInfo.er_sido, ErInfo.er_sigungu 기준으로 필터
+    - 정렬(sort)        -> distance(거리순) or name(병원명순), 기본은 distance
+    - 사용자 위치(lat, lng) -> home.js에서 쿼리 스트링으로 넘어오는 값
+    - 템플릿에서 기대하는 컨텍스트 키:
+        hospitals, selected_region, selected_sido, selected_sigungu,
+        selected_sort, selected_etype, region_dict_json
+    """
 
+    # 1) 조회 조건 읽기 (SESSION / GET / HEADER)
+    prefs = _read_list_preferences(request)
+    selected_sido = prefs["selected_sido"]
+    selected_sigungu = prefs["selected_sigungu"]
+    selected_filters = prefs["selected_filters"]
 
-        # 원형 그래프 데이터가 1개도 없으면 제외
-        if not has_any_status_data(latest_status):
-            continue
-        
-        # 지역 선택이 없을 때만 거리 및 점수 계산
-        if not has_sido_filter:
-            # 시/도가 선택되지 않았을 때: 거리 기반 필터링 적용
-            score, distance_km = calculate_score(
-                hos, user_lat_f, user_lng_f, selected_etype, latest_status
-            )
-            hos.score = score
-            hos.distance_km = distance_km
-            
-            # 반경 30km 필터링 (위치 정보가 있을 때만)
-            if user_lat_f and user_lng_f:
-                if distance_km is None or distance_km > 30:
-                    continue
-            
-            # 필터별 장비 필터링
-            if selected_etype == "stroke" or selected_etype == "traffic":
-                # CT 또는 MRI 필요
-                if not latest_status or (not latest_status.has_ct and not latest_status.has_mri):
-                    continue
-            elif selected_etype == "cardio":
-                # 심장/흉부는 장비 필터 없음
-                pass
-            elif selected_etype == "obstetrics":
-                # 분만실 필요: birth_available 이 True 여야 함
-                if not latest_status or not getattr(latest_status, "birth_available", None):
-                    continue
-        else:
-            # 시/도가 선택되었을 때: 거리/점수 계산하지 않음 (위치 정보 없어도 표시)
-            hos.score = 0
-            hos.distance_km = None
-        
-        hospital_data.append(hos)
-    
-    # 6) 정렬 로직
-    if not has_sido_filter:
-        # 시/도가 선택되지 않았을 때: 거리/점수 기반 정렬
-        if selected_sort == "distance":
-            # "가장 가까운 응급실" 버튼 클릭 시: 거리 순으로 정렬
-            hospital_data.sort(
-                key=lambda h: h.distance_km if h.distance_km is not None else float("inf")
-            )
-        else:
-            # 기본값: 종합점수 높은 순으로 정렬
-            hospital_data.sort(key=lambda h: h.score, reverse=True)
-    else:
-        # 시/도가 선택되었을 때는 병원명 순으로 정렬 (시/군/구가 "전체"여도)
-        hospital_data.sort(key=lambda h: (h.er_name or ""))
+    # 3) 지역 문서 (시/도 목록, 시/도별 시/군/구) — 캐시 적용
+    region_doc = regions.get_region_document()
+    region_dict_json = json.dumps(region_doc["region_dict"], ensure_ascii=False)
+
+    # 4) 현재 선택된 시/군/구 목록
+    sigungu_list = regions.sigungu_names(selected_sido)
+
+    # 5) 순위가 매겨진 응급실 목록
+    hospital_data = _build_hospital_list(prefs)
 
     # 7) 화면 상단 요약용 문구
     if not selected_sido:
@@ -454,31 +454,19 @@ def emergency_main(request):
     else:
         region_summary = f"{selected_sido} {selected_sigungu}"
 
-    # 시/도 목록 (지역 모달용)
-    raw_sido_list = (
-        ErInfo.objects.values_list("er_sido", flat=True)
-        .distinct()
-    )
-
-    # 표준화 + 중복 제거
-    sido_list = sorted({ normalize_sido_name(s) for s in raw_sido_list })
+    # 시/도 목록 (지역 모달용, 표준화 + 중복 제거)
+    sido_list = region_doc["sido_list"]
 
     # 즐겨찾기 상태 확인 (로그인 사용자만)
-    user_id = request.session.get("user_id")
-    favorite_er_ids = set()
-    if user_id:
-        favorite_er_ids = set(
-            UserFavorite.objects.filter(
-                user_id=user_id,
-                er__isnull=False,
-                hos__isnull=True
-            ).values_list('er_id', flat=True)
-        )
+    favorite_er_ids = _favorite_er_ids(request.session.get("user_id"))
     
     # hospital_data에 즐겨찾기 상태 추가
     for hos in hospital_data:
         hos.is_favorite = hos.er_id in favorite_er_ids
 
+    # 카드 병상 그래프 HTML (fetch_emergency 병합 시 미리 렌더링된 캐시 사용)
+    fragments.attach_status_fragments(hospital_data)
+
     # selected_filters를 JSON으로 직렬화 (템플릿에서 사용)
     selected_filters_json = json.dumps(selected_filters, ensure_ascii=False)
 
@@ -487,8 +475,8 @@ def emergency_main(request):
         "selected_region": region_summary,
         "selected_sido": selected_sido or "",
         "selected_sigungu": selected_sigungu or "",
-        "selected_sort": selected_sort,
-        "selected_etype": selected_etype,
+        "selected_sort": prefs["selected_sort"],
+        "selected_etype": prefs["selected_etype"],
         "selected_filters": selected_filters_json,  # JSON 문자열로 전달
         "sigungu_list": sigungu_list,
         "sido_list": sido_list,
@@ -500,6 +488,272 @@ def emergency_main(request):
     return render(request, "emergency/main.html", context)
 
 
+# =========================================
+# ★  ER 목록 JSON API (모바일 웹 폴링용)  ★
+# =========================================
+ER_LIST_PAGE_SIZE = 20
+ER_LIST_MAX_PAGE_SIZE = 100
+
+# 사용자별 즐겨찾기 변경 버전 (toggle_er_favorite 에서 갱신 → 목록 ETag 에 반영)
+FAVORITES_VERSION_KEY = "er_favorites:version:{user_id}"
+
+
+def _favorites_version(user_id):
+    if not user_id:
+        return None
+    return cache.get(FAVORITES_VERSION_KEY.format(user_id=user_id))
+
+
+def _bump_favorites_version(user_id):
+    cache.set(FAVORITES_VERSION_KEY.format(user_id=user_id), int(time.time() * 1000), None)
+
+
+def _page_limit(request):
+    try:
+        limit = int(request.GET.get("limit", ER_LIST_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return ER_LIST_PAGE_SIZE
+    return max(1, min(limit, ER_LIST_MAX_PAGE_SIZE))
+
+
+def _encode_cursor(offset, hvdate):
+    raw = json.dumps({"o": offset, "v": hvdate}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """cursor → (offset, hvdate). 없거나 깨진 커서는 (0, None)"""
+    if not cursor:
+        return 0, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return max(0, int(data["o"])), data["v"]
+    except (ValueError, TypeError, KeyError):
+        return 0, None
+
+
+def _er_list_etag(request):
+    """
+    목록 응답 ETag.
+    마지막 병합 hvdate 가 그대로면 같은 조건(세션 설정/위치/커서/즐겨찾기)의 응답도 그대로다.
+    """
+    prefs = _read_list_preferences(request)
+    user_id = request.session.get("user_id")
+
+    parts = {
+        "hvdate": get_latest_hvdate(),
+        "sido": prefs["selected_sido"],
+        "sigungu": prefs["selected_sigungu"],
+        "sort": prefs["selected_sort"],
+        "etype": prefs["selected_etype"],
+        "equips": sorted(prefs["required_equips"]),
+        "lat": prefs["user_lat"],
+        "lng": prefs["user_lng"],
+        "cursor": request.GET.get("cursor", ""),
+        "limit": _page_limit(request),
+        "user": user_id,
+        "favorites": _favorites_version(user_id),
+    }
+    return hashlib.md5(
+        json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+@require_GET
+@condition(etag_func=_er_list_etag)
+def er_list_json(request):
+    """
+    ER 목록 JSON API
+    - 조회 조건은 emergency_main 과 동일 (SESSION 설정 + 위치)
+    - cursor / limit 로 페이지 단위 조회, 마지막 페이지면 next_cursor = None
+    - 데이터가 갱신되어 hvdate 가 바뀌면 이전 커서는 처음부터 다시 시작 (cursor_reset = True)
+    - If-None-Match 가 현재 ETag 와 같으면 304 Not Modified
+    """
+    prefs = _read_list_preferences(request)
+    latest_hvdate = get_latest_hvdate()
+    limit = _page_limit(request)
+
+    offset, cursor_hvdate = _decode_cursor(request.GET.get("cursor"))
+    cursor_reset = False
+    if cursor_hvdate is not None and cursor_hvdate != latest_hvdate:
+        offset = 0
+        cursor_reset = True
+
+    hospital_data = _build_hospital_list(prefs)
+    page = hospital_data[offset:offset + limit]
+
+    favorite_er_ids = _favorite_er_ids(request.session.get("user_id"))
+
+    results = []
+    for hos in page:
+        status = getattr(hos, "latest_status", None)
+        status_data, status_ui, tags = build_status_payload(status)
+        results.append({
+            "er_id": hos.er_id,
+            "er_name": hos.er_name,
+            "er_address": hos.er_address,
+            "er_sido": hos.er_sido,
+            "er_sigungu": hos.er_sigungu,
+            "er_lat": hos.er_lat,
+            "er_lng": hos.er_lng,
+            "distance_km": round(hos.distance_km, 2) if hos.distance_km is not None else None,
+            "score": hos.score,
+            "hvdate": status.hvdate.isoformat() if status and status.hvdate else None,
+            "is_favorite": hos.er_id in favorite_er_ids,
+            "tags": tags,
+            "status": status_data,
+            "status_ui": status_ui,
+        })
+
+    next_offset = offset + limit
+    data = {
+        "count": len(hospital_data),
+        "hvdate": latest_hvdate or None,
+        "results": results,
+        "next_cursor": (
+            _encode_cursor(next_offset, latest_hvdate)
+            if next_offset < len(hospital_data) else None
+        ),
+        "cursor_reset": cursor_reset,
+    }
+
+    response = JsonResponse(data)
+    # 세션/즐겨찾기마다 응답이 다르므로 공유 캐시 저장 금지 + 매번 ETag 재검증
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# =========================================
+# ★  ER 상태 변경 SSE 피드 (WebSocket 차단 환경용)  ★
+# =========================================
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 5000
+
+# 연결별 대기 이벤트 최대 수 (느린 클라이언트 때문에 메모리가 계속 늘지 않도록)
+SSE_BUFFER_SIZE = 50
+
+
+def _sse_event(event_id, event, data):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+def _sse_filter(changes, sido_id):
+    if sido_id is None:
+        return changes
+    return [change for change in changes if change["sido_id"] == sido_id]
+
+
+async def _pump_feed(channel_layer, channel, queue):
+    """채널 레이어 → 연결별 큐. 큐가 가득 차면 비우고 reset 표시(None)만 남김"""
+    while True:
+        message = await channel_layer.receive(channel)
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+            continue
+        queue.put_nowait(message)
+
+
+@require_GET
+async def er_status_stream(request):
+    """
+    병상 상태 변경 SSE 피드 (fetch_emergency 병합 1번 = 이벤트 1개)
+    - event: status  → data: [{"er_id", "sido_id", "hvdate", "fields": {바뀐 컬럼: 값}}, ...]
+    - event: reset   → 놓친 이벤트가 있어 이어받을 수 없음 (전체 목록 다시 조회 필요)
+    - 주석(: heartbeat) 을 주기적으로 보내 프록시가 연결을 끊지 않도록 함
+    - Last-Event-ID 헤더(또는 ?last_event_id=)로 끊긴 지점부터 재개
+    - ?sido=서울특별시 로 시/도 필터
+    - 채널 레이어 수신(pump)이 실패하면 로그를 남기고 응답을 끝냄
+      → 브라우저(EventSource)가 Last-Event-ID 로 다시 연결해 이어받음
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return JsonResponse({"error": "realtime feed unavailable"}, status=503)
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    sido = request.GET.get("sido")
+    sido_id = None
+    if sido and sido != "전체":
+        sido_id = await sync_to_async(regions.resolve_sido_id)(sido)
+
+    async def stream():
+        queue = asyncio.Queue(maxsize=SSE_BUFFER_SIZE)
+        channel = await channel_layer.new_channel()
+        # 놓치는 이벤트가 없도록 구독을 먼저 하고 보관 이벤트를 읽음 (겹치는 id 는 건너뜀)
+        await channel_layer.group_add(realtime.FEED_GROUP, channel)
+        pump = asyncio.create_task(_pump_feed(channel_layer, channel, queue))
+
+        # 이미 보낸 마지막 id (보관 이벤트와 실시간 이벤트가 겹칠 때 중복 전송 방지)
+        sent_id = 0
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+
+            if last_id is not None:
+                events, complete = await sync_to_async(realtime.feed_events_since)(last_id)
+                if complete:
+                    sent_id = last_id
+                else:
+                    yield _sse_event(None, "reset", {})
+                for event_id, changes in events:
+                    changes = _sse_filter(changes, sido_id)
+                    if changes:
+                        yield _sse_event(event_id, "status", changes)
+                    sent_id = event_id
+
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, pump},
+                    timeout=SSE_HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if getter not in done:
+                    getter.cancel()
+                    if pump.done():
+                        # 큐에 남은 이벤트까지 보낸 뒤 종료 → 클라이언트 재연결
+                        # (취소된 task 는 exception() 이 CancelledError 를 던지므로 먼저 확인)
+                        logger.error(
+                            "ER 상태 SSE 수신 중단 (channel=%s, 마지막 id=%s, 취소=%s)",
+                            channel, sent_id, pump.cancelled(),
+                            exc_info=None if pump.cancelled() else pump.exception(),
+                        )
+                        return
+                    # 그룹 만료(group_expiry) 방지를 위해 구독도 함께 갱신
+                    await channel_layer.group_add(realtime.FEED_GROUP, channel)
+                    yield ": heartbeat\n\n"
+                    continue
+
+                message = getter.result()
+
+                if message is None:
+                    yield _sse_event(None, "reset", {})
+                    continue
+                if message["id"] <= sent_id:
+                    continue
+
+                sent_id = message["id"]
+                changes = _sse_filter(message["changes"], sido_id)
+                if changes:
+                    yield _sse_event(message["id"], "status", changes)
+        finally:
+            pump.cancel()
+            await channel_layer.group_discard(realtime.FEED_GROUP, channel)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx 버퍼링 끔
+    return response
+
+
 def get_sigungu(request):
     """
     시/도 선택 시, 해당 시/도의 시/군/구 리스트를 JSON으로 반환하는 API
@@ -510,155 +764,21 @@ def get_sigungu(request):
     if not sido:
         return JsonResponse({"sigungu": []})
 
-    # emergency_main과 동일한 표준화 로직 적용
-    # DB에 "경북", "경남" 등으로 저장되어 있을 수 있으므로 여러 변형 허용
-    std_sido = normalize_sido_name(sido)
-    
-    sigungus = (
-        ErInfo.objects
-        .filter(er_sido__in=[
-            sido,
-            std_sido,
-            sido.replace("도", ""),
-            std_sido.replace("도", ""),
-        ])
-        .values_list("er_sigungu", flat=True)
-        .distinct()
-        .order_by("er_sigungu")
-    )
-
-    return JsonResponse({"sigungu": list(sigungus)})
+    response = JsonResponse({"sigungu": regions.sigungu_names(sido)})
+    # 지역 목록은 자주 안 바뀌므로 브라우저 캐시 허용
+    patch_cache_control(response, public=True, max_age=60 * 10)
+    return response
 
 
 def hospital_detail_json(request, er_id: int):
     """
     상세 모달에서 사용하는 병원 상세 정보 JSON API
+    - 사용자 무관 부분은 응급실별 번들 캐시(detail_bundle)에서 읽고
+    - 즐겨찾기 여부만 요청마다 조회해서 덮어씀
     """
-    er_info = get_object_or_404(ErInfo, er_id=er_id)
-
-    # 최신 상태 정보 가져오기
-    latest_status = (
-        ErStatus.objects
-        .filter(er=er_info)
-        .order_by("-hvdate")
-        .first()
-    )
-
-    # 최신 메시지 가져오기 (hospital 기준, 최신 1개)
-    er_message = (
-        ErMessage.objects
-        .filter(hospital=er_info)
-        .order_by("-message_time")
-        .first()
-    )
-
-
-    # AiReview 가져오기
-    ai_review = None
-    try:
-        ai_review = AiReview.objects.get(er=er_info)
-    except AiReview.DoesNotExist:
-        pass
-
-    # 상태 데이터 준비 + 메인 템플릿 계산 결과를 함께 전달
-    status_data = {}
-    status_ui = {}
-
-    def build_status_ui(available, total, type_name: str):
-        """
-        메인 템플릿(status_filters)과 동일한 계산을 서버에서 수행한다.
-        그래프 표시 여부, 라벨/색상, stroke 값 등을 한 번 계산해 내려준다.
-        """
-        label = status_filters.congestion_text(available, total, type_name)
-        color_class = status_filters.congestion_color_class(available, total, type_name)
-
-        dash_offset = None
-        bg_stroke = "#e0e0e0"
-        if total is not None and total > 0 and available is not None:
-            dash_offset = status_filters.circle_dashoffset(available, total)
-            # available 0 & red일 때만 배경을 빨강으로 처리 (메인과 동일)
-            if available == 0 and color_class == "red":
-                bg_stroke = "#E53935"
-
-        return {
-            "label": label,
-            "color_class": color_class,
-            "dash_offset": dash_offset,  # None이면 그래프 미표시
-            "bg_stroke": bg_stroke,
-            "available": available,
-            "total": total,
-        }
-
-    if latest_status:
-        status_data = {
-            "er_general_available": latest_status.er_general_available,
-            "er_general_total": latest_status.er_general_total,
-            "er_child_available": latest_status.er_child_available,
-            "er_child_total": latest_status.er_child_total,
-            "birth_available": latest_status.birth_available,
-            "birth_total": latest_status.birth_total,  # 메인 페이지와 동일하게 전달
-            "negative_pressure_available": latest_status.negative_pressure_available,
-            "negative_pressure_total": latest_status.negative_pressure_total,
-            "isolation_general_available": latest_status.isolation_general_available,
-            "isolation_general_total": latest_status.isolation_general_total,
-            "isolation_cohort_available": latest_status.isolation_cohort_available,
-            "isolation_cohort_total": latest_status.isolation_cohort_total,
-        }
-
-        status_ui = {
-            "er_general": build_status_ui(
-                latest_status.er_general_available,
-                latest_status.er_general_total,
-                "er_general",
-            ),
-            "er_child": build_status_ui(
-                latest_status.er_child_available,
-                latest_status.er_child_total,
-                "er_child",
-            ),
-            "birth": build_status_ui(
-                latest_status.birth_available,
-                latest_status.birth_total,
-                "birth",
-            ),
-            "negative_pressure": build_status_ui(
-                latest_status.negative_pressure_available,
-                latest_status.negative_pressure_total,
-                "negative_pressure",
-            ),
-            "isolation_general": build_status_ui(
-                latest_status.isolation_general_available,
-                latest_status.isolation_general_total,
-                "isolation_general",
-            ),
-            "isolation_cohort": build_status_ui(
-                latest_status.isolation_cohort_available,
-                latest_status.isolation_cohort_total,
-                "isolation_cohort",
-            ),
-        }
-
-    # 장비 정보
-    has_ct = latest_status.has_ct if latest_status else False
-    has_mri = latest_status.has_mri if latest_status else False
-    has_angio = latest_status.has_angio if latest_status else False
-    has_ventilator = latest_status.has_ventilator if latest_status else False
-    has_birth = bool(latest_status.birth_available) if latest_status else False
-
-
-    # 태그 리스트 생성
-    tags = []
-    if has_ct:
-        tags.append("CT")
-    if has_mri:
-        tags.append("MRI")
-    if has_angio:
-        tags.append("혈관조영")
-    if has_ventilator:
-        tags.append("인공호흡기")
-    if has_birth:
-        tags.append("분만실")
-
+    bundle = detail_bundle.get_detail_bundle(er_id)
+    if bundle is None:
+        raise Http404("응급실 정보가 없습니다.")
 
     # 즐겨찾기 상태 확인 (로그인 사용자만)
     is_favorite = False
@@ -666,32 +786,75 @@ def hospital_detail_json(request, er_id: int):
     if user_id:
         is_favorite = UserFavorite.objects.filter(
             user_id=user_id,
-            er=er_info,
+            er_id=er_id,
             hos__isnull=True
         ).exists()
 
     data = {
-        "er_name": er_info.er_name,
-        "er_address": er_info.er_address,
-        "er_lat": er_info.er_lat,
-        "er_lng": er_info.er_lng,
-        "er_id": er_info.er_id,  # 추가: 모달에서 즐겨찾기 토글 시 사용
+        **bundle,
         "is_favorite": is_favorite,  # 추가: 즐겨찾기 상태
-        "tags": tags,
-        "status": status_data,
-        "status_ui": status_ui,  # 메인과 동일한 계산 결과
-        "message": er_message.message if er_message and er_message.message else None,
-        "ai_review": {
-            "summary": ai_review.summary if ai_review and ai_review.summary else None,
-            "positive_ratio": float(ai_review.positive_ratio) if ai_review and ai_review.positive_ratio is not None else None,
-            "negative_ratio": float(ai_review.negative_ratio) if ai_review and ai_review.negative_ratio is not None else None,
-        } if ai_review else None,
-
         "kakao_map_js_key": settings.KAKAO_MAP_JS_KEY,
     }
 
     return JsonResponse(data)
 
+
+# 추이 API 조회 기간 (period 별 기본 / 최대 일수)
+TREND_DAYS = {
+    "hour": (2, 14),
+    "day": (30, 365),
+}
+
+
+@require_GET
+def er_status_trend(request, er_id: int):
+    """
+    응급실 가용 병상 추이 JSON API (시간/일 단위 집계)
+    - /emergency/api/trend/<er_id>/?period=hour&days=2
+    - 집계 테이블(er_status_rollup)만 읽음. 집계는 15분마다 갱신되므로 짧게 브라우저 캐시 허용
+    """
+    period = request.GET.get("period", "hour")
+    if period not in TREND_DAYS:
+        return JsonResponse({"error": "period 는 hour 또는 day 만 가능합니다."}, status=400)
+
+    default_days, max_days = TREND_DAYS[period]
+    try:
+        days = int(request.GET.get("days", default_days))
+    except (TypeError, ValueError):
+        days = default_days
+    days = max(1, min(days, max_days))
+
+    if not ErInfo.objects.filter(er_id=er_id).exists():
+        raise Http404("응급실 정보가 없습니다.")
+
+    start = timezone.now() - timedelta(days=days)
+    response = JsonResponse({
+        "er_id": er_id,
+        "period": period,
+        "days": days,
+        "points": status_history.trend_points(er_id, period, start),
+    })
+    patch_cache_control(response, public=True, max_age=60 * 5)
+    return response
+
+
+@require_GET
+def er_congestion_heatmap(request, er_id: int):
+    """
+    요일 × 시간 평균 혼잡도 히트맵 JSON API (상세 모달용)
+    - /emergency/api/heatmap/<er_id>/
+    - 미리 계산된 168칸 블롭만 읽음. 1시간 단위로 갱신되므로 브라우저 캐시 허용
+    """
+    heatmap = congestion.get_heatmap(er_id)
+    if heatmap is None:
+        if not ErInfo.objects.filter(er_id=er_id).exists():
+            raise Http404("응급실 정보가 없습니다.")
+        heatmap = {"weekdays": congestion.WEEKDAY_LABELS, "matrix": None, "computed_until": None}
+
+    response = JsonResponse({"er_id": er_id, **heatmap})
+    patch_cache_control(response, public=True, max_age=60 * 30)
+    return response
+
 # =========================================
 # ★  통합 POST API 엔드포인트  ★
 # =========================================
@@ -771,6 +934,9 @@ def toggle_er_favorite(request):
         )
         is_favorite = True
 
+    # 목록 API ETag 무효화용 버전 갱신
+    _bump_favorites_version(user_id)
+
     # 4) JSON 응답
     return JsonResponse({"ok": True, "is_favorite": is_favorite})
 
@@ -1,3 +1,112 @@
-from django.test import TestCase
+import json
+import random
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.db.models.department import Department
+from apps.db.models.doctor import Doctors
+from apps.db.models.hospital import Hospital
+from apps.db.models.users import Users
+from apps.services.spatial_index import haversine_km, invalidate_index
+
+from . import views
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+USER_LAT = 37.5
+USER_LNG = 127.0
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MainViewNearestHospitalTest(TestCase):
+    """진료과별 가까운 병원 5곳 == 전체 병원 거리 계산 결과 (후보 수 확장 포함)"""
+
+    def setUp(self):
+        cache.clear()
+        rng = random.Random(11)
+        self.departments = [
+            Department.objects.create(dep_name=name, dep_code=code)
+            for name, code in (("내과", "01"), ("외과", "04"), ("소아과", "11"))
+        ]
+        self.hospitals = []
+        for i in range(60):
+            hospital = Hospital.objects.create(
+                hpid=f"H{i:04d}", name=f"병원{i}", address="주소",
+                lat=USER_LAT + rng.uniform(-0.5, 0.5), lng=USER_LNG + rng.uniform(-0.5, 0.5),
+                hos_name=f"병원{i}", hos_password="x",
+            )
+            self.hospitals.append(hospital)
+            # 소아과는 먼 병원 몇 곳에만 있음 → 가까운 후보만으로는 5곳을 못 채움
+            depts = self.departments[:2] if i % 10 else self.departments
+            for dept in depts:
+                self.add_doctor(hospital, dept)
+        # 좌표가 없는 병원은 제외
+        no_coords = Hospital.objects.create(
+            hpid="H_NONE", name="좌표 없음", address="주소", hos_name="좌표 없음", hos_password="x"
+        )
+        self.add_doctor(no_coords, self.departments[0])
+
+        invalidate_index("hospital")
+        session = self.client.session
+        session["user_id"] = Users.objects.first().user_id
+        session["user_lat"] = USER_LAT
+        session["user_lon"] = USER_LNG
+        session.save()
+
+    def add_doctor(self, hospital, dept):
+        n = Users.objects.count()
+        user = Users.objects.create(
+            username=f"doctor{n}", password="x", name=f"의사{n}", gender="M", phone="010",
+            email=f"doctor{n}@example.com", resident_reg_no="000000", mail_confirm="Y",
+            address="주소", role="DOCTOR",
+        )
+        Doctors.objects.create(license_no=str(n), verified=True, hos=hospital, user=user, dep=dept)
+
+    def expected(self, dept):
+        hospital_ids = set(Doctors.objects.filter(dep=dept).values_list("hos_id", flat=True))
+        distances = sorted(
+            (haversine_km(USER_LAT, USER_LNG, h.lat, h.lng), h.hos_id)
+            for h in self.hospitals
+            if h.hos_id in hospital_ids
+        )
+        return [hos_id for _, hos_id in distances[:views.NEAREST_PER_DEPT]]
+
+    def result(self):
+        response = self.client.get(reverse("reservation_main"))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.context["hospital_json"])
+
+    def assertMatchesBruteForce(self, result):
+        self.assertEqual(set(result), {dept.dep_name for dept in self.departments})
+        for dept in self.departments:
+            with self.subTest(dept=dept.dep_name):
+                hospitals = result[dept.dep_name]
+                self.assertEqual([h["id"] for h in hospitals], self.expected(dept))
+                for h in hospitals:
+                    self.assertAlmostEqual(
+                        h["distance"], haversine_km(USER_LAT, USER_LNG, h["lat"], h["lng"]), places=9
+                    )
+
+    def test_default_candidate_count(self):
+        self.assertMatchesBruteForce(self.result())
+
+    def test_candidates_grow_until_every_department_is_filled(self):
+        with mock.patch.object(views, "NEAREST_CANDIDATES", 2), \
+                mock.patch.object(views, "_group_doctors_by_dept", wraps=views._group_doctors_by_dept) as group:
+            result = self.result()
+
+        # 후보 2 → 8 → 32 → 128(전체 60곳)
+        self.assertEqual([len(c.args[0]) for c in group.call_args_list], [2, 8, 32, 60])
+        self.assertMatchesBruteForce(result)
+
+    def test_department_with_fewer_hospitals_than_target(self):
+        Doctors.objects.filter(dep=self.departments[2]).exclude(hos=self.hospitals[0]).delete()
+
+        with mock.patch.object(views, "NEAREST_CANDIDATES", 4):
+            result = self.result()
+
+        self.assertEqual([h["id"] for h in result["소아과"]], [self.hospitals[0].hos_id])
+        self.assertMatchesBruteForce(result)
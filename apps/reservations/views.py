@@ -1,10 +1,10 @@
 import json
-import math
 
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
 from django.urls import reverse
 from django.contrib import messages
+from django.db.models import Count
 from django.utils import timezone
 from apps.db.models.department import Department
 from apps.db.models.doctor import Doctors
@@ -18,18 +18,14 @@ from datetime import date, datetime, time, timedelta
 from django.views.decorators.http import require_POST
 from apps.db.models.users import Users
 from apps.services.holidays import get_holidays_for_years, is_holiday_date
+from apps.services.spatial_index import get_hospital_index
 
 
-def haversine(lat1, lon1, lat2, lon2):
-    """위도/경도 사이 거리(km)"""
-    R = 6371
-    d_lat = math.radians(lat2 - lat1)
-    d_lon = math.radians(lon2 - lon1)
-    a = (math.sin(d_lat / 2) ** 2 +
-         math.cos(math.radians(lat1)) *
-         math.cos(math.radians(lat2)) *
-         math.sin(d_lon / 2) ** 2)
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+# 진료과별로 보여줄 가까운 병원 수
+NEAREST_PER_DEPT = 5
+
+# 공간 인덱스에서 처음 가져올 최근접 병원 후보 수 (부족하면 4배씩 확장)
+NEAREST_CANDIDATES = 100
 
 
 def main_view(request):
@@ -57,7 +53,58 @@ def main_view(request):
         .values_list("hos_id", flat=True)
     )
 
-    doctors = Doctors.objects.select_related("hos", "dep")
+    # 진료과별로 채워야 하는 병원 수 (좌표가 있는 병원이 5곳 미만인 과는 그 수만큼)
+    dept_targets = {
+        row["dep__dep_name"]: min(NEAREST_PER_DEPT, row["hos_count"])
+        for row in (
+            Doctors.objects
+            .filter(hos__lat__isnull=False, hos__lng__isnull=False)
+            .values("dep__dep_name")
+            .annotate(hos_count=Count("hos", distinct=True))
+        )
+    }
+
+    # 공간 인덱스로 가까운 병원부터 후보를 가져오고,
+    # 모든 진료과가 5곳을 채울 때까지 후보 수를 넓혀 간다 (전체 병원 스캔 방지)
+    hospital_index = get_hospital_index()
+    candidate_count = NEAREST_CANDIDATES
+
+    while True:
+        distance_map = dict(hospital_index.nearest(user_lat, user_lon, candidate_count))
+        grouped = _group_doctors_by_dept(distance_map, favorite_ids)
+
+        if candidate_count >= len(hospital_index) or all(
+            len(grouped.get(dept_name, {})) >= target
+            for dept_name, target in dept_targets.items()
+        ):
+            break
+        candidate_count *= 4
+
+    result_by_dept = {}
+    for dept_name, hospitals_dict in grouped.items():
+        hospitals = list(hospitals_dict.values())
+        hospitals.sort(key=lambda x: x["distance"])
+        result_by_dept[dept_name] = hospitals[:NEAREST_PER_DEPT]
+
+    context = {
+        # ✅ 2) ensure_ascii=False 권장(한글 깨짐 방지). DjangoJSONEncoder는 유지
+        "hospital_json": json.dumps(result_by_dept, cls=DjangoJSONEncoder, ensure_ascii=False),
+        "user_lat": user_lat,
+        "user_lon": user_lon,
+        "active_dept": active_dept,
+    }
+    return render(request, "reservations/main.html", context)
+
+
+def _group_doctors_by_dept(distance_map, favorite_ids):
+    """
+    후보 병원(hos_id → 거리 km)에 소속된 의사를 진료과별 {hos_id: 병원 정보} 로 묶는다.
+    """
+    doctors = (
+        Doctors.objects
+        .select_related("hos", "dep")
+        .filter(hos_id__in=distance_map.keys())
+    )
 
     grouped = {}
 
@@ -68,10 +115,7 @@ def main_view(request):
         hos_lat = h.lat
         hos_lon = h.lng
 
-        if hos_lat is None or hos_lon is None:
-            continue
-
-        distance = haversine(user_lat, user_lon, float(hos_lat), float(hos_lon))
+        distance = distance_map[h.hos_id]
 
         if dept_name not in grouped:
             grouped[dept_name] = {}
@@ -99,20 +143,7 @@ def main_view(request):
                 "is_favorite": (h.hos_id in favorite_ids),
             }
 
-    result_by_dept = {}
-    for dept_name, hospitals_dict in grouped.items():
-        hospitals = list(hospitals_dict.values())
-        hospitals.sort(key=lambda x: x["distance"])
-        result_by_dept[dept_name] = hospitals[:5]
-
-    context = {
-        # ✅ 2) ensure_ascii=False 권장(한글 깨짐 방지). DjangoJSONEncoder는 유지
-        "hospital_json": json.dumps(result_by_dept, cls=DjangoJSONEncoder, ensure_ascii=False),
-        "user_lat": user_lat,
-        "user_lon": user_lon,
-        "active_dept": active_dept,
-    }
-    return render(request, "reservations/main.html", context)
+    return grouped
 
 def reservation_page(request):
     currentYear = datetime.now().year
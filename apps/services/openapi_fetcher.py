@@ -0,0 +1,269 @@
+# apps/services/openapi_fetcher.py
+
+"""
+공공데이터포털(data.go.kr) API 병렬 호출 엔진 (스레드 풀 + 공유 커넥션 풀).
+
+- 실제 HTTP 는 공유 requests.Session(동기)으로 ThreadPoolExecutor 워커 스레드에서 처리
+  (HTTP/1.1 keep-alive 커넥션 풀을 모든 요청이 재사용)
+- asyncio 는 스레드 작업의 동시 실행 수 / 속도 제한 / 재시도 대기를 조율하는 데만 사용
+  (비동기 HTTP 클라이언트가 아님, fetch_all 은 동기 함수)
+- 동시 요청 수(concurrency) 제한 + 토큰 버킷으로 초당 요청 수 제한 (일일 쿼터 보호)
+- 5xx / 429 / 타임아웃 / 연결 오류는 지터(jitter)를 준 지수 백오프로 재시도
+  (본문을 읽는 중의 타임아웃 / 연결 끊김도 포함 → parse 가 response.raw 를 읽다가 나는 오류)
+- 요청 키(지역, hpid 등)별 소요 시간 / 시도 횟수 / 결과 건수 통계
+- 응답은 stream=True 로 받아 parse(response) 가 response.raw 를 바로 읽을 수 있다
+  (verbose=True 면 본문 앞부분을 출력하기 위해 전체를 읽은 뒤 파싱)
+- archive(RawArchive) 를 넘기면 정상 응답 본문을 모두 읽어 보관한 뒤 파싱 (raw_archive.py)
+"""
+
+import asyncio
+import io
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RATE_PER_SEC = 20.0
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+# 재시도 대상 HTTP 상태 코드 (429: 호출 제한, 5xx: 서버 오류)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """재시도 대상 오류 (5xx / 429)"""
+
+
+# 재시도 대상 예외
+# - 연결 / 응답 헤더 단계: requests.Timeout / requests.ConnectionError
+# - 본문 단계(stream=True 라 parse 가 response.raw 를 직접 읽음): urllib3 예외가 그대로 올라옴
+RETRYABLE_EXCEPTIONS = (
+    RetryableError,
+    requests.Timeout,
+    requests.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    ReadTimeoutError,
+    ProtocolError,
+)
+
+
+class TokenBucket:
+    """
+    초당 rate 개의 토큰이 채워지는 버킷. 요청 1건마다 토큰 1개 사용.
+    capacity 만큼은 순간적으로 몰아서 보낼 수 있다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class FetchStat:
+    key: str
+    elapsed_ms: float = 0.0
+    attempts: int = 0
+    items: int = 0
+    ok: bool = False
+    error: str = ""
+
+
+class PooledOpenApiFetcher:
+    """
+    사용 예)
+        fetcher = PooledOpenApiFetcher(concurrency=16, rate_per_sec=20)
+        results = fetcher.fetch_all([(key, url, params), ...], parse_items)
+        fetcher.print_stats("[A]")
+
+    parse(response) 는 워커 스레드에서 호출되며 item 리스트를 반환해야 한다.
+    (response.raw 는 gzip 등 압축이 풀린 스트림)
+    """
+
+    def __init__(
+        self,
+        concurrency=DEFAULT_CONCURRENCY,
+        rate_per_sec=DEFAULT_RATE_PER_SEC,
+        timeout=DEFAULT_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF_SECONDS,
+        verbose=False,
+        archive=None,
+    ):
+        self.concurrency = max(1, int(concurrency))
+        self.rate_per_sec = max(0.1, float(rate_per_sec))
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.verbose = verbose
+        self.archive = archive
+        self.stats = []
+
+        # 공유 keep-alive 커넥션 풀 (동시 요청 수만큼 커넥션 유지)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.concurrency,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------
+    # 동기 진입점 (management command 에서 호출)
+    # ---------------------------------------------------------
+    def fetch_all(self, jobs, parse):
+        """
+        jobs: [(key, url, params), ...]
+        반환: {key: items 리스트 또는 None(최종 실패)}
+        """
+        return asyncio.run(self._fetch_all(list(jobs), parse))
+
+    async def _fetch_all(self, jobs, parse):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate_per_sec)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            async def run(key, url, params):
+                async with semaphore:
+                    return key, await self._fetch_one(
+                        loop, executor, bucket, key, url, params, parse
+                    )
+
+            results = await asyncio.gather(
+                *(run(key, url, params) for key, url, params in jobs)
+            )
+
+        return dict(results)
+
+    async def _fetch_one(self, loop, executor, bucket, key, url, params, parse):
+        stat = FetchStat(key=str(key))
+        started = time.perf_counter()
+
+        try:
+            for attempt in range(self.retries + 1):
+                await bucket.acquire()
+                stat.attempts += 1
+
+                try:
+                    items = await loop.run_in_executor(
+                        executor, self._request, key, url, params, parse
+                    )
+                    stat.ok = True
+                    stat.items = len(items)
+                    return items
+
+                except RETRYABLE_EXCEPTIONS as e:
+                    stat.error = str(e)
+                    if attempt >= self.retries:
+                        break
+                    # 지수 백오프 + full jitter (동시에 실패한 요청이 같은 순간 재시도하지 않도록)
+                    await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+                except Exception as e:
+                    stat.error = str(e)
+                    break
+
+            print(f"[FETCH][ERROR] {key} 최종 실패 ({stat.attempts}회 시도): {stat.error}")
+            return None
+
+        finally:
+            stat.elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats.append(stat)
+
+    def _request(self, key, url, params, parse):
+        response = self.session.get(url, params=params, timeout=self.timeout, stream=True)
+        try:
+            if self.verbose:
+                self._dump(response)
+
+            if response.status_code in RETRY_STATUS_CODES:
+                raise RetryableError(f"HTTP {response.status_code}")
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+
+            response.raw.decode_content = True
+            if self.archive is not None:
+                # 본문 전체를 보관한 뒤 메모리 스트림으로 파싱
+                raw = response.raw.read()
+                self.archive.store(key, url, params, raw)
+                response.raw = io.BytesIO(raw)
+            return parse(response)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _dump(response):
+        """디버그 출력 (verbose 일 때만). 본문을 모두 읽으므로 raw 를 메모리 스트림으로 교체"""
+        content = response.content
+        response.raw = io.BytesIO(content)
+
+        print("\n=== REQUEST URL ===")
+        print(response.url)
+        print("=== STATUS ===")
+        print(response.status_code)
+        print("=== RAW XML (앞부분) ===")
+        print(content[:2000].decode(response.encoding or "utf-8", errors="replace"))
+        print("==========================\n")
+
+    # ---------------------------------------------------------
+    # 통계
+    # ---------------------------------------------------------
+    def reset_stats(self):
+        self.stats = []
+
+    def print_stats(self, prefix="[FETCH]", slowest=5):
+        if not self.stats:
+            return
+
+        elapsed = sorted(s.elapsed_ms for s in self.stats)
+        failed = [s for s in self.stats if not s.ok]
+        retried = sum(1 for s in self.stats if s.attempts > 1)
+
+        def pct(p):
+            return elapsed[min(len(elapsed) - 1, int(len(elapsed) * p))]
+
+        print(
+            f"{prefix} 요청 {len(self.stats)}건 / 실패 {len(failed)}건 / 재시도 발생 {retried}건 | "
+            f"p50 {pct(0.50):.0f}ms / p95 {pct(0.95):.0f}ms / max {elapsed[-1]:.0f}ms"
+        )
+
+        for s in sorted(self.stats, key=lambda s: -s.elapsed_ms)[:slowest]:
+            print(
+                f"{prefix}   {s.key}: {s.elapsed_ms:.0f}ms "
+                f"(시도 {s.attempts}회, {s.items}건{'' if s.ok else ', 실패'})"
+            )
@@ -0,0 +1,302 @@
+# apps/services/raw_archive.py
+
+"""
+data.go.kr 원본 응답 보관소 (수집 장애 재현 / 재생용).
+
+- 응답 본문을 내용 해시(sha1)로 gzip 저장 → 같은 응답은 1번만 저장 (content-addressed)
+    {RAW_ARCHIVE_DIR}/objects/ab/cdef....xml.gz
+- 수집 1회(run)마다 manifest 에 요청 키 / URL / 파라미터(serviceKey 제외) / 해시 기록
+    {RAW_ARCHIVE_DIR}/runs/{run_id}.json
+- ArchiveReplayFetcher 는 manifest 의 응답을 PooledOpenApiFetcher 와 같은 방식으로 parse 에 넘긴다
+  → fetch_emergency / fetch_emergency_message --replay <run_id> (네트워크 호출 없음)
+  → 기본은 파싱 후 저장된 값과 비교만 출력, --apply 를 붙여야 DB 에 반영
+    (최신 hvdate / 메시지 시각만 반영, 실시간 전송 / 기본정보 캐시 저장 없음)
+- RAW_ARCHIVE_RETENTION_DAYS 가 지난 manifest 와 어느 manifest 도 참조하지 않는 응답은
+  prune_raw_archive 가 삭제 (run_scheduler 가 하루 1번 실행)
+
+실행 예)
+    python manage.py fetch_emergency --replay fetch_emergency-20250101T120000-1a2b3c
+    python manage.py fetch_emergency --replay fetch_emergency-20250101T120000-1a2b3c --apply
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .openapi_fetcher import FetchStat
+
+MANIFEST_VERSION = 1
+
+# 로그 / manifest 에 남기지 않는 파라미터
+SECRET_PARAMS = {"serviceKey"}
+
+
+def archive_root():
+    return Path(getattr(settings, "RAW_ARCHIVE_DIR", Path(settings.BASE_DIR) / "var" / "raw_archive"))
+
+
+def is_enabled():
+    return getattr(settings, "RAW_ARCHIVE_ENABLED", False)
+
+
+def retention_days():
+    return getattr(settings, "RAW_ARCHIVE_RETENTION_DAYS", 7)
+
+
+###########################################################
+# 압축 (gzip)
+###########################################################
+
+CODEC = "gz"
+
+
+def _compress(raw):
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec != CODEC:
+        raise RuntimeError(f"지원하지 않는 압축 형식입니다: {codec}")
+    return gzip.decompress(data)
+
+
+def _object_path(root, digest, codec):
+    return root / "objects" / digest[:2] / f"{digest[2:]}.xml.{codec}"
+
+
+def _manifest_path(root, run_id):
+    return root / "runs" / f"{run_id}.json"
+
+
+def _write_atomic(path, data):
+    """임시 파일에 쓴 뒤 rename (동시에 같은 객체를 써도 깨진 파일이 남지 않음)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+###########################################################
+# 저장
+###########################################################
+
+class RawArchive:
+    """
+    수집 1회분 보관. store() 는 PooledOpenApiFetcher 워커 스레드에서 호출된다.
+
+    사용 예)
+        with RawArchive.start("fetch_emergency") as archive:
+            PooledOpenApiFetcher(archive=archive) ...
+    """
+
+    def __init__(self, command, root=None):
+        self.root = Path(root) if root else archive_root()
+        self.codec = CODEC
+        self.command = command
+        self.run_id = f"{command}-{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.started_at = timezone.now()
+        self.entries = []
+        self.stored_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, command):
+        """RAW_ARCHIVE_ENABLED 가 꺼져 있으면 None"""
+        return cls(command) if is_enabled() else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def store(self, key, url, params, raw):
+        digest = hashlib.sha1(raw).hexdigest()
+        path = _object_path(self.root, digest, self.codec)
+
+        written = 0
+        if path.exists():
+            # 이미 있는 응답도 수정 시각을 갱신 → 이 run 의 manifest 가 쓰이기 전에 정리되지 않도록
+            os.utime(path)
+        else:
+            data = _compress(raw)
+            _write_atomic(path, data)
+            written = len(data)
+
+        entry = {
+            "key": str(key),
+            "url": url,
+            "params": {k: v for k, v in params.items() if k not in SECRET_PARAMS},
+            "digest": digest,
+            "codec": self.codec,
+            "size": len(raw),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.stored_bytes += written
+        return digest
+
+    def close(self):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "run_id": self.run_id,
+            "command": self.command,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": timezone.now().isoformat(),
+            "entries": self.entries,
+        }
+        _write_atomic(
+            _manifest_path(self.root, self.run_id),
+            json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"),
+        )
+        print(
+            f"[ARCHIVE] {self.run_id} - 응답 {len(self.entries)}건 "
+            f"(새로 저장 {self.stored_bytes / 1024:.1f}KB, {self.codec})"
+        )
+
+
+###########################################################
+# 보관 기간 정리
+###########################################################
+
+def prune_archive(days=None, root=None, now=None):
+    """
+    days 일이 지난 manifest 삭제 후, 남은 manifest 가 참조하지 않는 응답 파일 삭제.
+    수집 중인 run 이 쓰는 응답(manifest 는 아직 없음)은 수정 시각이 최근이라 남겨 둔다.
+    반환: (삭제한 manifest 수, 삭제한 응답 파일 수, 삭제한 바이트)
+    """
+    root = Path(root) if root else archive_root()
+    days = retention_days() if days is None else days
+    cutoff = (now or time.time()) - days * 24 * 60 * 60
+
+    removed_runs = 0
+    referenced = set()
+    for path in sorted((root / "runs").glob("*.json")):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed_runs += 1
+            continue
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        referenced.update(entry["digest"] for entry in manifest.get("entries", []))
+
+    removed_objects = 0
+    removed_bytes = 0
+    for path in (root / "objects").glob("*/*.xml.*"):
+        digest = path.parent.name + path.name.split(".", 1)[0]
+        if digest in referenced:
+            continue
+        stat = path.stat()
+        if stat.st_mtime >= cutoff:
+            continue
+        path.unlink(missing_ok=True)
+        removed_objects += 1
+        removed_bytes += stat.st_size
+
+    return removed_runs, removed_objects, removed_bytes
+
+
+###########################################################
+# 재생
+###########################################################
+
+def load_manifest(run_id, root=None):
+    path = _manifest_path(Path(root) if root else archive_root(), run_id)
+    if not path.exists():
+        raise FileNotFoundError(f"보관된 수집 기록이 없습니다: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def read_payload(entry, root=None):
+    root = Path(root) if root else archive_root()
+    data = _object_path(root, entry["digest"], entry["codec"]).read_bytes()
+    return _decompress(data, entry["codec"])
+
+
+class _ReplayResponse:
+    """parse(response) 가 쓰는 부분(raw 스트림)만 흉내"""
+
+    def __init__(self, raw):
+        self.raw = io.BytesIO(raw)
+
+
+class ArchiveReplayFetcher:
+    """
+    PooledOpenApiFetcher 대신 보관된 응답을 돌려주는 fetcher (네트워크 호출 없음).
+    요청 키가 manifest 에 없으면 최종 실패와 같게 None.
+    """
+
+    def __init__(self, run_id, root=None):
+        self.root = Path(root) if root else archive_root()
+        self.manifest = load_manifest(run_id, self.root)
+        self.run_id = run_id
+        self.concurrency = 1
+        self.rate_per_sec = float("inf")
+        self.stats = []
+
+        # (URL, 키) 별 마지막 응답 (같은 run 에서 같은 API 를 같은 키로 부른 경우는 마지막 것)
+        self.entries = {(e["url"], e["key"]): e for e in self.manifest["entries"]}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def params(self, url, key):
+        """보관된 요청 파라미터 (없으면 {})"""
+        entry = self.entries.get((url, str(key)))
+        return entry["params"] if entry else {}
+
+    def regions(self, url):
+        """manifest 에서 해당 URL 로 호출한 (STAGE1, STAGE2) 목록 (fetch_emergency 지역 재생용)"""
+        return [
+            (e["params"]["STAGE1"], e["params"]["STAGE2"])
+            for (entry_url, _), e in self.entries.items()
+            if entry_url == url and "STAGE1" in e["params"]
+        ]
+
+    def fetch_all(self, jobs, parse):
+        results = {}
+        for key, url, params in jobs:
+            stat = FetchStat(key=str(key))
+            started = time.perf_counter()
+
+            entry = self.entries.get((url, str(key)))
+            if entry is None:
+                results[key] = None
+                stat.error = "보관된 응답 없음"
+            else:
+                items = parse(_ReplayResponse(read_payload(entry, self.root)))
+                results[key] = items
+                stat.ok = True
+                stat.attempts = 1
+                stat.items = len(items)
+
+            stat.elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats.append(stat)
+        return results
+
+    def reset_stats(self):
+        self.stats = []
+
+    def print_stats(self, prefix="[REPLAY]", slowest=5):
+        if not self.stats:
+            return
+        missing = sum(1 for s in self.stats if not s.ok)
+        total_ms = sum(s.elapsed_ms for s in self.stats)
+        print(
+            f"{prefix} 재생 {len(self.stats)}건 / 보관 응답 없음 {missing}건 | "
+            f"파싱 합계 {total_ms:.0f}ms"
+        )
@@ -0,0 +1,205 @@
+# apps/services/region_polling.py
+
+"""
+fetch_emergency 지역(시도 + 시군구)별 적응형 폴링.
+
+서울/경기 대도시 응급실은 매 회차 값이 바뀌지만 농어촌 지역은 거의 바뀌지 않으므로,
+모든 지역을 같은 주기로 호출하는 대신 응답이 실제로 바뀐 비율에 따라 등급을 나눈다.
+
+- 지역별 응답 원본 바이트 해시를 저장해 두고 호출할 때마다 바뀌었는지 기록
+  → change_rate = 지수 이동 평균(EWMA), 호출 1회당 변경 확률
+- 등급(fast / normal / slow)별 최소 호출 간격(settings.ER_POLL_*_MINUTES)이 지난 지역만 호출
+- ER_POLL_FULL_SWEEP_MINUTES 가 지나면 등급과 무관하게 전체 지역 호출 (느린 지역도 최대 이 시간 안에 갱신)
+- 호출 실패한 지역은 상태를 바꾸지 않음 → 다음 회차에 다시 호출 대상
+- 폴링 상태는 병합이 끝난 뒤 기록 (병합 실패 시 다음 회차에 같은 지역을 다시 판단)
+
+응답 지문(fingerprint):
+- 지역별 마지막으로 반영한 응답 해시만 캐시에 보관 (PAYLOAD_KEY)
+- 응답 바이트가 이전 회차와 같으면 파싱 / 병합(STAGING 적재 포함)을 모두 건너뜀
+- 캐시는 병합이 끝난 뒤에만 저장 → 병합이 실패한 응답은 다음 회차에 다시 반영
+- --full-sweep 으로 강제 수집할 때는 지문과 무관하게 모두 다시 반영
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.db.models import ErRegionPollState
+
+# 변경률 EWMA 에서 이번 호출 결과의 비중
+CHANGE_RATE_ALPHA = 0.3
+
+# 등급 기준 (호출 1회당 변경 확률). 새 지역은 1.0 에서 시작 → fast
+FAST_THRESHOLD = 0.5
+NORMAL_THRESHOLD = 0.15
+
+# 스케줄러 지터로 호출 시각이 조금 당겨져도 한 회차를 통째로 건너뛰지 않도록 두는 여유
+POLL_SLACK = timedelta(minutes=1)
+
+# 마지막 전체 수집 시각 (캐시에 없으면 전체 수집부터 시작)
+FULL_SWEEP_KEY = "er_poll:last_full_sweep"
+
+# 지역별 마지막 반영 응답 해시
+PAYLOAD_KEY = "er_poll:payload:v2:{sido}:{sigungu}"
+
+# 응답 지문 보관 시간. 지나면 같은 응답이라도 1번 다시 반영 (main 테이블과 어긋난 경우 복구)
+PAYLOAD_TTL_SECONDS = 6 * 60 * 60
+
+
+def tier_intervals():
+    return {
+        ErRegionPollState.TIER_FAST: timedelta(minutes=getattr(settings, "ER_POLL_FAST_MINUTES", 0)),
+        ErRegionPollState.TIER_NORMAL: timedelta(minutes=getattr(settings, "ER_POLL_NORMAL_MINUTES", 15)),
+        ErRegionPollState.TIER_SLOW: timedelta(minutes=getattr(settings, "ER_POLL_SLOW_MINUTES", 30)),
+    }
+
+
+def full_sweep_interval():
+    return timedelta(minutes=getattr(settings, "ER_POLL_FULL_SWEEP_MINUTES", 60))
+
+
+def classify_tier(change_rate):
+    if change_rate >= FAST_THRESHOLD:
+        return ErRegionPollState.TIER_FAST
+    if change_rate >= NORMAL_THRESHOLD:
+        return ErRegionPollState.TIER_NORMAL
+    return ErRegionPollState.TIER_SLOW
+
+
+def payload_digest(raw):
+    """지역 응답 원본 바이트 해시"""
+    return hashlib.sha1(raw).hexdigest()
+
+
+def payload_key(region):
+    sido, sigungu = region
+    return PAYLOAD_KEY.format(sido=sido, sigungu=sigungu)
+
+
+def cached_payloads(regions):
+    """{(sido, sigungu): 응답 해시} (캐시에 있는 지역만)"""
+    keys = {payload_key(region): region for region in regions}
+    return {keys[key]: value for key, value in cache.get_many(keys.keys()).items()}
+
+
+def forget_payloads(regions):
+    """응답 지문 삭제 → 다음 회차에 같은 응답이라도 다시 반영"""
+    cache.delete_many([payload_key(region) for region in regions])
+
+
+@dataclass
+class RegionPollPlan:
+    """
+    이번 회차 호출 계획 + 지역별 응답 해시 (record_region_polls 에서 상태 갱신에 사용)
+    - forced: --full-sweep 강제 수집 (응답 지문과 무관하게 모두 반영)
+    - payloads: 이번에 새로 반영한 지역의 응답 해시 → 병합 후 캐시에 저장
+    """
+    regions: list
+    total: int
+    full_sweep: bool
+    started_at: datetime
+    forced: bool = False
+    hashes: dict = field(default_factory=dict)
+    payloads: dict = field(default_factory=dict)
+
+    def observe(self, region, digest, applied=False):
+        """호출 성공한 지역의 응답 해시 기록. applied 면 이번에 새로 반영한 응답"""
+        self.hashes[region] = digest
+        if applied:
+            self.payloads[region] = digest
+
+
+def plan_region_polls(regions, force_full=False, now=None):
+    """
+    regions: [(sido, sigungu), ...] 중 이번 회차에 호출할 지역 선택.
+    전체 수집 주기가 지났거나 force_full 이면 전체 지역
+    """
+    now = now or timezone.now()
+    regions = list(regions)
+
+    last_full = cache.get(FULL_SWEEP_KEY)
+    if force_full or last_full is None or now - last_full >= full_sweep_interval():
+        return RegionPollPlan(regions, len(regions), True, now, forced=force_full)
+
+    intervals = tier_intervals()
+    states = {
+        (st.sido, st.sigungu): st
+        for st in ErRegionPollState.objects.only("sido", "sigungu", "tier", "last_polled_at")
+    }
+
+    due = []
+    for region in regions:
+        st = states.get(region)
+        if st is None or st.last_polled_at is None:
+            due.append(region)
+            continue
+
+        interval = intervals.get(st.tier, timedelta(0))
+        if now - st.last_polled_at >= interval - POLL_SLACK:
+            due.append(region)
+
+    return RegionPollPlan(due, len(regions), False, now)
+
+
+def record_region_polls(plan):
+    """
+    호출 결과로 지역별 변경률 / 등급 갱신 + 새로 반영한 응답 지문 저장.
+    반환: {등급: 지역 수} (이번에 호출한 지역 기준)
+    """
+    states = {
+        (st.sido, st.sigungu): st
+        for st in ErRegionPollState.objects.all()
+    }
+
+    to_create = []
+    to_update = []
+    for (sido, sigungu), digest in plan.hashes.items():
+        st = states.get((sido, sigungu))
+        if st is None:
+            st = ErRegionPollState(sido=sido, sigungu=sigungu)
+            to_create.append(st)
+        else:
+            to_update.append(st)
+
+        changed = digest != st.payload_hash
+        st.change_rate = (
+            CHANGE_RATE_ALPHA * (1.0 if changed else 0.0)
+            + (1 - CHANGE_RATE_ALPHA) * st.change_rate
+        )
+        st.tier = classify_tier(st.change_rate)
+        st.payload_hash = digest
+        st.polls += 1
+        st.last_polled_at = plan.started_at
+        if changed:
+            st.changes += 1
+            st.last_changed_at = plan.started_at
+
+    if to_create:
+        ErRegionPollState.objects.bulk_create(to_create, batch_size=400)
+    if to_update:
+        ErRegionPollState.objects.bulk_update(
+            to_update,
+            [
+                "change_rate", "tier", "payload_hash", "polls", "changes",
+                "last_polled_at", "last_changed_at",
+            ],
+            batch_size=400,
+        )
+
+    if plan.full_sweep:
+        cache.set(FULL_SWEEP_KEY, plan.started_at, None)
+
+    if plan.payloads:
+        cache.set_many(
+            {payload_key(region): digest for region, digest in plan.payloads.items()},
+            PAYLOAD_TTL_SECONDS,
+        )
+
+    tiers = {}
+    for st in to_create + to_update:
+        tiers[st.tier] = tiers.get(st.tier, 0) + 1
+    return tiers
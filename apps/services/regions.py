@@ -0,0 +1,300 @@
+# apps/services/regions.py
+
+"""
+시/도 · 시/군/구 지역 기준 테이블(RegionSido / RegionSigungu) 관리.
+
+- backfill_regions(): ErInfo(er_sido/er_sigungu), Hospital(sido 코드/sggu) 값으로
+  기준 테이블을 채우고 각 행의 region_sido / region_sigungu FK 를 연결
+- get_region_document(): 응급실 화면용 지역 문서 (시/도 목록, 시/도별 시/군/구, 정수 id)
+  → 캐시에 저장해 두고 요청마다 DISTINCT 쿼리를 하지 않는다
+"""
+
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+
+from apps.db.models import ErInfo, Hospital, RegionSido, RegionSigungu
+
+REGION_DOC_KEY = "region_doc:v1"
+REGION_DOC_TTL_SECONDS = 60 * 60 * 6   # 지역 정보는 자주 안 바뀜
+
+# 약칭 → 표준 명칭 (응급실 데이터에 없는 시/도를 병원 데이터로 처음 만들 때 사용)
+SIDO_FULL_NAMES = {
+    "서울": "서울특별시",
+    "부산": "부산광역시",
+    "인천": "인천광역시",
+    "대구": "대구광역시",
+    "광주": "광주광역시",
+    "대전": "대전광역시",
+    "울산": "울산광역시",
+    "세종": "세종특별자치시",
+    "경기": "경기도",
+    "강원": "강원특별자치도",
+    "충북": "충청북도",
+    "충남": "충청남도",
+    "전북": "전북특별자치도",
+    "전남": "전라남도",
+    "경북": "경상북도",
+    "경남": "경상남도",
+    "제주": "제주특별자치도",
+}
+
+# 병원 시/도 코드 판별 시 확인할 주소 표본 수
+ADDRESS_SAMPLE_SIZE = 20
+
+_SHORT_NAMES = {
+    "전라남도": "전남",
+    "전라북도": "전북",
+    "경상남도": "경남",
+    "경상북도": "경북",
+    "충청남도": "충남",
+    "충청북도": "충북",
+}
+
+
+def normalize_sido_name(sido):
+    """
+    시/도 이름을 표준화해서 같은 지역으로 합친다.
+    예: '전남' → '전라남도'
+    """
+    if sido in ("전남", "전라남도"):
+        return "전라남도"
+    if sido in ("전북", "전라북도"):
+        return "전라북도"
+    if sido in ("경남", "경상남도"):
+        return "경상남도"
+    if sido in ("경북", "경상북도"):
+        return "경상북도"
+    if sido in ("충남", "충청남도"):
+        return "충청남도"
+    if sido in ("충북", "충청북도"):
+        return "충청북도"
+
+    return sido
+
+
+def short_sido_name(name):
+    """표준 명칭 → 약칭 (예: 경상북도 → 경북, 서울특별시 → 서울)"""
+    name = normalize_sido_name(name)
+    return _SHORT_NAMES.get(name, name[:2])
+
+
+###########################################################
+# 기준 테이블 채우기
+###########################################################
+
+def _ensure_sidos(names):
+    """표준 명칭 집합 → {name: RegionSido} (없으면 생성)"""
+    sido_map = {s.name: s for s in RegionSido.objects.filter(name__in=names)}
+
+    for name in sorted(set(names) - set(sido_map)):
+        sido_map[name] = RegionSido.objects.create(name=name, short_name=short_sido_name(name))
+
+    return sido_map
+
+
+def _short_name_for_code(code):
+    """
+    병원 시/도 코드 → 약칭.
+    코드 체계(심평원 sidoCd / 행정표준코드)에 의존하지 않도록 해당 코드 병원들의 주소 첫 단어로 판별
+    """
+    addresses = (
+        Hospital.objects
+        .filter(sido=code)
+        .exclude(address="")
+        .values_list("address", flat=True)[:ADDRESS_SAMPLE_SIZE]
+    )
+    counts = Counter(
+        short_sido_name(address.split()[0]) for address in addresses if address.split()
+    )
+    for short, _ in counts.most_common():
+        if short in SIDO_FULL_NAMES:
+            return short
+    return None
+
+
+def _sido_for_hospital_code(code, by_code, by_short):
+    """병원 시/도 코드 → RegionSido (처음 보는 코드면 주소로 판별해 hira_code 에 기록)"""
+    if code in by_code:
+        return by_code[code]
+
+    short = _short_name_for_code(code)
+    if short is None:
+        return None
+
+    sido = by_short.get(short)
+    if sido is None:
+        sido = RegionSido.objects.create(
+            name=SIDO_FULL_NAMES[short], short_name=short, hira_code=code
+        )
+        by_short[short] = sido
+    elif not sido.hira_code:
+        sido.hira_code = code
+        sido.save(update_fields=["hira_code"])
+
+    by_code[code] = sido
+    return sido
+
+
+def _ensure_sigungus(pairs):
+    """{(sido_id, name)} → {(sido_id, name): sigungu_id} (없으면 bulk 생성)"""
+    pairs = {(sido_id, name) for sido_id, name in pairs if name}
+    if not pairs:
+        return {}
+
+    sido_ids = {sido_id for sido_id, _ in pairs}
+
+    def load():
+        return {
+            (sido_id, name): sigungu_id
+            for sigungu_id, sido_id, name in (
+                RegionSigungu.objects
+                .filter(sido_id__in=sido_ids)
+                .values_list("sigungu_id", "sido_id", "name")
+            )
+        }
+
+    existing = load()
+    missing = pairs - set(existing)
+    if missing:
+        RegionSigungu.objects.bulk_create(
+            [RegionSigungu(sido_id=sido_id, name=name) for sido_id, name in sorted(missing)],
+            batch_size=400,
+        )
+        existing = load()
+
+    return existing
+
+
+def backfill_regions():
+    """
+    ErInfo / Hospital 의 지역 문자열로 기준 테이블을 채우고 FK 를 연결한다.
+    (같은 지역 문자열 조합마다 UPDATE 1번)
+    반환: {"er": 갱신 행 수, "hospital": 갱신 행 수}
+    """
+    # 1) 응급실: er_sido / er_sigungu
+    er_pairs = list(
+        ErInfo.objects
+        .exclude(er_sido="")
+        .values_list("er_sido", "er_sigungu")
+        .distinct()
+    )
+    sido_map = _ensure_sidos({normalize_sido_name(sido) for sido, _ in er_pairs})
+
+    # 2) 병원: sido(시/도 코드) / sggu
+    hos_pairs = list(
+        Hospital.objects
+        .exclude(sido=None)
+        .exclude(sido="")
+        .values_list("sido", "sggu")
+        .distinct()
+    )
+    by_code = {s.hira_code: s for s in RegionSido.objects.exclude(hira_code=None)}
+    by_short = {s.short_name: s for s in RegionSido.objects.all()}
+    code_map = {
+        code: _sido_for_hospital_code(code, by_code, by_short)
+        for code in {code for code, _ in hos_pairs}
+    }
+
+    sigungu_map = _ensure_sigungus(
+        [(sido_map[normalize_sido_name(sido)].sido_id, sigungu) for sido, sigungu in er_pairs]
+        + [(code_map[code].sido_id, sggu) for code, sggu in hos_pairs if code_map[code]]
+    )
+
+    # 3) FK 연결
+    er_updated = 0
+    for sido, sigungu in er_pairs:
+        sido_id = sido_map[normalize_sido_name(sido)].sido_id
+        er_updated += ErInfo.objects.filter(er_sido=sido, er_sigungu=sigungu).update(
+            region_sido_id=sido_id,
+            region_sigungu_id=sigungu_map.get((sido_id, sigungu)),
+        )
+
+    hos_updated = 0
+    for code, sggu in hos_pairs:
+        sido = code_map[code]
+        if sido is None:
+            continue
+        hos_updated += Hospital.objects.filter(sido=code, sggu=sggu).update(
+            region_sido_id=sido.sido_id,
+            region_sigungu_id=sigungu_map.get((sido.sido_id, sggu)),
+        )
+
+    invalidate_region_document()
+    return {"er": er_updated, "hospital": hos_updated}
+
+
+###########################################################
+# 응급실 화면용 지역 문서 (캐시)
+###########################################################
+
+def build_region_document():
+    """
+    {
+        "sido_list": [표준 시/도 명칭, ...],
+        "region_dict": {시/도: [시/군/구, ...]},
+        "sido_ids": {시/도: sido_id},                      # backfill 된 지역만
+        "sigungu_ids": {"sido_id": {시/군/구: sigungu_id}},
+    }
+    """
+    rows = (
+        ErInfo.objects
+        .values_list("er_sido", "er_sigungu", "region_sido_id", "region_sigungu_id")
+        .distinct()
+    )
+
+    sido_names = set()
+    region_dict = defaultdict(set)
+    sido_ids = {}
+    sigungu_ids = defaultdict(dict)
+
+    for sido, sigungu, sido_id, sigungu_id in rows:
+        std_sido = normalize_sido_name(sido)
+        sido_names.add(std_sido)
+
+        if sido and sigungu:
+            region_dict[std_sido].add(sigungu)
+
+        if sido_id is not None:
+            sido_ids[std_sido] = sido_id
+            if sigungu_id is not None:
+                sigungu_ids[str(sido_id)][sigungu] = sigungu_id
+
+    return {
+        "sido_list": sorted(sido_names),
+        "region_dict": {sido: sorted(sigungus) for sido, sigungus in region_dict.items()},
+        "sido_ids": sido_ids,
+        "sigungu_ids": dict(sigungu_ids),
+    }
+
+
+def get_region_document():
+    doc = cache.get(REGION_DOC_KEY)
+    if doc is None:
+        doc = build_region_document()
+        cache.set(REGION_DOC_KEY, doc, REGION_DOC_TTL_SECONDS)
+    return doc
+
+
+def invalidate_region_document():
+    cache.delete(REGION_DOC_KEY)
+
+
+def resolve_sido_id(sido):
+    """화면에서 선택한 시/도 이름 → sido_id (기준 테이블에 없으면 None)"""
+    if not sido:
+        return None
+    return get_region_document()["sido_ids"].get(normalize_sido_name(sido))
+
+
+def resolve_sigungu_id(sido_id, sigungu):
+    if sido_id is None or not sigungu:
+        return None
+    return get_region_document()["sigungu_ids"].get(str(sido_id), {}).get(sigungu)
+
+
+def sigungu_names(sido):
+    """시/도 → 응급실이 있는 시/군/구 이름 목록"""
+    if not sido:
+        return []
+    return get_region_document()["region_dict"].get(normalize_sido_name(sido), [])
@@ -0,0 +1,255 @@
+# apps/services/spatial_index.py
+
+"""
+위경도 격자(grid bucket) 기반 공간 인덱스.
+
+- ErInfo(er_lat/er_lng), Hospital(lat/lng) 좌표를 일정 크기 셀로 나눠 메모리에 보관
+- 반경 검색(radius)과 k-최근접 검색(nearest)은 주변 셀에 들어있는 후보만 거리 계산
+  → 요청당 비용이 전국 병원 수가 아니라 "주변 밀도"에 비례
+- 인덱스는 프로세스마다 1번 빌드해서 재사용하고,
+  좌표가 바뀌면 invalidate_index() 로 버전을 올려 다음 요청에서 다시 빌드한다.
+"""
+
+import heapq
+import math
+import time
+
+from django.core.cache import cache
+
+from apps.db.models.emergency import ErInfo
+from apps.db.models.hospital import Hospital
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180.0  # 위도 1도 ≈ 111.19km
+
+# 기본 셀 크기: 0.1도 (위도 방향 약 11km, 한국 위도대 경도 방향 약 9km)
+DEFAULT_CELL_DEG = 0.1
+
+# 버전 키가 캐시에 없을 때(캐시 재시작 등) 인덱스를 강제로 다시 빌드하는 주기
+INDEX_MAX_AGE_SECONDS = 60 * 60
+
+VERSION_KEY = "spatial_index:version:{name}"
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    두 좌표 사이 거리(km).
+    emergency.views._haversine_km 과 같은 식/연산 순서 → 같은 입력이면 같은 값.
+    """
+    rlat1 = math.radians(lat1)
+    rlon1 = math.radians(lon1)
+    rlat2 = math.radians(lat2)
+    rlon2 = math.radians(lon2)
+
+    dlat = rlat2 - rlat1
+    dlon = rlon2 - rlon1
+
+    a = math.sin(dlat / 2) ** 2 + math.cos(rlat1) * math.cos(rlat2) * math.sin(dlon / 2) ** 2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return EARTH_RADIUS_KM * c
+
+
+class GridIndex:
+    """
+    (key, lat, lng) 목록을 위경도 격자 셀로 묶어 두는 읽기 전용 인덱스.
+    좌표가 None 인 항목은 인덱스에 포함되지 않는다.
+    """
+
+    def __init__(self, points, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.cells = {}
+        self.size = 0
+
+        for key, lat, lng in points:
+            if lat is None or lng is None:
+                continue
+            lat = float(lat)
+            lng = float(lng)
+            self.cells.setdefault(self._cell_of(lat, lng), []).append((key, lat, lng))
+            self.size += 1
+
+        if self.cells:
+            rows = [c[0] for c in self.cells]
+            cols = [c[1] for c in self.cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self._bounds = None
+
+    def __len__(self):
+        return self.size
+
+    def _cell_of(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    @staticmethod
+    def _lng_span_deg(km, max_abs_lat):
+        """위도 |lat| <= max_abs_lat 범위에서 km 이내 점이 가질 수 있는 최대 경도 차(도)."""
+        cos_lat = math.cos(math.radians(min(max_abs_lat, 90.0)))
+        ratio = math.sin(min(km / EARTH_RADIUS_KM, math.pi / 2)) / max(cos_lat, 1e-12)
+        if ratio >= 1.0:
+            return 180.0
+        return math.degrees(math.asin(ratio))
+
+    @staticmethod
+    def _km_for_lng_gap(lng_gap_deg, max_abs_lat):
+        """경도 차가 lng_gap_deg 이상인 점까지의 최소 거리(km) 하한."""
+        if lng_gap_deg >= 90.0:
+            return math.pi / 2 * EARTH_RADIUS_KM
+        cos_lat = math.cos(math.radians(min(max_abs_lat, 90.0)))
+        return EARTH_RADIUS_KM * math.asin(
+            min(1.0, math.sin(math.radians(lng_gap_deg)) * cos_lat)
+        )
+
+    def _scan(self, row_min, row_max, col_min, col_max):
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                bucket = self.cells.get((row, col))
+                if bucket:
+                    yield from bucket
+
+    def radius(self, lat, lng, radius_km):
+        """
+        (lat, lng) 로부터 radius_km 이내 항목을 [(key, distance_km), ...] 거리순으로 반환.
+        """
+        if not self.cells:
+            return []
+
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlng = self._lng_span_deg(radius_km, abs(lat) + dlat)
+
+        row_min, col_min = self._cell_of(lat - dlat, lng - dlng)
+        row_max, col_max = self._cell_of(lat + dlat, lng + dlng)
+
+        found = []
+        for key, p_lat, p_lng in self._scan(row_min, row_max, col_min, col_max):
+            dist = haversine_km(lat, lng, p_lat, p_lng)
+            if dist <= radius_km:
+                found.append((key, dist))
+
+        found.sort(key=lambda x: x[1])
+        return found
+
+    def nearest(self, lat, lng, k, max_km=None):
+        """
+        (lat, lng) 에서 가까운 순서로 최대 k개 [(key, distance_km), ...] 반환.
+        기준 셀에서 한 칸씩 바깥 고리(ring)를 넓혀 가며,
+        아직 안 본 셀까지의 최소 거리가 현재 k번째 거리보다 멀어지면 중단한다.
+        """
+        if not self.cells or k <= 0:
+            return []
+
+        row0, col0 = self._cell_of(lat, lng)
+        b_row_min, b_row_max, b_col_min, b_col_max = self._bounds
+
+        heap = []  # (-distance, key) 최대 힙 → 상위 k개 유지
+        ring = 0
+
+        while True:
+            row_min, row_max = row0 - ring, row0 + ring
+            col_min, col_max = col0 - ring, col0 + ring
+
+            for row in range(row_min, row_max + 1):
+                for col in range(col_min, col_max + 1):
+                    # 이번 고리의 테두리 셀만 새로 본다
+                    if ring and row not in (row_min, row_max) and col not in (col_min, col_max):
+                        continue
+                    for key, p_lat, p_lng in self.cells.get((row, col), ()):
+                        dist = haversine_km(lat, lng, p_lat, p_lng)
+                        if max_km is not None and dist > max_km:
+                            continue
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-dist, key))
+                        elif dist < -heap[0][0]:
+                            heapq.heapreplace(heap, (-dist, key))
+
+            # 인덱스 전체를 덮었으면 종료
+            if (
+                row_min <= b_row_min and row_max >= b_row_max
+                and col_min <= b_col_min and col_max >= b_col_max
+            ):
+                break
+
+            # 지금까지 본 사각형 바깥에 있는 점까지의 최소 거리(보수적 하한)
+            lat_gap = min(
+                lat - row_min * self.cell_deg,
+                (row_max + 1) * self.cell_deg - lat,
+            )
+            max_abs_lat = max(abs(row_min * self.cell_deg), abs((row_max + 1) * self.cell_deg))
+            lng_gap = min(
+                lng - col_min * self.cell_deg,
+                (col_max + 1) * self.cell_deg - lng,
+            )
+            outside_km = min(
+                lat_gap * KM_PER_DEG_LAT,
+                self._km_for_lng_gap(lng_gap, max_abs_lat),
+            )
+
+            if max_km is not None and outside_km > max_km:
+                break
+            if len(heap) >= k and outside_km >= -heap[0][0]:
+                break
+
+            ring += 1
+
+        result = [(key, -neg_dist) for neg_dist, key in heap]
+        result.sort(key=lambda x: x[1])
+        return result
+
+
+###########################################################
+# 프로세스 단위 인덱스 캐시
+###########################################################
+
+def _load_er_points():
+    return ErInfo.objects.values_list("er_id", "er_lat", "er_lng")
+
+
+def _load_hospital_points():
+    return Hospital.objects.values_list("hos_id", "lat", "lng")
+
+
+_LOADERS = {
+    "er": _load_er_points,
+    "hospital": _load_hospital_points,
+}
+
+# name → (version, built_at, GridIndex)
+_INDEXES = {}
+
+
+def get_index(name):
+    """
+    이름("er" | "hospital")에 해당하는 인덱스를 반환.
+    캐시의 버전 값이 바뀌었거나 INDEX_MAX_AGE_SECONDS 가 지났으면 다시 빌드한다.
+    """
+    version = cache.get(VERSION_KEY.format(name=name))
+    entry = _INDEXES.get(name)
+
+    if entry is not None:
+        built_version, built_at, index = entry
+        fresh = time.monotonic() - built_at < INDEX_MAX_AGE_SECONDS
+        if built_version == version and fresh:
+            return index
+
+    index = GridIndex(_LOADERS[name]())
+    _INDEXES[name] = (version, time.monotonic(), index)
+    return index
+
+
+def get_er_index():
+    return get_index("er")
+
+
+def get_hospital_index():
+    return get_index("hospital")
+
+
+def invalidate_index(name):
+    """좌표 데이터가 바뀐 뒤 호출 → 모든 프로세스가 다음 요청에서 인덱스를 다시 빌드."""
+    key = VERSION_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    _INDEXES.pop(name, None)
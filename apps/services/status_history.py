@@ -0,0 +1,376 @@
+# apps/services/status_history.py
+
+"""
+응급실 병상 변경 이력(er_status_history) 기록 + 시간/일 단위 집계(er_status_rollup).
+
+- append_status_history(): fetch_emergency 병합에서 병상 값이 실제로 바뀐 응급실만 1행씩 추가
+- rollup_status(): 지정 구간의 시간 단위 집계를 다시 계산하고, 걸친 날짜의 일 단위 집계도 갱신
+  · 이력은 변경 시점만 있으므로 "다음 변경 전까지 값이 유지" 된 것으로 보고 시간 가중 평균 계산
+  · 구간 시작 시점의 값은 그 이전 마지막 이력에서 가져옴 (carry-in)
+- ensure_month_partitions(): MySQL 월 파티션을 미리 만들어 둠 (rollup_er_status 에서 호출)
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.db.models import ErInfo, ErStatusHistory, ErStatusRollup
+
+BED_TYPES = [
+    "er_general",
+    "er_child",
+    "birth",
+    "negative_pressure",
+    "isolation_general",
+    "isolation_cohort",
+]
+
+HISTORY_FIELDS = [f"{t}_{kind}" for t in BED_TYPES for kind in ("available", "total")]
+
+ROLLUP_VALUE_FIELDS = [f"{t}_{agg}" for t in BED_TYPES for agg in ("min", "avg", "max")]
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# 미리 만들어 둘 다음 달 파티션 수
+PARTITION_MONTHS_AHEAD = 2
+
+
+def month_key(dt):
+    """hvdate → 파티션 키 YYYYMM (Asia/Seoul 기준)"""
+    local = timezone.localtime(dt)
+    return local.year * 100 + local.month
+
+
+###########################################################
+# 이력 기록
+###########################################################
+
+def append_status_history(latest_rows):
+    """
+    sync_latest_status 결과(ErLatestStatus, changed_fields 포함) 중
+    병상 값이 바뀐 응급실만 이력에 추가. 반환: 추가 건수
+    """
+    history = [
+        ErStatusHistory(
+            er_id=row.er_id,
+            hvdate=row.hvdate,
+            month=month_key(row.hvdate),
+            **{f: getattr(row, f) for f in HISTORY_FIELDS},
+        )
+        for row in latest_rows
+        if row.hvdate and set(getattr(row, "changed_fields", HISTORY_FIELDS)) & set(HISTORY_FIELDS)
+    ]
+    if history:
+        ErStatusHistory.objects.bulk_create(history, batch_size=400)
+    return len(history)
+
+
+###########################################################
+# 집계
+###########################################################
+
+def floor_hour(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def local_day_start(dt):
+    return timezone.localtime(dt).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Bucket:
+    """구간 1개의 병상 종류별 min / 시간 가중 합계 / max"""
+
+    __slots__ = ("covered", "stats")
+
+    def __init__(self):
+        self.covered = 0
+        # type → [min, 가중합, 가중 시간, max]
+        self.stats = {}
+
+    def add(self, values, seconds):
+        self.covered += seconds
+        for bed_type in BED_TYPES:
+            value = values.get(f"{bed_type}_available")
+            if value is None:
+                continue
+            stat = self.stats.get(bed_type)
+            if stat is None:
+                self.stats[bed_type] = [value, value * seconds, seconds, value]
+            else:
+                stat[0] = min(stat[0], value)
+                stat[1] += value * seconds
+                stat[2] += seconds
+                stat[3] = max(stat[3], value)
+
+    def as_fields(self):
+        fields = {"covered_seconds": int(self.covered)}
+        for bed_type in BED_TYPES:
+            stat = self.stats.get(bed_type)
+            fields[f"{bed_type}_min"] = stat[0] if stat else None
+            fields[f"{bed_type}_avg"] = stat[1] / stat[2] if stat and stat[2] else None
+            fields[f"{bed_type}_max"] = stat[3] if stat else None
+        return fields
+
+
+def _carry_in(window_start, er_ids=None, max_id=None):
+    """
+    구간 시작 시점에 유효한 병원별 마지막 이력 {er_id: values}
+    병원마다 (er_id, hvdate) 인덱스를 거꾸로 1행만 읽음 → 이력 테이블이 커져도 병원 수에 비례
+    (er_ids / max_id 는 iter_hour_segments 와 같음)
+    """
+    history = ErStatusHistory.objects.filter(
+        er_id=OuterRef("er_id"),
+        month__lte=month_key(window_start),
+        hvdate__lt=window_start,
+    )
+    if max_id is not None:
+        history = history.filter(id__lte=max_id)
+    last_row = history.order_by("-hvdate", "-id").values("id")[:1]
+
+    ers = ErInfo.objects.all()
+    if er_ids is not None:
+        ers = ers.filter(er_id__in=er_ids)
+    last_ids = [
+        pk for pk in (
+            ers
+            .annotate(last_id=Subquery(last_row))
+            .values_list("last_id", flat=True)
+        )
+        if pk is not None
+    ]
+    if not last_ids:
+        return {}
+
+    return {
+        row["er_id"]: row
+        for row in (
+            ErStatusHistory.objects
+            .filter(id__in=last_ids)
+            .values("er_id", "hvdate", *HISTORY_FIELDS)
+        )
+    }
+
+
+def _upsert_rollups(period, bucket_map):
+    """{(er_id, bucket_start): fields} → er_status_rollup (bulk_create + bulk_update)"""
+    if not bucket_map:
+        return 0
+
+    starts = {start for _, start in bucket_map}
+    existing = {
+        (row.er_id, row.bucket_start): row
+        for row in ErStatusRollup.objects.filter(period=period, bucket_start__in=starts)
+    }
+
+    to_create = []
+    to_update = []
+    for (er_id, start), fields in bucket_map.items():
+        row = existing.get((er_id, start))
+        if row is None:
+            to_create.append(ErStatusRollup(er_id=er_id, period=period, bucket_start=start, **fields))
+        else:
+            for name, value in fields.items():
+                setattr(row, name, value)
+            to_update.append(row)
+
+    if to_create:
+        ErStatusRollup.objects.bulk_create(to_create, batch_size=400)
+    if to_update:
+        ErStatusRollup.objects.bulk_update(
+            to_update, ["covered_seconds", *ROLLUP_VALUE_FIELDS], batch_size=400
+        )
+    return len(to_create) + len(to_update)
+
+
+def iter_hour_segments(window_start, window_end, er_ids=None, max_id=None):
+    """
+    [window_start, window_end) 의 병원별 상태 유지 구간을 시간 경계로 잘라서 반환.
+    yield (er_id, 시간 버킷 시작, 유지 시간(초), 이력 값 dict)
+    - 구간 시작 시점 값은 그 이전 마지막 이력 (carry-in)
+    - 마지막 이력 값은 window_end 까지 유지된 것으로 봄
+    - er_ids: 해당 병원만 / max_id: id 가 max_id 이하인 이력만 (그 시점까지 적재된 이력으로 계산)
+    """
+    timelines = defaultdict(list)
+    for er_id, row in _carry_in(window_start, er_ids, max_id).items():
+        timelines[er_id].append((window_start, row))
+
+    history = ErStatusHistory.objects.filter(hvdate__gte=window_start, hvdate__lt=window_end)
+    if er_ids is not None:
+        history = history.filter(er_id__in=er_ids)
+    if max_id is not None:
+        history = history.filter(id__lte=max_id)
+
+    for row in (
+        history
+        .order_by("er_id", "hvdate", "id")
+        .values("er_id", "hvdate", *HISTORY_FIELDS)
+    ):
+        timelines[row["er_id"]].append((row["hvdate"], row))
+
+    for er_id, events in timelines.items():
+        for i, (seg_start, values) in enumerate(events):
+            seg_end = events[i + 1][0] if i + 1 < len(events) else window_end
+
+            t = seg_start
+            while t < seg_end:
+                bucket_start = floor_hour(t)
+                part_end = min(seg_end, bucket_start + HOUR)
+                yield er_id, bucket_start, (part_end - t).total_seconds(), values
+                t = part_end
+
+
+def rollup_hours(start, end):
+    """
+    [start, end) 를 시간 단위로 다시 집계. 현재 시각 이후는 집계하지 않음.
+    반환: 저장한 시간 집계 행 수
+    """
+    window_start = floor_hour(start)
+    window_end = min(end, timezone.now())
+    if window_end <= window_start:
+        return 0
+
+    buckets = defaultdict(_Bucket)
+    for er_id, bucket_start, seconds, values in iter_hour_segments(window_start, window_end):
+        buckets[(er_id, bucket_start)].add(values, seconds)
+
+    return _upsert_rollups(
+        ErStatusRollup.PERIOD_HOUR,
+        {key: bucket.as_fields() for key, bucket in buckets.items()},
+    )
+
+
+def rollup_days(start, end):
+    """
+    [start, end) 에 걸친 날짜(Asia/Seoul)의 일 단위 집계를 시간 집계로부터 다시 계산.
+    평균은 시간별 평균을 해당 시간의 상태 유지 시간(covered_seconds)으로 가중
+    """
+    day_start = local_day_start(start)
+    day_end = local_day_start(end) + DAY
+
+    days = defaultdict(lambda: {"covered": 0, "stats": {}})
+    for row in ErStatusRollup.objects.filter(
+        period=ErStatusRollup.PERIOD_HOUR,
+        bucket_start__gte=day_start,
+        bucket_start__lt=day_end,
+    ):
+        day = days[(row.er_id, local_day_start(row.bucket_start))]
+        day["covered"] += row.covered_seconds
+
+        for bed_type in BED_TYPES:
+            avg = getattr(row, f"{bed_type}_avg")
+            if avg is None:
+                continue
+            low = getattr(row, f"{bed_type}_min")
+            high = getattr(row, f"{bed_type}_max")
+            weight = row.covered_seconds
+            stat = day["stats"].get(bed_type)
+            if stat is None:
+                day["stats"][bed_type] = [low, avg * weight, weight, high]
+            else:
+                stat[0] = min(stat[0], low)
+                stat[1] += avg * weight
+                stat[2] += weight
+                stat[3] = max(stat[3], high)
+
+    bucket_map = {}
+    for key, day in days.items():
+        fields = {"covered_seconds": day["covered"]}
+        for bed_type in BED_TYPES:
+            stat = day["stats"].get(bed_type)
+            fields[f"{bed_type}_min"] = stat[0] if stat else None
+            fields[f"{bed_type}_avg"] = stat[1] / stat[2] if stat and stat[2] else None
+            fields[f"{bed_type}_max"] = stat[3] if stat else None
+        bucket_map[key] = fields
+
+    return _upsert_rollups(ErStatusRollup.PERIOD_DAY, bucket_map)
+
+
+def rollup_status(start, end):
+    """시간 집계 → 일 집계 순서로 갱신. 반환: (시간 행 수, 일 행 수)"""
+    return rollup_hours(start, end), rollup_days(start, end)
+
+
+###########################################################
+# 추이(trend) 조회
+###########################################################
+
+def trend_points(er_id, period, start):
+    """
+    start 이후 집계 구간 목록 (er_status_rollup 만 읽음).
+    [{"t": 구간 시작(ISO), "covered": 초, "er_general": {"min", "avg", "max"}, ...}]
+    """
+    rows = (
+        ErStatusRollup.objects
+        .filter(er_id=er_id, period=period, bucket_start__gte=start)
+        .order_by("bucket_start")
+        .values("bucket_start", "covered_seconds", *ROLLUP_VALUE_FIELDS)
+    )
+
+    points = []
+    for row in rows:
+        point = {
+            "t": timezone.localtime(row["bucket_start"]).isoformat(),
+            "covered": row["covered_seconds"],
+        }
+        for bed_type in BED_TYPES:
+            avg = row[f"{bed_type}_avg"]
+            point[bed_type] = {
+                "min": row[f"{bed_type}_min"],
+                "avg": round(avg, 2) if avg is not None else None,
+                "max": row[f"{bed_type}_max"],
+            }
+        points.append(point)
+    return points
+
+
+###########################################################
+# MySQL 월 파티션 관리
+###########################################################
+
+def _next_month(month):
+    year, mon = divmod(month, 100)
+    return year * 100 + mon + 1 if mon < 12 else (year + 1) * 100 + 1
+
+
+def ensure_month_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    이번 달 ~ months_ahead 개월 뒤까지 파티션이 있도록 pmax 파티션을 쪼갠다.
+    MySQL 이 아니거나 파티션 테이블이 아니면 아무것도 하지 않음. 반환: 추가한 파티션 수
+    """
+    if connection.vendor != "mysql":
+        return 0
+
+    table = ErStatusHistory._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+            [table],
+        )
+        names = {row[0] for row in cursor.fetchall()}
+        if "pmax" not in names:
+            return 0
+
+        month = month_key(timezone.now())
+        wanted = []
+        for _ in range(months_ahead + 1):
+            if f"p{month}" not in names:
+                wanted.append(month)
+            month = _next_month(month)
+
+        if not wanted:
+            return 0
+
+        partitions = ", ".join(
+            f"PARTITION p{m} VALUES LESS THAN ({_next_month(m)})" for m in wanted
+        )
+        cursor.execute(
+            f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+            f"({partitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        )
+    return len(wanted)
+
@@ -0,0 +1,563 @@
+import asyncio
+import contextlib
+import io
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import xmltodict
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from apps.db.models import ErInfo, ErLatestStatus, ErStatusHistory, ErStatusRollup
+
+from . import openapi_fetcher, status_history, xml_stream
+from .spatial_index import GridIndex, haversine_km
+from .openapi_fetcher import PooledOpenApiFetcher, TokenBucket
+from .status_history import (
+    append_status_history,
+    ensure_month_partitions,
+    iter_hour_segments,
+    month_key,
+    rollup_status,
+)
+
+BASE_TIME = timezone.make_aware(datetime(2025, 1, 1, 10, 0, 0))
+
+
+class FakeClock:
+    """time.monotonic / asyncio.sleep 대신 쓰는 가짜 시계 (sleep 하면 시간만 흐름)"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeBody(io.BytesIO):
+    """response.raw 흉내. error 가 있으면 본문을 읽는 중에 그 예외를 낸다"""
+
+    def __init__(self, data=b"", error=None):
+        super().__init__(data)
+        self.error = error
+        self.decode_content = False
+
+    def read(self, *args):
+        if self.error is not None:
+            raise self.error
+        return super().read(*args)
+
+
+class FakeSession:
+    """session.get 호출마다 준비된 (status_code, raw) 를 차례로 돌려줌"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls += 1
+        status_code, raw = self.responses.pop(0)
+        return SimpleNamespace(status_code=status_code, raw=raw, url=url, close=lambda: None)
+
+    def close(self):
+        pass
+
+
+def read_body(response):
+    return [response.raw.read()]
+
+
+class PooledOpenApiFetcherRetryTest(SimpleTestCase):
+    """재시도 대상 오류는 지터 백오프 후 다시 시도, 그 외 오류는 바로 실패"""
+
+    def fetch(self, responses, retries=3):
+        fetcher = PooledOpenApiFetcher(concurrency=1, rate_per_sec=1000, retries=retries, backoff=0.5)
+        fetcher.session = FakeSession(responses)
+        clock = FakeClock()
+        with (
+            mock.patch.object(openapi_fetcher.asyncio, "sleep", clock.sleep),
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            result = fetcher.fetch_all([("k", "http://api.test/a", {})], read_body)["k"]
+        return result, fetcher, clock
+
+    def test_body_read_timeout_is_retried(self):
+        result, fetcher, _ = self.fetch([
+            (200, FakeBody(error=ReadTimeoutError(None, "http://api.test/a", "read timed out"))),
+            (200, FakeBody(b"<ok/>")),
+        ])
+
+        self.assertEqual(result, [b"<ok/>"])
+        self.assertEqual(fetcher.stats[0].attempts, 2)
+        self.assertTrue(fetcher.stats[0].ok)
+
+    def test_dropped_connection_while_streaming_is_retried(self):
+        result, fetcher, _ = self.fetch([
+            (200, FakeBody(error=ProtocolError("Connection broken"))),
+            (503, FakeBody()),
+            (200, FakeBody(b"<ok/>")),
+        ])
+
+        self.assertEqual(result, [b"<ok/>"])
+        self.assertEqual(fetcher.stats[0].attempts, 3)
+
+    def test_backoff_is_jittered_exponential(self):
+        with mock.patch.object(openapi_fetcher.random, "uniform", side_effect=lambda a, b: b) as uniform:
+            result, fetcher, clock = self.fetch([(503, FakeBody())] * 4, retries=3)
+
+        self.assertIsNone(result)
+        self.assertEqual(fetcher.stats[0].attempts, 4)
+        self.assertEqual(
+            [call.args for call in uniform.call_args_list], [(0, 0.5), (0, 1.0), (0, 2.0)]
+        )
+        self.assertEqual(clock.sleeps, [0.5, 1.0, 2.0])
+
+    def test_client_error_is_not_retried(self):
+        result, fetcher, clock = self.fetch([(404, FakeBody())])
+
+        self.assertIsNone(result)
+        self.assertEqual(fetcher.stats[0].attempts, 1)
+        self.assertFalse(fetcher.stats[0].ok)
+        self.assertEqual(clock.sleeps, [])
+
+
+class TokenBucketTest(SimpleTestCase):
+    """초당 rate 건, capacity 만큼만 몰아서 허용"""
+
+    def acquire_many(self, bucket, count):
+        async def run():
+            for _ in range(count):
+                await bucket.acquire()
+        asyncio.run(run())
+
+    def test_burst_up_to_capacity_then_rate_limited(self):
+        clock = FakeClock()
+        with (
+            mock.patch.object(openapi_fetcher, "time", SimpleNamespace(monotonic=clock.monotonic)),
+            mock.patch.object(openapi_fetcher.asyncio, "sleep", clock.sleep),
+        ):
+            bucket = TokenBucket(rate=2)
+            self.acquire_many(bucket, 5)
+
+        # 처음 2건은 바로, 나머지 3건은 0.5초씩 기다림
+        self.assertEqual(clock.sleeps, [0.5, 0.5, 0.5])
+        self.assertAlmostEqual(clock.now, 1.5)
+
+    def test_idle_time_refills_up_to_capacity(self):
+        clock = FakeClock()
+        with (
+            mock.patch.object(openapi_fetcher, "time", SimpleNamespace(monotonic=clock.monotonic)),
+            mock.patch.object(openapi_fetcher.asyncio, "sleep", clock.sleep),
+        ):
+            bucket = TokenBucket(rate=2)
+            self.acquire_many(bucket, 2)
+            clock.now += 60
+            self.acquire_many(bucket, 3)
+
+        # 오래 쉬어도 capacity(2) 이상은 쌓이지 않음
+        self.assertEqual(clock.sleeps, [0.5])
+
+
+def create_er(hpid):
+    return ErInfo.objects.create(
+        hpid=hpid, er_name=f"테스트병원 {hpid}", er_address="주소",
+        er_sido="서울특별시", er_sigungu="중구",
+    )
+
+
+class StatusHistoryRollupTest(TestCase):
+    """변경 이력 → 시간 가중 시간/일 집계"""
+
+    def setUp(self):
+        self.er = create_er("H0001")
+
+    def history(self, hvdate, available, er=None):
+        ErStatusHistory.objects.create(
+            er=er or self.er,
+            hvdate=hvdate,
+            month=month_key(hvdate),
+            er_general_available=available,
+            er_general_total=10,
+        )
+
+    def hour_rollups(self, er=None):
+        return {
+            timezone.localtime(row.bucket_start).hour: row
+            for row in ErStatusRollup.objects.filter(
+                er=er or self.er, period=ErStatusRollup.PERIOD_HOUR
+            )
+        }
+
+    def test_segments_are_split_at_hour_boundaries(self):
+        self.history(BASE_TIME + timedelta(minutes=30), 4)
+        self.history(BASE_TIME + timedelta(minutes=75), 8)
+
+        segments = [
+            (timezone.localtime(start).hour, seconds, values["er_general_available"])
+            for _, start, seconds, values in iter_hour_segments(BASE_TIME, BASE_TIME + timedelta(hours=2))
+        ]
+        self.assertEqual(segments, [(10, 1800, 4), (11, 900, 4), (11, 2700, 8)])
+
+    def test_hour_rollup_is_time_weighted(self):
+        self.history(BASE_TIME + timedelta(minutes=30), 4)
+        self.history(BASE_TIME + timedelta(minutes=75), 8)
+
+        rollup_status(BASE_TIME, BASE_TIME + timedelta(hours=2))
+
+        rows = self.hour_rollups()
+        self.assertEqual(rows[10].covered_seconds, 1800)
+        self.assertEqual(rows[10].er_general_avg, 4)
+        self.assertEqual(rows[11].covered_seconds, 3600)
+        self.assertAlmostEqual(rows[11].er_general_avg, 7.0)
+        self.assertEqual((rows[11].er_general_min, rows[11].er_general_max), (4, 8))
+
+        day = ErStatusRollup.objects.get(er=self.er, period=ErStatusRollup.PERIOD_DAY)
+        self.assertEqual(day.covered_seconds, 5400)
+        self.assertAlmostEqual(day.er_general_avg, (4 * 1800 + 7 * 3600) / 5400)
+
+    def test_carry_in_without_rows_in_window(self):
+        other = create_er("H0002")
+        self.history(BASE_TIME - timedelta(hours=2), 1)
+        self.history(BASE_TIME - timedelta(hours=1), 5)
+        self.history(BASE_TIME - timedelta(hours=3), 9, er=other)
+        self.history(BASE_TIME + timedelta(minutes=30), 2, er=other)
+
+        rollup_status(BASE_TIME, BASE_TIME + timedelta(hours=2))
+
+        # 구간 안에 이력이 없어도 직전 마지막 값(5)이 구간 내내 유지
+        rows = self.hour_rollups()
+        self.assertEqual(sorted(rows), [10, 11])
+        self.assertEqual([rows[h].covered_seconds for h in (10, 11)], [3600, 3600])
+        self.assertEqual([rows[h].er_general_avg for h in (10, 11)], [5, 5])
+
+        rows = self.hour_rollups(other)
+        self.assertAlmostEqual(rows[10].er_general_avg, (9 * 1800 + 2 * 1800) / 3600)
+
+    def test_rollup_is_idempotent(self):
+        self.history(BASE_TIME + timedelta(minutes=30), 4)
+        self.history(BASE_TIME + timedelta(minutes=75), 8)
+        window = (BASE_TIME, BASE_TIME + timedelta(hours=2))
+
+        def snapshot():
+            return sorted(
+                ErStatusRollup.objects.values_list(
+                    "period", "bucket_start", "covered_seconds", "er_general_avg"
+                )
+            )
+
+        rollup_status(*window)
+        first = snapshot()
+        rollup_status(*window)
+
+        self.assertEqual(snapshot(), first)
+        self.assertEqual(len(first), 3)
+
+    def test_unchanged_bed_values_are_not_appended(self):
+        def latest(changed_fields=None):
+            row = ErLatestStatus(er=self.er, hvdate=BASE_TIME, er_general_available=3)
+            if changed_fields is not None:
+                row.changed_fields = changed_fields
+            return row
+
+        # 장비 값만 바뀜 → 병상 이력 대상 아님
+        self.assertEqual(append_status_history([latest({"has_ct": True})]), 0)
+        self.assertEqual(append_status_history([latest({"er_general_available": 3})]), 1)
+        # changed_fields 가 없으면(신규) 항상 기록
+        self.assertEqual(append_status_history([latest()]), 1)
+
+        self.assertEqual(ErStatusHistory.objects.filter(er=self.er).count(), 2)
+        self.assertEqual(ErStatusHistory.objects.first().month, 202501)
+
+
+class FakeCursor:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchall(self):
+        return [(name,) for name in self.partitions]
+
+
+class EnsureMonthPartitionsTest(SimpleTestCase):
+    """pmax 를 쪼개서 이번 달 ~ N개월 뒤 파티션 생성 (MySQL 만)"""
+
+    def run_with(self, partitions, vendor="mysql"):
+        cursor = FakeCursor(partitions)
+        connection = SimpleNamespace(vendor=vendor, cursor=lambda: cursor)
+        with (
+            mock.patch.object(status_history, "connection", connection),
+            mock.patch.object(status_history.timezone, "now", return_value=BASE_TIME),
+        ):
+            added = ensure_month_partitions(months_ahead=2)
+        return added, cursor.executed
+
+    def test_missing_months_are_split_from_pmax(self):
+        added, executed = self.run_with(["p202501", "pmax"])
+
+        self.assertEqual(added, 2)
+        self.assertEqual(
+            executed[-1],
+            "ALTER TABLE er_status_history REORGANIZE PARTITION pmax INTO "
+            "(PARTITION p202502 VALUES LESS THAN (202503), "
+            "PARTITION p202503 VALUES LESS THAN (202504), "
+            "PARTITION pmax VALUES LESS THAN MAXVALUE)",
+        )
+
+    def test_year_boundary(self):
+        with mock.patch.object(
+            status_history.timezone, "now", return_value=BASE_TIME.replace(month=12)
+        ):
+            cursor = FakeCursor(["p202412", "pmax"])
+            connection = SimpleNamespace(vendor="mysql", cursor=lambda: cursor)
+            with mock.patch.object(status_history, "connection", connection):
+                self.assertEqual(ensure_month_partitions(months_ahead=1), 2)
+        self.assertIn("PARTITION p202512 VALUES LESS THAN (202601)", cursor.executed[-1])
+        self.assertIn("PARTITION p202601 VALUES LESS THAN (202602)", cursor.executed[-1])
+
+    def test_nothing_to_do(self):
+        self.assertEqual(self.run_with(["p202501", "p202502", "p202503", "pmax"]), (0, [mock.ANY]))
+        self.assertEqual(self.run_with(["p202501"]), (0, [mock.ANY]))
+        self.assertEqual(self.run_with([], vendor="sqlite"), (0, []))
+
+
+def brute_force(points, lat, lng):
+    """인덱스 없이 전체 점의 거리를 계산해 거리순 정렬"""
+    found = [
+        (key, haversine_km(lat, lng, p_lat, p_lng))
+        for key, p_lat, p_lng in points
+        if p_lat is not None and p_lng is not None
+    ]
+    return sorted(found, key=lambda x: x[1])
+
+
+class GridIndexParityTest(SimpleTestCase):
+    """격자 인덱스 반경 / 최근접 검색 == 전체 거리 계산 결과"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.points = [
+            (i, rng.uniform(33.0, 38.5), rng.uniform(125.0, 130.0)) for i in range(400)
+        ]
+        # 셀 경계(0.1도 배수) 위 / 바로 안팎에 있는 점
+        for i in range(40):
+            offset = (i % 3 - 1) * 1e-9
+            lat = 36.0 + 0.1 * (i % 10) + offset
+            lng = 126.5 + 0.1 * (i // 10) - offset
+            self.points.append((1000 + i, lat, lng))
+        self.points.append((9999, None, 127.0))
+        self.index = GridIndex(self.points)
+
+        # 셀 중심 / 셀 경계 위 / 모서리 바로 옆 / 점 분포 바깥 기준점
+        self.origins = [
+            (37.55, 126.95),
+            (37.5, 127.0),
+            (36.3 - 1e-9, 127.2 + 1e-9),
+            (35.0, 129.0),
+            (40.0, 124.0),
+        ]
+
+    def assertSameResult(self, actual, expected):
+        self.assertEqual([key for key, _ in actual], [key for key, _ in expected])
+        for (_, a), (_, b) in zip(actual, expected):
+            self.assertAlmostEqual(a, b, places=9)
+
+    def test_points_without_coordinates_are_skipped(self):
+        self.assertEqual(len(self.index), len(self.points) - 1)
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lng in self.origins:
+            for k in (1, 5, 37):
+                with self.subTest(lat=lat, lng=lng, k=k):
+                    self.assertSameResult(
+                        self.index.nearest(lat, lng, k), brute_force(self.points, lat, lng)[:k]
+                    )
+
+    def test_nearest_with_max_km(self):
+        for lat, lng in self.origins:
+            with self.subTest(lat=lat, lng=lng):
+                expected = [row for row in brute_force(self.points, lat, lng) if row[1] <= 25.0][:10]
+                self.assertSameResult(self.index.nearest(lat, lng, 10, max_km=25.0), expected)
+
+    def test_k_larger_than_point_count_returns_everything(self):
+        lat, lng = self.origins[0]
+        result = self.index.nearest(lat, lng, len(self.points) * 2)
+
+        self.assertSameResult(result, brute_force(self.points, lat, lng))
+
+    def test_radius_matches_brute_force(self):
+        for lat, lng in self.origins:
+            for radius_km in (0.5, 10.0, 30.0, 150.0):
+                with self.subTest(lat=lat, lng=lng, radius_km=radius_km):
+                    expected = [row for row in brute_force(self.points, lat, lng) if row[1] <= radius_km]
+                    self.assertSameResult(self.index.radius(lat, lng, radius_km), expected)
+
+    def test_point_on_cell_edge_is_found_from_neighbouring_cell(self):
+        index = GridIndex([("edge", 37.5, 127.0), ("far", 37.0, 126.0)])
+
+        self.assertEqual(index.nearest(37.5 - 1e-6, 127.0 - 1e-6, 1)[0][0], "edge")
+        self.assertEqual([key for key, _ in index.radius(37.4999, 126.9999, 0.1)], ["edge"])
+
+    def test_empty_grid(self):
+        index = GridIndex([(1, None, None)])
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.nearest(37.5, 127.0, 5), [])
+        self.assertEqual(index.radius(37.5, 127.0, 30.0), [])
+        self.assertEqual(self.index.nearest(37.5, 127.0, 0), [])
+
+
+def xmltodict_items(text):
+    """스트리밍 파서 도입 전 fetch_emergency.parse_items (xmltodict 경로)"""
+    data = xmltodict.parse(text)
+    items = ((((data.get("response") or {}).get("body") or {}).get("items") or {}).get("item"))
+    if not items:
+        return []
+    if isinstance(items, dict):
+        return [items]
+    return items
+
+
+def api_response(items_xml, total_count=None):
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+        "<response><header><resultCode>00</resultCode><resultMsg>NORMAL SERVICE.</resultMsg></header>"
+        f"<body><items>{items_xml}</items><numOfRows>10</numOfRows><pageNo>1</pageNo>"
+        f"<totalCount>{total_count}</totalCount></body></response>"
+    ).encode("utf-8")
+
+
+STATUS_ITEMS = """
+<item>
+  <hpid>A1100010</hpid><dutyName>서울대학교병원</dutyName>
+  <hvec>  12 </hvec><hvoc>-3</hvoc><hvctayn>Y</hvctayn><hvmriayn></hvmriayn>
+  <hvidate>20250101103000</hvidate>
+</item>
+<item>
+  <hpid>A1100011</hpid><dutyName>세브란스병원</dutyName>
+  <hvec>0</hvec><hvoc/><hvctayn>N1</hvctayn><hvmriayn>Y</hvmriayn>
+  <hvidate>20250101102900</hvidate>
+</item>
+"""
+
+
+class ChunkedBody(io.BytesIO):
+    """read() 가 요청 크기와 상관없이 chunk_size 씩만 돌려주는 응답 본문"""
+
+    def __init__(self, data, chunk_size):
+        super().__init__(data)
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        return super().read(self.chunk_size)
+
+
+class XmlStreamParityTest(SimpleTestCase):
+    """스트리밍 파서 결과 == 기존 xmltodict 경로 결과"""
+
+    def assertParity(self, body):
+        expected = xmltodict_items(body)
+        self.assertEqual(xml_stream.parse_items(io.BytesIO(body)), expected)
+        return expected
+
+    def test_multiple_items(self):
+        items = self.assertParity(api_response(STATUS_ITEMS, 2))
+
+        self.assertEqual(items[0]["hvec"], "12")
+        self.assertIsNone(items[0]["hvmriayn"])
+        self.assertIsNone(items[1]["hvoc"])
+
+    def test_single_item(self):
+        # xmltodict 는 item 이 1개면 dict 로 주므로 기존 경로는 리스트로 감쌌음
+        items = self.assertParity(api_response("<item><hpid>A1</hpid><hvec>3</hvec></item>", 1))
+
+        self.assertEqual(items, [{"hpid": "A1", "hvec": "3"}])
+
+    def test_empty_items(self):
+        for items_xml in ("", "   ", "<!-- 없음 -->"):
+            with self.subTest(items_xml=items_xml):
+                self.assertEqual(self.assertParity(api_response(items_xml, 0)), [])
+
+        self.assertEqual(xml_stream.parse_items(io.BytesIO(b"<response><header/></response>")), [])
+
+    def test_nested_fields(self):
+        items_xml = """
+        <item>
+          <hpid>A1</hpid>
+          <msg><type code="1">병상</type><text>중환자실 부족</text><text>CT 고장</text></msg>
+          <note lang="ko">  확인  </note>
+          <totalCount>5</totalCount>
+        </item>
+        <item><hpid>A2</hpid><msg/></item>
+        """
+        meta = {}
+        items = xml_stream.parse_items(io.BytesIO(api_response(items_xml, 2)), meta)
+
+        self.assertEqual(items, xmltodict_items(api_response(items_xml, 2)))
+        self.assertEqual(items[0]["msg"], {
+            "type": {"@code": "1", "#text": "병상"},
+            "text": ["중환자실 부족", "CT 고장"],
+        })
+        self.assertEqual(items[0]["note"], {"@lang": "ko", "#text": "확인"})
+        # item 안의 같은 이름 태그는 페이지 정보(meta)로 읽지 않음
+        self.assertEqual(meta["totalCount"], "2")
+
+    def test_meta_is_collected(self):
+        meta = {}
+        xml_stream.parse_items(io.BytesIO(api_response(STATUS_ITEMS, 2)), meta)
+
+        self.assertEqual(meta, {
+            "resultCode": "00", "resultMsg": "NORMAL SERVICE.",
+            "numOfRows": "10", "pageNo": "1", "totalCount": "2",
+        })
+
+    def test_broken_xml_returns_empty_list(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            items = xml_stream.parse_items(io.BytesIO(api_response(STATUS_ITEMS, 2)[:-40]))
+
+        self.assertEqual(items, [])
+        self.assertIn("XML 파싱 실패", out.getvalue())
+
+    def test_items_are_detached_and_cleared_while_streaming(self):
+        elements = {}
+        iterparse = xml_stream.ET.iterparse
+
+        def recording_iterparse(source, events):
+            for event, elem in iterparse(source, events):
+                if event == "start":
+                    elements.setdefault(elem.tag, []).append(elem)
+                yield event, elem
+
+        items_xml = "".join(f"<item><hpid>A{i}</hpid><hvec>{i}</hvec></item>" for i in range(5))
+        # 응답 스트림처럼 조금씩 읽히도록
+        source = ChunkedBody(api_response(items_xml, 5), chunk_size=16)
+        with mock.patch.object(xml_stream.ET, "iterparse", recording_iterparse):
+            for i, item in enumerate(xml_stream.iter_items(source)):
+                self.assertEqual(item, {"hpid": f"A{i}", "hvec": str(i)})
+                attached = list(elements["items"][0])
+                # 지금 내보낸 item (+ 읽는 중인 다음 item) 만 트리에 남아 있고, 앞선 item 은 떼어내고 비움
+                self.assertIs(attached[0], elements["item"][i])
+                self.assertLessEqual(len(attached), 2)
+                for done in elements["item"][:i]:
+                    self.assertNotIn(done, attached)
+                    self.assertEqual(len(done), 0)
+
+        self.assertEqual(len(elements["items"][0]), 0)
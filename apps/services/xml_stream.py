@@ -0,0 +1,99 @@
+# apps/services/xml_stream.py
+
+"""
+공공데이터포털 XML 응답 스트리밍 파서.
+
+응답 전체를 문자열로 읽어 xmltodict 로 중첩 dict 를 만드는 대신,
+iterparse 로 스트림을 읽으면서 <item> 하나가 끝날 때마다 dict 로 내보내고 바로 버린다.
+(끝난 <item> 은 부모 <items> 에서도 떼어냄 → 트리에 쌓이지 않음)
+- 큰 응답은 convert_items(source, items_to_rows) 처럼 변환 함수가 제너레이터를 바로 소비하게 해서
+  item dict 리스트를 따로 만들지 않는다 (parse_items 는 item 리스트가 꼭 필요한 곳에서만)
+
+item 값 규칙은 xmltodict 와 동일하게 맞춘다.
+- 앞뒤 공백 제거, 빈 태그는 None
+- 하위 태그가 있는 값은 dict, 같은 태그가 반복되면 list
+- 속성은 "@이름", 속성/하위 태그와 함께 있는 텍스트는 "#text"
+"""
+
+import xml.etree.ElementTree as ET
+
+# header / body 에서 함께 수집하는 값 (페이지 처리, 오류 확인용)
+META_TAGS = {"resultCode", "resultMsg", "numOfRows", "pageNo", "totalCount"}
+
+
+def _text(elem):
+    text = (elem.text or "").strip()
+    return text or None
+
+
+def _value(elem):
+    """요소 1개 → xmltodict 와 같은 값 (문자열 / None / dict)"""
+    if not len(elem) and not elem.attrib:
+        return _text(elem)
+
+    value = {f"@{name}": attr for name, attr in elem.attrib.items()}
+    for child in elem:
+        child_value = _value(child)
+        if child.tag not in value:
+            value[child.tag] = child_value
+        elif isinstance(value[child.tag], list):
+            value[child.tag].append(child_value)
+        else:
+            value[child.tag] = [value[child.tag], child_value]
+
+    text = _text(elem)
+    if text is not None:
+        value["#text"] = text
+    return value
+
+
+def iter_items(source, meta=None, item_tag="item"):
+    """
+    source: 바이너리 파일 객체(response.raw, BytesIO 등) 또는 파일 경로
+    meta: dict 를 넘기면 resultCode / totalCount 등을 읽는 대로 채워 넣는다
+    """
+    # 열린 요소 경로 (끝난 <item> 을 부모에서 떼어내기 위해)
+    path = []
+    # 열려 있는 <item> 수 (item 안의 같은 이름 태그를 meta 로 읽지 않기 위해)
+    open_items = 0
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            path.append(elem)
+            if elem.tag == item_tag:
+                open_items += 1
+            continue
+
+        # end
+        path.pop()
+        if elem.tag == item_tag:
+            open_items -= 1
+            if open_items:
+                continue
+            # <item> 하위 트리만 변환 (빈 <item/> 은 빈 dict)
+            item = _value(elem)
+            yield item if isinstance(item, dict) else {}
+            elem.clear()
+            if path:
+                # 앞선 item 은 이미 떼어냈으므로 항상 첫 자식 → remove 비용 일정
+                path[-1].remove(elem)
+        elif not open_items and meta is not None and elem.tag in META_TAGS:
+            meta[elem.tag] = _text(elem)
+            elem.clear()
+
+
+def convert_items(source, convert, meta=None):
+    """
+    convert(iter_items 제너레이터) 결과를 반환 (item 을 읽는 대로 변환, item 리스트를 만들지 않음).
+    XML 이 깨졌으면 [] (기존 xmltodict 경로와 동일)
+    """
+    try:
+        return convert(iter_items(source, meta))
+    except ET.ParseError:
+        print("[ERROR] XML 파싱 실패")
+        return []
+
+
+def parse_items(source, meta=None):
+    """iter_items 결과를 리스트로 반환. XML 이 깨졌으면 []"""
+    return convert_items(source, list, meta)
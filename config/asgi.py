@@ -17,14 +17,20 @@ import apps.emr.routing as route
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+django_asgi_app = get_asgi_application()
+
+# 응급실 consumer 는 모델을 사용하므로 Django 초기화(get_asgi_application) 이후에 import
+import apps.emergency.routing as emergency_route  # noqa: E402
+
 application = ProtocolTypeRouter({
     # 1. 일반 HTTP 요청 -> Django가 처리
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
 
     # 2. WebSocket 요청 -> Channels가 처리 (로그인 정보 포함)
     "websocket": AuthMiddlewareStack(
         URLRouter(
             route.websocket_urlpatterns
+            + emergency_route.websocket_urlpatterns
         )
     ),
 })
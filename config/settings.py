@@ -128,6 +128,8 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
+            # fetch_emergency --load-infile (LOAD DATA LOCAL INFILE) 사용 시에만 켬
+            'local_infile': os.getenv("DB_LOCAL_INFILE") == "1",
         },
     }
 }
@@ -168,6 +170,16 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 캐시 설정 (Redis)
+# - 웹(daphne)과 수집 명령(fetch_emergency 등)이 같은 캐시를 봐야
+#   스냅샷 버전 / 순위 캐시 무효화가 모든 프로세스에 반영된다
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://127.0.0.1:6379/1"),
+    }
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -206,6 +218,27 @@ import urllib.parse
 RAW_API_KEY = os.getenv("OPENAPI_SERVICE_KEY")
 OPENAPI_SERVICE_KEY = urllib.parse.quote(RAW_API_KEY, safe='')
 
+# fetch_emergency 지역별 적응형 폴링 (분 단위)
+# - 등급별 최소 호출 간격: 응답이 자주 바뀌는 지역(fast)은 매 회차, 거의 안 바뀌는 지역(slow)은 드물게
+# - 전체 수집 주기: 이 시간이 지나면 등급과 무관하게 모든 지역을 1번 호출
+ER_POLL_FAST_MINUTES = int(os.getenv("ER_POLL_FAST_MINUTES", 0))
+ER_POLL_NORMAL_MINUTES = int(os.getenv("ER_POLL_NORMAL_MINUTES", 15))
+ER_POLL_SLOW_MINUTES = int(os.getenv("ER_POLL_SLOW_MINUTES", 30))
+ER_POLL_FULL_SWEEP_MINUTES = int(os.getenv("ER_POLL_FULL_SWEEP_MINUTES", 60))
+
+# fetch_emergency 수집 방식 (region: 시군구별 적응형 호출 / nationwide: 전국 페이지 조회)
+ER_FETCH_MODE = os.getenv("ER_FETCH_MODE", "region")
+ER_NATIONWIDE_PAGE_SIZE = int(os.getenv("ER_NATIONWIDE_PAGE_SIZE", 1000))
+
+# fetch_emergency 병합 경로 (기본: API rows → ErStatus 메모리 직접 병합 / 1 이면 STAGING 에도 적재 후 STAGING 에서 병합)
+ER_MERGE_AUDIT_STAGING = os.getenv("ER_MERGE_AUDIT_STAGING", "0") == "1"
+
+# data.go.kr 원본 응답 보관소 (fetch_emergency / fetch_emergency_message --replay 용)
+RAW_ARCHIVE_ENABLED = os.getenv("RAW_ARCHIVE_ENABLED", "1") == "1"
+RAW_ARCHIVE_DIR = Path(os.getenv("RAW_ARCHIVE_DIR", BASE_DIR / "var" / "raw_archive"))
+# 이 일수가 지난 수집 기록 / 참조되지 않는 응답은 prune_raw_archive 가 삭제 (run_scheduler 하루 1번)
+RAW_ARCHIVE_RETENTION_DAYS = float(os.getenv("RAW_ARCHIVE_RETENTION_DAYS", 7))
+
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")  # 환경변수에서 읽기
 GOOGLE_API_KEY = os.getenv("GOOGLE_MAP_API_KEY", "")
 
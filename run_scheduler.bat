@@ -0,0 +1,4 @@
+@echo off
+cd /d "D:\KDT2508\carebridge"
+REM === 상주 스케줄러: fetch_emergency / fetch_emergency_message / fetch_medical_news / import_disease_data ===
+"D:\KDT2508\.venv\Scripts\python.exe" -X utf8 manage.py run_scheduler >> "D:\KDT2508\carebridge\logs\run_scheduler.log" 2>&1